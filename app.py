@@ -1,11 +1,10 @@
 # app.py
 from __future__ import annotations
 
-import json
 import os
 import sys
 from html import escape, unescape
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 import re
 import signal
@@ -16,7 +15,7 @@ import random
 import base64
 import copy
 from typing import Any
-import traceback
+import threading
 
 
 if sys.platform == "win32":
@@ -36,57 +35,50 @@ if SRC_PATH not in sys.path:
     # MUY IMPORTANTE: insertarlo al principio, antes de site-packages
     sys.path.insert(0, SRC_PATH)
 
-ARTIFACTS_DIR = os.path.join(CURRENT_DIR, "artifacts")
-ARTIFACT_FILES = [
-    "scene_blueprint.json",
-    "characters.json",
-    "suspect_images.json",
-    "solution.json",
-]
 
-
-from cluedogenai.crew import Cluedogenai  # noqa: E402
+from rerun_profiler import profile_section, profiled_rerun  # noqa: E402
+from cluedogenai.checkpoints import CaseCheckpoint, checkpoints_enabled, new_game_id  # noqa: E402
+from cluedogenai.case_generation import (  # noqa: E402
+    CREW_TOPIC,
+    SETUP_TASK_ARTIFACTS,
+    CaseGenerationCancelled,
+    build_base_case,
+    build_suspects,
+    extract_json_object_with_key,
+    find_guilty_name,
+    find_suspect_image,
+    generate_case_with_crew,
+    kickoff_with_fallback,
+    safe_get_task_raw,
+)
+from cluedogenai.projections import (  # noqa: E402
+    compact_json,
+    format_report,
+    project_blueprint,
+    project_characters,
+    projection_report,
+)
+from cluedogenai.routing import is_quota_error  # noqa: E402
+from cluedogenai.image_assets import (  # noqa: E402
+    PORTRAIT_DISPLAY_WIDTH,
+    placeholder_bytes,
+    portrait_bytes,
+)
+from cluedogenai.portraits import PortraitQueue  # noqa: E402
+from cluedogenai.retrieval import format_notes, get_index, retrieval_enabled, retrieval_k, warm_up  # noqa: E402
+from cluedogenai.scheduler import Priority  # noqa: E402
+from cluedogenai.dialogue_cache import case_id, get_dialogue_cache  # noqa: E402
+from cluedogenai.game_store import get_game_store  # noqa: E402
+from cluedogenai.speculative import PreAnswerBank, speculative_enabled  # noqa: E402
 
 TOTAL_QUESTIONS = 10
 MAX_TURNS_IN_SUMMARY = 3
-CREW_TOPIC = "AI Murder Mystery"
 
 
 # =========================
-#  CREW HELPERS
+#  DIALOGUE HELPERS
 # =========================
 
-def _clean_artifacts() -> None:
-    if not os.path.isdir(ARTIFACTS_DIR):
-        return
-    for fname in ARTIFACT_FILES:
-        fpath = os.path.join(ARTIFACTS_DIR, fname)
-        if os.path.exists(fpath):
-            try:
-                os.remove(fpath)
-            except Exception as e:
-                print(f"Could not delete artifact {fname}: {e}")
-
-
-def _extract_json_object_with_key(text: str, required_key: str) -> Optional[dict]:
-    """Busca y parsea el PRIMER objeto JSON válido que contenga required_key."""
-    if not text:
-        return None
-
-    cleaned = text.replace("```json", "").replace("```", "")
-    dec = json.JSONDecoder()
-
-    for m in re.finditer(r"\{", cleaned):
-        start = m.start()
-        try:
-            obj, _ = dec.raw_decode(cleaned[start:])
-            if isinstance(obj, dict) and required_key in obj:
-                return obj
-        except Exception:
-            continue
-    return None
-
-
 def sanitize_characters_for_dialogue(
     characters: Optional[Dict[str, Any]],
     active_suspect: str,
@@ -164,280 +156,121 @@ def _strip_html_tags(text: str) -> str:
     return text.strip()
 
 
-def _safe_get_task_raw(task_obj) -> Optional[str]:
+class CaseGenerationJob:
     """
-    Intenta extraer un string "crudo" de un TaskOutput de CrewAI,
-    probando atributos comunes (raw, output, value, etc.).
-    """
-    if task_obj is None:
-        return None
-    for attr in ("raw", "output", "value", "result", "content"):
-        if hasattr(task_obj, attr):
-            val = getattr(task_obj, attr)
-            if isinstance(val, str) and val.strip():
-                return val
-    s = str(task_obj)
-    return s if s.strip() else None
-
-def _clean_generated_images() -> None:
-    """Elimina todos los archivos .png/.jpg de la carpeta generated_images."""
-    images_dir_abs = os.path.join(SRC_PATH, "cluedogenai", "generated_images")
-    if not os.path.exists(images_dir_abs):
-        return
-    
-    print(f"Cleaning old images in: {images_dir_abs}")
-    for fname in os.listdir(images_dir_abs):
-        if fname.lower().endswith((".png", ".jpg", ".jpeg")):
-            try:
-                os.remove(os.path.join(images_dir_abs, fname))
-            except Exception as e:
-                print(f"Could not delete {fname}: {e}")
-
-
-def generate_case_with_crew() -> Dict:
+    Genera el caso en un hilo aparte. Los callbacks de las tasks van dejando
+    las piezas (blueprint, sospechosos, solución) según terminan, y la UI las
+    recoge en cada rerun con `apply_case_job()`.
 
-    # Delete images from previous games
-    _clean_generated_images()
-    _clean_artifacts()
+    Arranca ya en la intro; la sesión lo mantiene vivo con `touch()` y un
+    vigilante lo cancela si deja de recibir latidos (pestaña cerrada).
 
+    Cada task aceptada queda en un checkpoint con el `game_id` de la partida:
+    pasar el mismo `game_id` a un job nuevo reanuda desde la que falte, y
+    `portraits_done` le da los retratos que esa partida ya tiene en disco.
     """
-    Usa la Crew para generar escena y sospechosos.
-    Busca las imágenes directamente en el disco.
-    """
-    base_case = {
-        "victim": "Unknown Victim",
-        "victim_role": "Unknown role",
-        "time": "Sometime past midnight",
-        "place": "An almost empty tech office",
-        "cause": "Suspicious accident with smart equipment",
-        "context": "A storm hits the city. Backup power keeps the systems barely alive."
-    }
-
-    game_state = json.dumps(base_case, ensure_ascii=False)
-    player_action = "We are starting the game. Design the opening scene and the full cast of suspects."
-
-    crew_inputs = {
-        "topic": CREW_TOPIC,
-        "current_year": str(datetime.now().year),
-        "game_state": game_state,
-        "player_action": player_action,
-    }
-
-    try:
-        crew = Cluedogenai().setup_crew()
-    except Exception as e:
-        raise RuntimeError("setup_crew() crashed:\n" + traceback.format_exc()) from e
 
-    try:
-        result = crew.kickoff(inputs=crew_inputs)
-    except Exception as e:
-        raise RuntimeError("crew.kickoff() crashed:\n" + traceback.format_exc()) from e
-
-
-    def _read_json_artifact(rel_path: str, required_key: str) -> Optional[dict]:
-        abs_path = os.path.join(CURRENT_DIR, rel_path)
-        if not os.path.exists(abs_path):
-            return None
-
-        with open(abs_path, "r", encoding="utf-8") as f:
-            txt = f.read().strip()
-
-        # 1) Intento directo: el archivo es JSON puro
+    def __init__(self, game_id: Optional[str] = None, portraits_done: Optional[Dict[str, str]] = None) -> None:
+        self.game_id = game_id or new_game_id()
+        self.portraits_done = dict(portraits_done or {})
+        self.checkpoint = CaseCheckpoint(self.game_id) if checkpoints_enabled() else None
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self.last_seen = time.monotonic()
+        self.status = "pending"          # pending | running | done | failed | cancelled
+        self.error = ""
+        self.version = 0                 # sube cada vez que llega una pieza nueva
+        self.parts: Dict[str, Any] = {}  # scene_blueprint / characters / suspect_images / solution
+        self.bundle: Optional[Dict] = None
+        self.thread: Optional[threading.Thread] = None
+        self.portraits: Optional[PortraitQueue] = None  # arranca en cuanto hay sospechosos
+
+    def start(self) -> "CaseGenerationJob":
+        with self._lock:
+            if self.thread is not None:
+                return self
+            self.status = "running"
+            self.thread = threading.Thread(target=self._run, name="case-generation", daemon=True)
+        self.thread.start()
+        threading.Thread(target=self._watchdog, name="case-watchdog", daemon=True).start()
+        return self
+
+    def touch(self) -> None:
+        """Latido de la sesión: el jugador sigue ahí."""
+        self.last_seen = time.monotonic()
+
+    def _busy(self) -> bool:
+        return self.status == "running" or (self.portraits is not None and self.portraits.pending())
+
+    def _watchdog(self) -> None:
+        while not self._cancelled.wait(WATCHDOG_INTERVAL_SECONDS) and self._busy():
+            idle = time.monotonic() - self.last_seen
+            if idle > ABANDON_SECONDS:
+                print(f"[CASE] no heartbeat for {idle:.0f}s; player left, cancelling generation")
+                self.cancel()
+
+    def _on_task_done(self, task_name: str, parsed: Optional[dict]) -> None:
+        key = SETUP_TASK_ARTIFACTS.get(task_name, (None,))[0]
+        if key is None or parsed is None:
+            return
+        with self._lock:
+            self.parts[key] = parsed
+            self.version += 1
+        print(f"[CASE] {task_name} ready (v{self.version})")
+        if key == "characters":
+            self._start_portraits(parsed)
+
+    def _start_portraits(self, characters: Optional[dict]) -> None:
+        suspects = (characters or {}).get("suspects") or []
+        with self._lock:
+            if self.portraits is not None or not suspects or self.cancelled:
+                return
+            self.portraits = PortraitQueue(suspects, game_id=self.game_id, done=self.portraits_done)
+        self.portraits.start()
+
+    def cancel(self) -> None:
+        """La partida se abandona: ni más tasks ni más retratos para nadie."""
+        self._cancelled.set()
+        if self.portraits is not None:
+            self.portraits.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def _run(self) -> None:
         try:
-            obj = json.loads(txt)
-            if isinstance(obj, dict) and required_key in obj:
-                return obj
-        except Exception:
-            pass
-
-        # 2) Fallback: buscar el primer objeto JSON embebido
-        return _extract_json_object_with_key(txt, required_key)
-
-
-    # después del kickoff:
-    scene_blueprint_json = _read_json_artifact("artifacts/scene_blueprint.json", "scene_id")
-    characters_json      = _read_json_artifact("artifacts/characters.json", "suspects")
-    vision_json          = _read_json_artifact("artifacts/suspect_images.json", "suspect_images")
-    solution_json = _read_json_artifact("artifacts/solution.json", "truth_summary")
-    if solution_json:
-        st.session_state.solution = solution_json
-
-
-    # Save to session
-    if scene_blueprint_json: st.session_state.scene_blueprint = scene_blueprint_json
-    if characters_json: st.session_state.characters = characters_json
-
-    # --- ENRICH CASE DETAILS (from scene_blueprint.json) ---
-    if scene_blueprint_json:
-        # Location -> place
-        loc = scene_blueprint_json.get("location")
-        if loc:
-            base_case["place"] = loc
-
-        # Summary -> context
-        summary = scene_blueprint_json.get("summary") or ""
-        hidden_tension = scene_blueprint_json.get("hidden_tension") or ""
-        full_ctx = summary.strip()
-        if hidden_tension.strip():
-            base_case["hidden_tension"] = hidden_tension.strip()    
-        if full_ctx:
-            base_case["context"] = full_ctx
-
-
-        # Victim name from present_characters
-        vname = scene_blueprint_json.get("victim_name")
-        if isinstance(vname, str) and vname.strip():
-            base_case["victim"] = vname.strip()
-
-        # Victim role
-        vrole = scene_blueprint_json.get("victim_role")
-        if isinstance(vrole, str) and vrole.strip():
-            base_case["victim_role"] = vrole.strip()
-
-
-        t = scene_blueprint_json.get("time")
-        ht = scene_blueprint_json.get("hidden_tension")
-        if isinstance(ht, str) and ht.strip():
-            base_case["hidden_tension"] = ht.strip()
-        if isinstance(t, str) and t.strip():
-            base_case["time"] = t.strip()
-        elif summary:
-            low = summary.lower()
-            if "storm" in low or "violent storm" in low:
-                base_case["time"] = "Late night during a violent storm"
-            elif "midnight" in low:
-                base_case["time"] = "Just after midnight"
-
-
-        # Cause from visible clues (if available)
-        clues = scene_blueprint_json.get("visible_clues") or []
-        cause = None
-        joined = " ".join([str(c) for c in clues]).lower()
-        if "electrocution" in joined:
-            cause = "Severe electrocution near damaged server equipment"
-        elif "impact" in joined or "trauma" in joined:
-            cause = "Blunt impact trauma during a staged 'accident'"
-        if cause:
-            base_case["cause"] = cause
-
-    # --- PROCESS SUSPECTS & FIND IMAGES ---
-    if not characters_json or "suspects" not in characters_json:
-        # Fallback: intenta extraer characters_json desde result/tasks_output o str(result)
-        tasks_out = getattr(result, "tasks_output", None)
-        if isinstance(tasks_out, list):
-            for t in tasks_out:
-                raw = _safe_get_task_raw(t) or ""
-                obj = _extract_json_object_with_key(raw, "suspects")
-                if obj:
-                    characters_json = obj
-                    break
-
-
-
-
-        if not characters_json or "suspects" not in characters_json:
-            # Último fallback: parsear el string completo del result
-            obj = _extract_json_object_with_key(str(result), "suspects")
-            if obj:
-                characters_json = obj
-
-
-    if not characters_json or "suspects" not in characters_json:
-        raise RuntimeError("Invalid characters JSON")
-
-    suspects_raw = characters_json["suspects"]
-
-    # 1) Guilty
-    guilty_name = characters_json.get("guilty_name")
-    if not guilty_name:
-        for s in suspects_raw:
-            if s.get("guilty") is True:
-                guilty_name = s.get("name")
-                break
-
-            
-
-    # 2) Vision output (preferir mapping exacto de suspect_images)
-    vision_images = {}
-    if isinstance(vision_json, dict):
-        vision_images = vision_json.get("suspect_images") or {}
-
-    # Fallback: si no hay artifacts, intentar sacar suspect_images del result final
-    if not vision_images:
-        obj = _extract_json_object_with_key(str(result), "suspect_images")
-        if obj and isinstance(obj.get("suspect_images"), dict):
-            vision_images = obj.get("suspect_images") or {}
-
-    # 3) Scan folder como fallback final (si tampoco vino mapping)
-    images_dir_abs = os.path.join(SRC_PATH, "cluedogenai", "generated_images")
-    available_files = os.listdir(images_dir_abs) if os.path.isdir(images_dir_abs) else []
-    print(f"📂 Scanning for images in: {images_dir_abs}")
-    print(f"📂 Files found: {available_files}")
-
-    suspects: List[Dict] = []
-
-    # Rastrear imágenes ya asignadas para evitar repetir la misma imagen en dos sospechosos
-    assigned_images = set()
-
-    for s in suspects_raw:
-        name = s.get("name", "Unknown")
-
-        # 1. Definir base del sospechoso
-        suspect_dict = {
-            "name": name,
-            "role": s.get("role", ""),
-            "age": s.get("age"),
-            "personality": s.get("personality", ""),
-            "alibi": s.get("alibi", ""),
-            "secret": s.get("secret_motivation", ""),
-            "guilty": (name == guilty_name),
-            "image_path": None  # <--- IMPORTANTE: Empezamos siempre como None
-        }
-
-        # 2. Intentar buscar imagen
-        found_path = None
-
-        # A) Intentar vía JSON directo (output de la crew)
-        img_candidate = vision_images.get(name)
-        if img_candidate:
-            # Validar que el archivo existe físicamente (por si hubo error 429 al crearlo)
-            abs_path = os.path.join(CURRENT_DIR, img_candidate)
-            if os.path.exists(abs_path) and abs_path not in assigned_images:
-                found_path = img_candidate
-                print(f"✅ Image Linked via JSON: {name} -> {found_path}")
-
-        # B) Fallback: Escanear carpeta si no se encontró en JSON
-        if not found_path:
-            safe_name_prefix = str(name).replace(" ", "_")
-            # Buscamos en los archivos disponibles
-            for fname in available_files:
-                # Verificamos prefijo y que no sea una imagen ya usada
-                f_abs = os.path.join(images_dir_abs, fname)
-                if (fname.lower().startswith(safe_name_prefix.lower()) 
-                    and fname.lower().endswith(".png")
-                    and f_abs not in assigned_images):
-                    
-                    found_path = os.path.join("src", "cluedogenai", "generated_images", fname)
-                    print(f"✅ Image Linked via Scan: {name} -> {found_path}")
-                    break
-
-        # 3. Asignar imagen si se encontró
-        if found_path:
-            suspect_dict["image_path"] = found_path
-            # Marcamos esta ruta absoluta como usada para que nadie más la coja
-            abs_p = os.path.join(CURRENT_DIR, found_path)
-            assigned_images.add(abs_p)
-        else:
-            print(f"❌ No image found for: {name} (Quota exceeded or generation failed)")
-
-        suspects.append(suspect_dict)
-
-    case = dict(base_case)
-    case["suspects"] = suspects
-    case["guilty_name"] = guilty_name
-
-    return case
-
+            bundle = generate_case_with_crew(
+                on_task_done=self._on_task_done, cancelled=self._cancelled, checkpoint=self.checkpoint
+            )
+            if self.cancelled:
+                raise CaseGenerationCancelled("case generation cancelled")
+            with self._lock:
+                self.bundle = bundle
+                self.status = "done"
+                self.version += 1
+            # Por si el callback de define_characters no llegó a parsear el JSON
+            self._start_portraits(bundle.get("characters"))
+        except CaseGenerationCancelled as e:
+            print(f"[CASE] {e}")
+            with self._lock:
+                self.status = "cancelled"
+                self.version += 1
+        except Exception as e:
+            with self._lock:
+                self.error = str(e)
+                self.status = "failed"
+                self.version += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "status": self.status,
+                "error": self.error,
+                "version": self.version,
+                "parts": dict(self.parts),
+                "bundle": self.bundle,
+            }
 
 
 def call_crew_for_answer(
@@ -445,14 +278,21 @@ def call_crew_for_answer(
     suspect_name: str,
     history: List[Dict],
     question: str,
+    *,
+    scene_blueprint: Optional[dict] = None,
+    characters: Optional[dict] = None,
+    memory: Optional[Dict] = None,
+    priority: Priority = Priority.INTERACTIVE,
 ) -> dict:
     """
     Usa la Crew para generar la respuesta del sospechoso.
+    Lo que no se pase explícitamente se lee de session_state; desde un hilo
+    (pre-respuestas) hay que pasarlo todo.
     """
-    user_prompt = build_user_prompt(suspect_name, history, question)
-
-    scene_blueprint = st.session_state.get("scene_blueprint")
-    characters = st.session_state.get("characters")
+    if scene_blueprint is None:
+        scene_blueprint = st.session_state.get("scene_blueprint")
+    if characters is None:
+        characters = st.session_state.get("characters")
 
     safe_scene_blueprint = sanitize_scene_blueprint_for_dialogue(scene_blueprint, suspect_name)
     safe_characters = sanitize_characters_for_dialogue(
@@ -461,40 +301,62 @@ def call_crew_for_answer(
         redact_other_secrets=True,   # <- set False if you WANT suspects to know others' secrets (usually no)
     )
 
+    # Vista "dialogue": solo los campos que usa el diálogo (sin físico, ids ni perfiles ajenos)
+    blueprint_view = project_blueprint(safe_scene_blueprint, "dialogue")
+    characters_view = project_characters(safe_characters, "dialogue", active_suspect=suspect_name)
+
+    # Con recuperación: fijo solo "dialogue_core"; el resto del caso y los turnos antiguos, top-k por pregunta
+    notes = None
+    if retrieval_enabled():
+        try:
+            index = get_index(case_id(scene_blueprint, characters), suspect_name, blueprint_view, characters_view)
+            notes = index.search(question, history[:-1], retrieval_k())
+            blueprint_view = project_blueprint(safe_scene_blueprint, "dialogue_core")
+            characters_view = project_characters(safe_characters, "dialogue_core", active_suspect=suspect_name)
+        except Exception as e:
+            print(f"[RETRIEVAL] falling back to full dialogue views: {e}")
+            notes = None
+
+    user_prompt = build_user_prompt(suspect_name, history, question, memory=memory, notes=notes)
+
+    blueprint_txt = compact_json(blueprint_view) if blueprint_view else ""
+    characters_txt = compact_json(characters_view) if characters_view.get("suspects") else ""
+    print("[PROMPT] dialogue projection: " + format_report([
+        projection_report("scene_blueprint", safe_scene_blueprint, blueprint_txt),
+        projection_report("characters", safe_characters, characters_txt),
+    ]))
+
     crew_inputs = {
         "topic": CREW_TOPIC,
         "current_year": str(datetime.now().year),
-        "game_state": json.dumps(
+        "game_state": compact_json(
             {
                 "victim": case.get("victim"),
                 "time": case.get("time"),
                 "place": case.get("place"),
                 "cause": case.get("cause"),
-                # optional: shorten this to avoid duplication; scene_blueprint.summary already has it
-                "context": "",  
                 "active_suspect": suspect_name,
-            },
-            ensure_ascii=False
+            }
         ),
         "player_action": user_prompt,
-        "scene_blueprint": json.dumps(safe_scene_blueprint, ensure_ascii=False) if safe_scene_blueprint else "",
-        "characters": json.dumps(safe_characters, ensure_ascii=False) if safe_characters else "",
+        "scene_blueprint": blueprint_txt,
+        "characters": characters_txt,
     }
 
 
     try:
-        crew = Cluedogenai().dialogue_crew()
-        result = crew.kickoff(inputs=crew_inputs)
+        # Turno interactivo: pasa por delante de setup/background en la cola de cuota
+        result = kickoff_with_fallback("dialogue_crew", crew_inputs, priority)
 
         tasks_out = getattr(result, "tasks_output", None) or getattr(result, "raw", None)
         data = None
 
         if isinstance(tasks_out, list):
             for t in tasks_out:
-                raw = _safe_get_task_raw(t)
+                raw = safe_get_task_raw(t)
                 if not raw:
                     continue
-                candidate = _extract_json_object_with_key(raw, "spoken_text")
+                candidate = extract_json_object_with_key(raw, "spoken_text")
                 if candidate:
                     data = candidate
                     break
@@ -503,42 +365,43 @@ def call_crew_for_answer(
         elif isinstance(tasks_out, dict):
             t = tasks_out.get("generate_suspect_dialogue")
             if t is not None:
-                raw = _safe_get_task_raw(t)
-                data = _extract_json_object_with_key(raw, "spoken_text")
+                raw = safe_get_task_raw(t)
+                data = extract_json_object_with_key(raw, "spoken_text")
 
 
+        # Solo nos quedamos con lo que usa handle_question_submit (inner_thoughts nunca se muestra)
         if isinstance(data, dict):
             return {
                 "spoken_text": (data.get("spoken_text") or data.get("answer") or data.get("text") or "").strip(),
-                "inner_thoughts": (data.get("inner_thoughts") or "").strip(),
                 "revealed_facts": data.get("revealed_facts") or [],
                 "implied_clues": data.get("implied_clues") or [],
             }
 
         raw_fallback = str(result)
-        data_fb = _extract_json_object_with_key(raw_fallback, "spoken_text")
+        data_fb = extract_json_object_with_key(raw_fallback, "spoken_text")
         if isinstance(data_fb, dict):
             spoken_fb = data_fb.get("spoken_text") or data_fb.get("answer") or data_fb.get("text")
             if spoken_fb:
-                return {"spoken_text": spoken_fb, "inner_thoughts": "", "revealed_facts": [], "implied_clues": []}
+                return {"spoken_text": spoken_fb, "revealed_facts": [], "implied_clues": []}
 
         answer_text = raw_fallback.strip()
         if len(answer_text) > 400:
             answer_text = answer_text[:400] + "..."
-        return {"spoken_text": answer_text, "inner_thoughts": "", "revealed_facts": [], "implied_clues": []}
+        return {"spoken_text": answer_text, "revealed_facts": [], "implied_clues": []}
 
     except Exception as e:
         msg = str(e)
-        if "429" in msg or "RESOURCE_EXHAUSTED" in msg or "Quota exceeded" in msg:
+        print(f"[DIALOGUE] kickoff failed: {msg[:200]}")
+        if is_quota_error(msg):
             return {
                 "spoken_text": (
                     "The overhead lights flicker and the network icon turns red. "
                     "«Systems are throttled… you won’t get more out of me right now,» "
                     "the suspect says, dodging your question."
                 ),
-                "inner_thoughts": "The system is throttled; I should stall and stay vague.",
                 "revealed_facts": [],
                 "implied_clues": ["System throttling occurred during interrogation (possible API quota)."],
+                "degraded": True,
             }
 
         return {
@@ -546,9 +409,9 @@ def call_crew_for_answer(
                 "The suspect just stares back at you. "
                 "Something in the system glitched and they refuse to answer."
             ),
-            "inner_thoughts": f"Unexpected error: {msg[:120]}",
             "revealed_facts": [],
             "implied_clues": [],
+            "degraded": True,
         }
 
 
@@ -694,39 +557,377 @@ def init_music_state_local() -> None:
     st.session_state._sfx_key = None
 
 
-def init_game_state() -> None:
-    if "case" in st.session_state:
+CASE_POLL_SECONDS = 1.5
+HEARTBEAT_SECONDS = 10
+WATCHDOG_INTERVAL_SECONDS = 5
+# Sin latidos durante este tiempo se da la sesión por abandonada (holgado: los
+# navegadores espacian los timers de las pestañas en segundo plano)
+ABANDON_SECONDS = float(os.getenv("CLUEDO_ABANDON_SECONDS", "180"))
+
+
+def _start_play(case: Dict) -> None:
+    """Primer punto consistente del caso: sospechosos + culpable -> ya se puede interrogar."""
+    st.session_state.case = case
+    st.session_state.guilty_name = case["guilty_name"]
+    st.session_state.histories = {s["name"]: [] for s in case["suspects"]}
+    st.session_state.remaining_questions = TOTAL_QUESTIONS
+    st.session_state.game_over = False
+    st.session_state.accused = None
+    st.session_state.outcome = None
+    st.session_state.selected_suspect = case["suspects"][0]["name"]
+    st.session_state.accuse_choice = case["suspects"][0]["name"]
+    st.session_state.suspect_memory = {s["name"]: {"revealed_facts": [], "implied_clues": []} for s in case["suspects"]}
+    st.session_state.crew_failed = False
+    st.session_state.crew_error = ""
+    st.session_state.case_stage = "playable"
+    # En la URL: tras un reinicio o una reconexión, la sesión nueva la restaura del store
+    if st.session_state.get("game_id"):
+        st.query_params["game"] = st.session_state.game_id
+
+
+def _fail_game(error: str) -> None:
+    st.session_state.crew_failed = True
+    st.session_state.crew_error = f"Failed to generate the case with CrewAI: {error}"
+    st.session_state.case = {}
+    st.session_state.histories = {}
+    st.session_state.remaining_questions = 0
+    st.session_state.game_over = True
+    st.session_state.accused = None
+    st.session_state.outcome = None
+    st.session_state.selected_suspect = None
+    st.session_state.accuse_choice = None
+    st.session_state.case_stage = "failed"
+
+
+def _portrait_queue() -> Optional[PortraitQueue]:
+    """La cola del job o, en una partida restaurada ya completa, la de los retratos que faltaban."""
+    job = st.session_state.get("case_job")
+    if job is not None:
+        return job.portraits
+    return st.session_state.get("portrait_queue")
+
+
+def _portrait_version() -> int:
+    portraits = _portrait_queue()
+    return portraits.version if portraits is not None else -1
+
+
+def _refresh_portraits(case: Dict, portrait_paths: Optional[Dict] = None) -> None:
+    """Enlaza los retratos que la PortraitQueue haya terminado desde el último rerun."""
+    assigned = {
+        os.path.join(CURRENT_DIR, s["image_path"]) for s in case.get("suspects", []) if s.get("image_path")
+    }
+    for s in case.get("suspects", []):
+        if s.get("image_path"):
+            continue
+        found = find_suspect_image(s["name"], portrait_paths, exclude=assigned)
+        if found:
+            s["image_path"] = found
+            assigned.add(os.path.join(CURRENT_DIR, found))
+
+
+def sync_portraits(portraits: Optional[PortraitQueue]) -> None:
+    """Pasa el foco del jugador a la cola de retratos y enlaza los que ya estén listos."""
+    if portraits is None:
         return
+    portraits.focus(st.session_state.get("selected_suspect"))
+    changed = portraits.version != st.session_state.get("_portrait_version", -1)
+    st.session_state._portrait_version = portraits.version
+    case = st.session_state.get("case") or {}
+    if case.get("suspects"):
+        _refresh_portraits(case, portraits.paths())
+        if changed:
+            _persist_case()
 
-    try:
-        case = generate_case_with_crew()
+
+def portrait_status(name: str) -> Optional[str]:
+    portraits = _portrait_queue()
+    return portraits.status(name) if portraits is not None else None
+
+
+def apply_case_job(job: CaseGenerationJob) -> None:
+    """Vuelca en session_state lo que el job de generación tenga hasta ahora."""
+    snap = job.snapshot()
+    st.session_state._case_job_version = snap["version"]
+
+    if snap["status"] == "failed":
+        _fail_game(snap["error"])
+        return
+
+    bundle = snap["bundle"]
+    parts = snap["parts"]
+    if bundle:
+        parts = {**parts, **{k: v for k, v in bundle.items() if k != "case" and v}}
+
+    if parts.get("scene_blueprint"):
+        st.session_state.scene_blueprint = parts["scene_blueprint"]
+    if parts.get("characters"):
+        st.session_state.characters = parts["characters"]
+    if parts.get("solution"):
+        st.session_state.solution = parts["solution"]
+
+    stage = st.session_state.get("case_stage")
+
+    if bundle:
+        case = bundle["case"]
+        if stage != "playable":
+            _start_play(case)
+        else:
+            # Ya se está jugando: conservamos historial/memoria, solo actualizamos el caso
+            st.session_state.case = case
+        st.session_state.case_stage = "complete"
+        _persist_case()
+        return
+
+    if stage == "playable":
+        return
+
+    characters = parts.get("characters")
+    guilty_name = find_guilty_name(characters) if characters else None
+    case = build_base_case(parts.get("scene_blueprint"))
+    if characters and guilty_name and characters.get("suspects"):
+        case["suspects"] = build_suspects(characters, guilty_name)
+        case["guilty_name"] = guilty_name
+        _start_play(case)
+        _persist_case()
+    else:
+        case["suspects"] = []
         st.session_state.case = case
-        st.session_state.guilty_name = case["guilty_name"]
-        st.session_state.histories = {s["name"]: [] for s in case["suspects"]}
-        st.session_state.remaining_questions = TOTAL_QUESTIONS
-        st.session_state.game_over = False
-        st.session_state.accused = None
-        st.session_state.outcome = None
-        st.session_state.selected_suspect = case["suspects"][0]["name"]
-        st.session_state.accuse_choice = case["suspects"][0]["name"]
-        st.session_state.suspect_memory = {s["name"]: {"revealed_facts": [], "implied_clues": []} for s in case["suspects"]}
-        st.session_state.crew_failed = False
-        st.session_state.crew_error = ""
+        st.session_state.case_stage = "generating"
+
+
+def start_pre_answers() -> None:
+    """
+    Con CLUEDO_SPECULATIVE=1, en cuanto se puede interrogar se encolan en
+    BACKGROUND las respuestas a las preguntas de apertura de cada sospechoso.
+    """
+    if not speculative_enabled() or "pre_answers" in st.session_state:
+        return
+    if st.session_state.get("case_stage") not in ("playable", "complete"):
+        return
+    case = st.session_state.case
+    scene_blueprint = st.session_state.get("scene_blueprint")
+    characters = st.session_state.get("characters")
+    if not case.get("suspects") or not scene_blueprint or not characters:
+        return
+
+    def _answer(suspect_name: str, question: str) -> dict:
+        out = call_crew_for_answer(
+            case, suspect_name, [], question,
+            scene_blueprint=scene_blueprint,
+            characters=characters,
+            memory={"revealed_facts": [], "implied_clues": []},
+            priority=Priority.BACKGROUND,
+        )
+        return {} if out.get("degraded") else out
+
+    try:
+        bank = PreAnswerBank([s["name"] for s in case["suspects"]], _answer)
+    except Exception as e:
+        print(f"[SPECULATIVE] disabled: {e}")
+        st.session_state.pre_answers = None
+        return
+    st.session_state.pre_answers = bank.start()
+
+
+def _persist_case() -> None:
+    """Guarda el caso (y sus piezas) de esta partida; solo en transiciones, no en cada rerun."""
+    store, game_id = get_game_store(), st.session_state.get("game_id")
+    if store is None or not game_id:
+        return
+    try:
+        store.save_case(
+            game_id,
+            stage=st.session_state.get("case_stage", "playable"),
+            case=st.session_state.case,
+            scene_blueprint=st.session_state.get("scene_blueprint"),
+            characters=st.session_state.get("characters"),
+            solution=st.session_state.get("solution"),
+            remaining=st.session_state.get("remaining_questions", TOTAL_QUESTIONS),
+        )
+    except Exception as e:
+        print(f"[STORE] could not save game {game_id}: {e}")
+
+
+def _persist_turn(suspect_name: str, history: List[Dict]) -> None:
+    """Solo el turno nuevo: un INSERT, no la partida entera."""
+    store, game_id = get_game_store(), st.session_state.get("game_id")
+    if store is None or not game_id:
+        return
+    try:
+        store.append_turn(game_id, suspect_name, len(history) - 1, history[-1], st.session_state.remaining_questions)
     except Exception as e:
-        st.session_state.crew_failed = True
-        st.session_state.crew_error = f"Failed to generate the case with CrewAI: {e}"
-        st.session_state.case = {}
-        st.session_state.histories = {}
-        st.session_state.remaining_questions = 0
-        st.session_state.game_over = True
-        st.session_state.accused = None
-        st.session_state.outcome = None
-        st.session_state.selected_suspect = None
-        st.session_state.accuse_choice = None
+        print(f"[STORE] could not save turn of {game_id}: {e}")
+
+
+def _persist_outcome() -> None:
+    store, game_id = get_game_store(), st.session_state.get("game_id")
+    if store is None or not game_id:
+        return
+    try:
+        store.save_outcome(game_id, st.session_state.outcome)
+    except Exception as e:
+        print(f"[STORE] could not save outcome of {game_id}: {e}")
+
+
+def restore_game() -> bool:
+    """
+    Sesión nueva con ?game=<id> (reinicio del servidor, redeploy, reconexión):
+    la partida sale del store sin ninguna llamada al LLM. Si se guardó antes
+    de tener la solución, el job la termina desde los checkpoints.
+    """
+    game_id = st.query_params.get("game")
+    store = get_game_store()
+    if not game_id or store is None:
+        return False
+    try:
+        saved = store.load(game_id)
+    except Exception as e:
+        print(f"[STORE] could not load game {game_id}: {e}")
+        return False
+    if saved is None or not saved["case"].get("suspects"):
+        return False
+
+    case = saved["case"]
+    first = case["suspects"][0]["name"]
+    st.session_state.game_id = game_id
+    for key in ("case", "scene_blueprint", "characters", "histories", "suspect_memory",
+                "remaining_questions", "game_over", "outcome"):
+        st.session_state[key] = saved[key]
+    if saved["solution"]:
+        st.session_state.solution = saved["solution"]
+    st.session_state.guilty_name = case.get("guilty_name")
+    st.session_state.accused = (saved["outcome"] or {}).get("accused")
+    st.session_state.selected_suspect = first
+    st.session_state.accuse_choice = first
+    st.session_state.crew_failed = False
+    st.session_state.crew_error = ""
+
+    # Los retratos que sigan en disco se reutilizan; solo se generan los que falten
+    on_disk: Dict[str, str] = {}
+    for s in case["suspects"]:
+        img_rel = s.get("image_path")
+        if img_rel and os.path.exists(os.path.join(CURRENT_DIR, img_rel)):
+            on_disk[s["name"]] = img_rel
+        else:
+            s.pop("image_path", None)
+
+    # Sin checkpoints no se puede terminar la misma solución: se juega sin ella
+    resumable = saved["stage"] != "complete" and CaseCheckpoint(game_id).inputs() is not None
+    st.session_state.case_stage = "playable" if resumable else "complete"
+    if resumable:
+        st.session_state.resume_game_id = game_id
+        st.session_state.resume_portraits = on_disk
+    elif len(on_disk) < len(case["suspects"]):
+        suspects = (saved["characters"] or {}).get("suspects") or []
+        st.session_state.portrait_queue = PortraitQueue(suspects, game_id=game_id, done=on_disk).start()
+    print(f"[STORE] restored game {game_id} ({saved['stage']}, {saved['remaining_questions']} questions left)")
+    return True
+
+
+def case_needs_generation() -> bool:
+    """False solo para una partida restaurada del store ya completa: no hay job ni nada que generar."""
+    return not (st.session_state.get("case_stage") == "complete" and st.session_state.get("case_job") is None)
+
+
+def ensure_case_job() -> CaseGenerationJob:
+    """
+    El job de generación de esta sesión: lo arranca la intro nada más abrirse
+    y START GAME se une a él. Solo se crea otro si el anterior se canceló.
+    Tras un fallo, `resume_game_id` hace que el nuevo siga la misma partida.
+    """
+    job = st.session_state.get("case_job")
+    if job is None or job.cancelled:
+        job = CaseGenerationJob(
+            st.session_state.pop("resume_game_id", None),
+            portraits_done=st.session_state.pop("resume_portraits", None),
+        ).start()
+        st.session_state.case_job = job
+        st.session_state.game_id = job.game_id
+        if retrieval_enabled():
+            warm_up()
+    job.touch()
+    return job
+
+
+@st.fragment(run_every=HEARTBEAT_SECONDS)
+def case_job_heartbeat() -> None:
+    """Latido desde la intro (que no sondea): si la pestaña se cierra, el job se cancela solo."""
+    job = st.session_state.get("case_job")
+    if job is not None:
+        job.touch()
+
+
+def init_game_state() -> None:
+    if "case_stage" not in st.session_state:
+        restore_game()
+    if st.session_state.get("case_stage") == "failed":
+        return
+    if not case_needs_generation():
+        sync_portraits(_portrait_queue())
+        start_pre_answers()
+        return
+
+    job = ensure_case_job()
+    if st.session_state.get("case_stage") != "complete":
+        apply_case_job(job)
+    sync_portraits(job.portraits)
+    start_pre_answers()
+
+
+@st.fragment(run_every=CASE_POLL_SECONDS)
+def _watch_case_job() -> None:
+    """Sondeo barato: solo provoca un rerun completo cuando llega una pieza nueva del caso o un retrato."""
+    job = st.session_state.get("case_job")
+    if st.session_state.get("case_stage") == "failed" or (job is None and _portrait_queue() is None):
+        return
+    if job is not None:
+        job.touch()
+    if ((job is not None and job.version != st.session_state.get("_case_job_version"))
+            or _portrait_version() != st.session_state.get("_portrait_version", -1)):
+        st.rerun()
+
+
+def case_job_active() -> bool:
+    """¿Queda algo por llegar (piezas del caso o retratos)? Solo entonces se sondea."""
+    job = st.session_state.get("case_job")
+    if st.session_state.get("case_stage") == "failed":
+        return False
+    if job is not None and st.session_state.get("case_stage") != "complete":
+        return True
+    portraits = _portrait_queue()
+    return portraits is not None and portraits.pending()
 
 
 def reset_game() -> None:
+    job = st.session_state.get("case_job")
+    if job is not None:
+        job.cancel()
+        if job.portraits is not None:
+            # Solo los retratos de esta partida: generated_images es de todas las sesiones
+            job.portraits.discard()
+    restored = st.session_state.get("portrait_queue")
+    if restored is not None:
+        restored.cancel()
+    bank = st.session_state.get("pre_answers")
+    if bank is not None:
+        bank.cancel()
+    st.session_state.clear()
+    st.query_params.pop("game", None)
+    st.rerun()
+
+
+def retry_case_generation() -> None:
+    """Reintento tras un fallo: misma partida, se reanuda desde la task que falló."""
+    job = st.session_state.get("case_job")
+    game_id = job.game_id if job is not None and job.checkpoint is not None else None
+    portraits_done = job.portraits.paths() if game_id and job.portraits is not None else {}
+    if job is not None:
+        job.cancel()
     st.session_state.clear()
+    if game_id:
+        st.session_state.resume_game_id = game_id
+        st.session_state.resume_portraits = portraits_done
     st.rerun()
 
 
@@ -745,17 +946,30 @@ def _format_history_summary(hist: List[Dict], max_turns: int = MAX_TURNS_IN_SUMM
     return "\n".join(lines).strip()
 
 
-def build_user_prompt(suspect_name: str, history: List[Dict], question: str) -> str:
-    summary = _format_history_summary(history)
-    mem = st.session_state.get("suspect_memory", {}).get(suspect_name, {})
+def build_user_prompt(
+    suspect_name: str,
+    history: List[Dict],
+    question: str,
+    memory: Optional[Dict] = None,
+    notes: Optional[List[Tuple[str, str]]] = None,
+) -> str:
+    # Con notas recuperadas, el turno anterior basta como diálogo reciente: los viejos vienen en las notas
+    summary = _format_history_summary(history, max_turns=1 if notes is not None else MAX_TURNS_IN_SUMMARY)
+    mem = memory if memory is not None else st.session_state.get("suspect_memory", {}).get(suspect_name, {})
     facts = mem.get("revealed_facts", [])[:8]
     clues = mem.get("implied_clues", [])[:8]
     facts_txt = "\n".join([f"- {x}" for x in facts]) if facts else "- (none yet)"
     clues_txt = "\n".join([f"- {x}" for x in clues]) if clues else "- (none yet)"
-        
+    notes_txt = ""
+    if notes:
+        notes_txt = f"""
+RELEVANT CASE NOTES (retrieved for this question; earlier dialogue included):
+{format_notes(notes)}
+"""
+
     return f"""
 INTERROGATION TARGET: {suspect_name}
-
+{notes_txt}
 INVESTIGATION MEMORY (what you have already stated / implied):
 REVEALED FACTS:
 {facts_txt}
@@ -814,10 +1028,15 @@ def handle_question_submit(suspect_name: str, question: str, disabled: bool) ->
     st.session_state.remaining_questions -= 1
 
     with st.spinner(f"{suspect_name} is thinking…"):
-        out = call_crew_for_answer(case, suspect_name, history, q)
+        out = answer_question(case, suspect_name, history, q)
         answer = out.get("spoken_text", "")
 
 
+    if out.get("cached"):
+        # El interrogatorio está en el mismo punto: repetir la pregunta no gasta turno
+        st.session_state.remaining_questions += 1
+        st.toast(f"{suspect_name} already answered that.", icon="🔁")
+
     answer = unescape(answer or "")
     answer = _strip_html_tags(answer)
 
@@ -833,6 +1052,7 @@ def handle_question_submit(suspect_name: str, question: str, disabled: bool) ->
         for item in ic:
             if item and item not in mem["implied_clues"]:
                 mem["implied_clues"].append(item)
+    _persist_turn(suspect_name, history)
 
     try:
         trigger_question_sound_local()
@@ -843,6 +1063,32 @@ def handle_question_submit(suspect_name: str, question: str, disabled: bool) ->
         st.toast("No questions left. Time to accuse someone.", icon="⚖️")
 
 
+def answer_question(case: Dict, suspect_name: str, history: List[Dict], question: str) -> dict:
+    """
+    Caché de diálogo (mismo caso, sospechoso, pregunta y memoria: misma
+    respuesta, marcada "cached"), luego pre-respuesta especulativa y si no,
+    turno normal con la Crew.
+    """
+    cache = get_dialogue_cache()
+    memory = st.session_state.get("suspect_memory", {}).get(suspect_name)
+    key = cache.key(
+        case_id(st.session_state.get("scene_blueprint"), st.session_state.get("characters")),
+        suspect_name, question, memory,
+    )
+    out = cache.get(key, question)
+    if out is not None:
+        print(f"[CACHE] {suspect_name}: answered from cache ({cache.stats()})")
+        return {**out, "cached": True}
+
+    bank = st.session_state.get("pre_answers")
+    out = bank.take(suspect_name, question, history=history, memory=memory) if bank is not None else None
+    if out is None:
+        out = call_crew_for_answer(case, suspect_name, history, question)
+    if not out.get("degraded"):
+        cache.put(key, question, out)
+    return out
+
+
 def _generate_epilogue(case: Dict, accused_name: str, won: bool, guilty_name: str) -> str:
     if won:
         return (
@@ -914,6 +1160,7 @@ def handle_accusation(accused_name: str, disabled: bool) -> None:
         "epilogue": epilogue,
     }
     st.session_state.game_over = True
+    _persist_outcome()
 
 
 # =========================
@@ -929,9 +1176,21 @@ def bytes_to_data_url(b: bytes) -> Optional[str]:
         return None
 
 
+@st.fragment
+def render_music_controls() -> None:
+    """
+    Fragmento: botón de música + pista de fondo. Activar/desactivar la música
+    solo rerenderiza esto, y los reruns de otros fragmentos no tocan el <audio>.
+    """
+    with profiled_rerun(), profile_section("music_player"):
+        label = "🔊 Music on" if not st.session_state.music_enabled else "🔇 Music off"
+        st.button(label, on_click=toggle_music_enabled, use_container_width=True)
+        render_music_player_local()
+
+
 def render_music_player_local() -> None:
     """
-    Renderiza background y reproduce SFX usando autoplay nativo HTML.
+    Renderiza la música de fondo usando autoplay nativo HTML.
     """
     if not st.session_state.get("music_enabled", False):
         return
@@ -952,7 +1211,16 @@ def render_music_player_local() -> None:
         """
         st.markdown(html_bg, unsafe_allow_html=True)
 
-    # --- SFX AUDIO ---
+
+def render_pending_sfx() -> None:
+    """
+    Reproduce (una vez) el SFX pendiente. Se llama desde el fragmento que lo
+    disparó, para que suene sin tener que rerenderizar toda la página.
+    """
+    if not st.session_state.get("music_enabled", False):
+        st.session_state.last_sfx_bytes = None
+        return
+
     sfx_bytes = st.session_state.get("last_sfx_bytes")
     if sfx_bytes:
         sfx_data_url = bytes_to_data_url(sfx_bytes)
@@ -984,9 +1252,135 @@ def render_music_player_local() -> None:
 #  STREAMLIT RENDER
 # =========================
 
+@st.fragment
+def render_conversation_panel(suspect_name: str, disabled: bool, questions_slot) -> None:
+    """
+    Fragmento: conversación + input. Una pregunta nueva solo rerenderiza esta
+    caja (y el contador de preguntas de la cabecera vía `questions_slot`).
+    """
+    with profiled_rerun(), profile_section("interrogation"):
+        questions_slot.metric("Questions", st.session_state.remaining_questions)
+        render_conversation(suspect_name)
+
+        can_ask = (
+            (not st.session_state.game_over)
+            and (st.session_state.remaining_questions > 0)
+            and (not disabled)
+        )
+
+        if st.session_state.remaining_questions <= 0 and not st.session_state.game_over:
+            st.warning("You are out of questions. Make your accusation on the right.")
+
+        user_q = st.chat_input("Ask a question…", disabled=not can_ask)
+        if user_q is not None:
+            handle_question_submit(suspect_name, user_q, disabled=disabled)
+            st.rerun(scope="fragment")
+
+        render_pending_sfx()
+
+
+@st.fragment
+def render_accuse_panel(suspect_names: List[str], disabled: bool) -> None:
+    """Fragmento: cambiar la elección no rerenderiza el resto de la página."""
+    with profiled_rerun(), profile_section("accuse_panel"):
+        st.markdown("### Accuse")
+
+        accuse_disabled = disabled or st.session_state.game_over
+        st.selectbox(
+            "Accuse one suspect",
+            suspect_names,
+            key="accuse_choice",
+            disabled=accuse_disabled,
+        )
+
+        if st.button("⚖️ Accuse now", disabled=accuse_disabled, use_container_width=True):
+            handle_accusation(st.session_state.accuse_choice, disabled=disabled)
+            # Rerun completo: el fin de partida también bloquea el input de la conversación
+            st.rerun()
+
+        st.markdown("---")
+
+        # Resultado con scroll interno para no empujar la pantalla
+        with st.container(height=260, border=True):
+            if st.session_state.outcome:
+                out = st.session_state.outcome
+                if out["won"]:
+                    st.success(f"Correct. **{out['accused']}** is the murderer.")
+                else:
+                    st.error(
+                        f"Wrong. You accused **{out['accused']}** — "
+                        f"the real murderer was **{out['guilty']}**."
+                    )
+                st.write(out["epilogue"])
+            elif st.session_state.game_over:
+                st.info("Case closed. Reset to play again.")
+
+        render_pending_sfx()
+
+        with st.expander("Tips", expanded=False):
+            st.markdown(
+                """
+- Ask about **timestamps**, **locations**, and **what they touched**.
+- Look for **subtle contradictions**: wrong sequence, wrong room, wrong system.
+                """
+            )
+
+
 def render_game() -> None:
     """Dibuja todo el juego en Streamlit (full width, sin sidebar)."""
-    init_game_state()
+    # Opt-in: CLUEDO_PROFILE=1 o ?profile=1 -> un .prof + .json por rerun en profiles/
+    with profiled_rerun():
+        _render_game_body()
+
+
+def render_case_details(case: Dict) -> None:
+    st.markdown("### Case")
+    victim = escape(case.get("victim", "Unknown victim"))
+    victim_role = escape(case.get("victim_role", "Unknown role"))
+    time_ = escape(case.get("time", "Unknown time"))
+    place = escape(case.get("place", "Unknown place"))
+    cause = escape(case.get("cause", "Unknown cause"))
+    ctx = case.get("context", "") or ""
+
+    st.markdown(
+        f"""
+- **Victim:** {victim} — _{victim_role}_
+- **Time:** {time_}
+- **Place:** {place}
+- **Cause:** {cause}
+        """.strip()
+    )
+
+    # Context con scroll interno (no empuja la página)
+    with st.container(height=160, border=True):
+        st.caption(ctx)
+
+
+def _render_case_loading() -> None:
+    """Pantalla mientras no hay sospechosos: muestra la escena en cuanto llega el blueprint."""
+    st.markdown(
+        """
+        <div style="display:flex; align-items:baseline; gap:12px;">
+          <h1 style="margin:0;">AI Murder Mystery</h1>
+          <div style="opacity:0.75; font-size:14px;">The case file is being written…</div>
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
+    col_case, col_status = st.columns([1.15, 2.4], gap="small")
+    with col_case:
+        if st.session_state.get("scene_blueprint"):
+            render_case_details(st.session_state.case)
+        else:
+            st.info("🕯️ Securing the crime scene…")
+    with col_status:
+        st.info("🕵️ Rounding up the suspects… you can start interrogating as soon as they arrive.")
+    _watch_case_job()
+
+
+def _render_game_body() -> None:
+    with profile_section("init_game_state"):
+        init_game_state()
 
     crew_failed = st.session_state.get("crew_failed", False)
     disabled = crew_failed
@@ -1021,7 +1415,12 @@ def render_game() -> None:
             unsafe_allow_html=True,
         )
         st.error(st.session_state.get("crew_error", "Unknown error while calling CrewAI."))
-        st.button("🔄 Retry generating case", on_click=reset_game)
+        st.button("🔄 Retry generating case", on_click=retry_case_generation)
+        return
+
+    case_stage = st.session_state.get("case_stage")
+    if case_stage == "generating":
+        _render_case_loading()
         return
 
     # Inicializar música
@@ -1036,7 +1435,7 @@ def render_game() -> None:
     # HEADER compacto (1 fila)
     # =========================
     h1, h2, h3, h4 = st.columns([2.2, 0.9, 0.9, 0.9], gap="small")
-    with h1:
+    with h1, profile_section("header"):
         st.markdown(
             """
             <div style="display:flex; align-items:baseline; gap:12px;">
@@ -1048,16 +1447,15 @@ def render_game() -> None:
             """,
             unsafe_allow_html=True,
         )
-    with h2:
-        st.metric("Questions", st.session_state.remaining_questions)
+    with h2, profile_section("header"):
+        # st.empty: el fragmento de conversación lo actualiza sin rerun completo
+        questions_slot = st.empty()
+        questions_slot.metric("Questions", st.session_state.remaining_questions)
     with h3:
-        label = "🔊 Music on" if not st.session_state.music_enabled else "🔇 Music off"
-        st.button(label, on_click=toggle_music_enabled, use_container_width=True)
-    with h4:
+        render_music_controls()
+    with h4, profile_section("header"):
         st.button("🔄 New game", on_click=reset_game, use_container_width=True)
 
-    render_music_player_local()
-
     # =========================
     # LAYOUT PRINCIPAL: 3 columnas
     # =========================
@@ -1068,30 +1466,11 @@ def render_game() -> None:
     )
 
     # -------- LEFT: Case + Suspects en tabs (no crece en alto) --------
-    with col_case:
+    with col_case, profile_section("case_tabs"):
         tabs = st.tabs(["Case", "Suspects"])
 
         with tabs[0]:
-            st.markdown("### Case")
-            victim = escape(case.get("victim", "Unknown victim"))
-            victim_role = escape(case.get("victim_role", "Unknown role"))
-            time_ = escape(case.get("time", "Unknown time"))
-            place = escape(case.get("place", "Unknown place"))
-            cause = escape(case.get("cause", "Unknown cause"))
-            ctx = case.get("context", "") or ""
-
-            st.markdown(
-                f"""
-- **Victim:** {victim} — _{victim_role}_
-- **Time:** {time_}
-- **Place:** {place}
-- **Cause:** {cause}
-                """.strip()
-            )
-
-            # Context con scroll interno (no empuja la página)
-            with st.container(height=160, border=True):
-                st.caption(ctx)
+            render_case_details(case)
 
         with tabs[1]:
             st.markdown("### Suspects")
@@ -1103,7 +1482,7 @@ def render_game() -> None:
                         st.caption(f"**Alibi:** {s['alibi']}")
 
     # -------- CENTER: Interrogation --------
-    with col_interrogation:
+    with col_interrogation, profile_section("interrogation"):
         st.markdown("### Interrogation")
 
         selected = st.selectbox(
@@ -1140,79 +1519,41 @@ def render_game() -> None:
             
             if img_rel:
                 abs_path = img_rel if os.path.isabs(img_rel) else os.path.join(CURRENT_DIR, img_rel)
-                if os.path.exists(abs_path):
-                    st.image(abs_path, width=240)
+                # Variante WebP a tamaño de pantalla, desde el LRU en memoria (no el original)
+                img_bytes = portrait_bytes(abs_path, PORTRAIT_DISPLAY_WIDTH)
+                if img_bytes:
+                    st.image(img_bytes, width=PORTRAIT_DISPLAY_WIDTH)
                     image_found = True
             
             # FALLBACK: Si no se generó imagen (por error o filtro de seguridad)
             if not image_found:
-                # Usamos un servicio de placeholders con las iniciales del sospechoso
-                initials = "".join([n[0] for n in s['name'].split()[:2]]).upper()
-                # Un color gris oscuro misterioso (333333) con texto claro
-                placeholder_url = f"https://placehold.co/400x400/333333/DDDDDD/png?text={initials}&font=playfair-display"
+                # Avatar local con las iniciales (gris oscuro, texto claro), cacheado en memoria y disco
+                placeholder = placeholder_bytes(s["name"], PORTRAIT_DISPLAY_WIDTH)
                 
-                st.image(placeholder_url, width=240, caption="Identity obscured")
+                pending = portrait_status(s["name"]) in (None, "pending", "rendering") and case_job_active()
+                caption = "Portrait developing…" if pending else "Identity obscured"
+                if placeholder:
+                    st.image(placeholder, width=PORTRAIT_DISPLAY_WIDTH, caption=caption)
+                else:
+                    st.caption(caption)
                 # Opcional: Mostrar un mensaje pequeño explicando por qué
                 #st.caption("Image unavailable (Security redacted)")
 
         st.markdown("#### Conversation")
-        render_conversation(selected)
-
-        can_ask = (
-            (not st.session_state.game_over)
-            and (st.session_state.remaining_questions > 0)
-            and (not disabled)
-        )
-
-        if st.session_state.remaining_questions <= 0 and not st.session_state.game_over:
-            st.warning("You are out of questions. Make your accusation on the right.")
-
-        user_q = st.chat_input("Ask a question…", disabled=not can_ask)
-        if user_q is not None:
-            handle_question_submit(selected, user_q, disabled=disabled)
-            st.rerun()
+        render_conversation_panel(selected, disabled, questions_slot)
 
     # -------- RIGHT: Accuse & Outcome (compacto) --------
     with col_right:
-        st.markdown("### Accuse")
-
-        accuse_disabled = disabled or st.session_state.game_over
-        st.selectbox(
-            "Accuse one suspect",
-            suspect_names,
-            key="accuse_choice",
-            disabled=accuse_disabled,
-        )
-
-        if st.button("⚖️ Accuse now", disabled=accuse_disabled, use_container_width=True):
-            handle_accusation(st.session_state.accuse_choice, disabled=disabled)
-            st.rerun()
-
-        st.markdown("---")
+        if case_stage == "complete":
+            render_accuse_panel(suspect_names, disabled)
+        else:
+            # Sin solución todavía no se puede resolver una acusación
+            st.markdown("### Accuse")
+            st.info("⏳ The case file is still being completed. Keep interrogating — accusations open shortly.")
 
-        # Resultado con scroll interno para no empujar la pantalla
-        with st.container(height=260, border=True):
-            if st.session_state.outcome:
-                out = st.session_state.outcome
-                if out["won"]:
-                    st.success(f"Correct. **{out['accused']}** is the murderer.")
-                else:
-                    st.error(
-                        f"Wrong. You accused **{out['accused']}** — "
-                        f"the real murderer was **{out['guilty']}**."
-                    )
-                st.write(out["epilogue"])
-            elif st.session_state.game_over:
-                st.info("Case closed. Reset to play again.")
-            
-        with st.expander("Tips", expanded=False):
-            st.markdown(
-                """
-- Ask about **timestamps**, **locations**, and **what they touched**.
-- Look for **subtle contradictions**: wrong sequence, wrong room, wrong system.
-                """
-            )
- 
+    # Retratos o solución en camino: sondeo ligero hasta que esté todo
+    if case_job_active():
+        _watch_case_job()
 
 
 def main() -> None:
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+import_time.py
+
+Mide el coste de importación de la app con `python -X importtime`, en un
+proceso limpio por medida, para vigilar el arranque en frío de Streamlit y
+el primer pintado de la intro.
+
+Además comprueba que `intro_app` (y por tanto `app`) NO arrastra el stack
+pesado al importarse: crewAI, LiteLLM, google-genai y PIL se cargan tarde
+(warm_crew_stack() en la intro / primer uso). Si alguno aparece, sale con 1.
+
+Uso:
+  python benchmarks/import_time.py
+  python benchmarks/import_time.py --runs 5 --top 20
+  python benchmarks/import_time.py --update-baseline
+  python benchmarks/import_time.py --check            # falla si empeora > --tolerance
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_PATH = os.path.join(ROOT, "src")
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "import_time_baseline.json")
+
+# Lo que pinta la intro, y como referencia lo que se carga en segundo plano
+TARGETS = ("intro_app", "cluedogenai.crew")
+# Paquetes que no pueden estar en el import de la intro
+LAZY_PACKAGES = ("crewai", "litellm", "google.genai", "PIL")
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+def measure(module: str) -> Tuple[float, Dict[str, float], List[str]]:
+    """(ms acumulados de `module`, ms propios sumados por paquete raíz, módulos cargados)."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (SRC_PATH, ROOT, env.get("PYTHONPATH", "")) if p)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["?"]
+        raise RuntimeError(f"import {module} failed: {tail[0]}")
+
+    total_us = 0
+    by_package: Dict[str, float] = {}
+    loaded: List[str] = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        self_us, cumulative, name = int(m.group(1)), int(m.group(2)), m.group(3)
+        loaded.append(name)
+        root = name.split(".")[0]
+        by_package[root] = by_package.get(root, 0.0) + self_us / 1000
+        if name == module:
+            total_us = cumulative
+    return total_us / 1000, by_package, loaded
+
+
+def eager_heavy(loaded: List[str]) -> List[str]:
+    return sorted({
+        pkg for pkg in LAZY_PACKAGES for name in loaded
+        if name == pkg or name.startswith(pkg + ".")
+    })
+
+
+def main(runs: int, top: int, check: bool, update_baseline: bool, tolerance: float) -> int:
+    print("=== import time benchmark (python -X importtime) ===")
+    results: Dict[str, float] = {}
+    failed = False
+    for target in TARGETS:
+        try:
+            samples = [measure(target) for _ in range(runs)]
+        except RuntimeError as e:
+            print(f"{target}: {e}")
+            failed = True
+            continue
+        total = statistics.median(s[0] for s in samples)
+        results[target] = round(total, 1)
+        print(f"\n{target}: {total:.0f} ms (mediana de {runs})")
+
+        _, by_package, loaded = samples[0]
+        for name, ms in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]:
+            print(f"  {ms:>8.1f} ms  {name}")
+
+        if target == "intro_app":
+            heavy = eager_heavy(loaded)
+            if heavy:
+                print(f"  ✖ cargados al importar la intro (deberían ser tardíos): {', '.join(heavy)}")
+                failed = True
+            else:
+                print(f"  ✔ sin {', '.join(LAZY_PACKAGES)} en el arranque")
+
+    if update_baseline and not failed:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline guardado en {BASELINE_PATH}")
+
+    if check and not os.path.exists(BASELINE_PATH):
+        # Sin baseline no hay con qué comparar: un --check en verde aquí no diría nada
+        print(f"\n✖ no hay baseline en {BASELINE_PATH}; créalo con --update-baseline")
+        failed = True
+    elif check:
+        with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        for target, ms in results.items():
+            ref = baseline.get(target)
+            if ref and ms > ref * tolerance:
+                print(f"\n✖ {target}: {ms:.0f} ms > {tolerance:.2f} × baseline ({ref:.0f} ms)")
+                failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del tiempo de importación de la app.")
+    parser.add_argument("--runs", type=int, default=3, help="Procesos limpios por módulo (se usa la mediana).")
+    parser.add_argument("--top", type=int, default=12, help="Paquetes más caros a listar.")
+    parser.add_argument("--check", action="store_true", help="Comparar con benchmarks/import_time_baseline.json.")
+    parser.add_argument("--update-baseline", action="store_true", help="Guardar las medidas como baseline.")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="Con --check, factor sobre el baseline a partir del cual se falla.")
+    args = parser.parse_args()
+    sys.exit(main(args.runs, args.top, args.check, args.update_baseline, args.tolerance))
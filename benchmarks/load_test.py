@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+load_test.py
+
+Carga headless sobre app.py con `streamlit.testing.v1.AppTest`: N detectives
+simulados, C a la vez, juegan partidas completas (esperar el caso, preguntar,
+acusar) contra el backend simulado, para saber cuántos jugadores aguanta un
+proceso del servidor.
+
+Lo que se simula (cluedogenai.stub_backend, sleeps escalados con --time-scale):
+  - la generación del caso: las tres piezas llegan por on_task_done como con
+    la crew, cada partida con su propio caso (la caché de diálogo no se cruza);
+  - las respuestas de la dialogue_crew, a través del scheduler real;
+  - los retratos, también por el scheduler (BACKGROUND), sin escribir ficheros.
+Todo lo demás (reruns, session_state, store, caché, cola de retratos) es el
+código de verdad.
+
+Informe: sesiones/s, latencia por rerun (p50/p95/p99/max, por tipo), tiempo
+hasta poder interrogar, memoria por sesión (RSS) y tasa de errores.
+
+Uso:
+  python benchmarks/load_test.py
+  python benchmarks/load_test.py --sessions 40 --concurrency 20 --questions 10
+  python benchmarks/load_test.py --time-scale 0.1 --json load.json
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_PATH = os.path.join(ROOT, "src")
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+APP_PATH = os.path.join(ROOT, "app.py")
+
+# Lo que cambia por partida: cada sesión necesita un caso distinto
+SUSPECTS = (
+    ("Ada Voss", "Lead engineer", "Was rebooting the backup cluster in the basement."),
+    ("Bruno Hale", "Security chief", "Claims he was reviewing camera feeds in the control room."),
+    ("Clara Imre", "CFO", "Says she left the building at ten."),
+    ("Dmitri Roe", "Night janitor", "Was cleaning the third floor, alone."),
+)
+QUESTIONS = (
+    "Where were you when the lights went out?",
+    "Who had access to the server room tonight?",
+    "What was your relationship with the victim?",
+    "Why does the access log show your badge at 23:40?",
+    "Did you hear anything unusual during the storm?",
+    "Who benefits from the victim's death?",
+    "What were you arguing about last week?",
+    "Can anyone confirm your alibi?",
+    "What do you know about the missing hard drive?",
+    "Is there anything you want to tell me before I decide?",
+)
+
+
+# ---------- Backend simulado ----------
+
+def fixture_case(n: int) -> Dict[str, dict]:
+    """Blueprint, personajes y solución de la partida `n` (el culpable rota)."""
+    guilty = SUSPECTS[n % len(SUSPECTS)][0]
+    blueprint = {
+        "scene_id": f"load-{n}",
+        "location": "Helix Labs, 14th floor server room",
+        "time": "Just after midnight",
+        "victim_name": f"Victim #{n}",
+        "victim_role": "CTO",
+        "summary": "During a violent storm the CTO is found dead next to a rack of damaged servers.",
+        "hidden_tension": "The company is days away from an acquisition that not everyone wants.",
+        "visible_clues": ["Scorched power cable", "Badge reader log gap", "Wet footprints"],
+    }
+    characters = {
+        "guilty_name": guilty,
+        "suspects": [
+            {
+                "name": name,
+                "role": role,
+                "age": 30 + i * 7,
+                "personality": "Guarded, precise, quick to deflect.",
+                "alibi": alibi,
+                "secret_motivation": "Stands to lose everything if the acquisition goes through.",
+                "guilty": name == guilty,
+            }
+            for i, (name, role, alibi) in enumerate(SUSPECTS)
+        ],
+    }
+    solution = {
+        "truth_summary": f"{guilty} rigged the power cable and erased the badge log.",
+        "method": "Staged electrocution",
+        "cover_up": "Deleted twelve minutes of access logs.",
+        "motive": "The acquisition would expose years of fraud.",
+        "key_evidence": ["Badge log gap", "Wet footprints near the rack"],
+        "timeline": ["23:40 badge swipe", "23:52 power surge", "00:05 body found"],
+    }
+    return {"scene_blueprint": blueprint, "characters": characters, "solution": solution}
+
+
+class StubBackend:
+    """Sustituye las llamadas al modelo por sleeps del StubLatencyModel."""
+
+    THINKING_RATIO = 1.5   # thinking/salida, del orden de lo grabado en artifacts/
+
+    def __init__(self, time_scale: float) -> None:
+        from cluedogenai.stub_backend import StubLatencyModel
+
+        self.model = StubLatencyModel(time_scale=time_scale)
+        self._games = 0
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+
+    def _sleep_for(self, label: str, payload: Any) -> None:
+        from cluedogenai.tokens import estimate_tokens
+
+        out_tokens = estimate_tokens(json.dumps(payload, ensure_ascii=False))
+        self.model.generate(out_tokens, int(out_tokens * self.THINKING_RATIO))
+        with self._lock:
+            self.calls[label] = self.calls.get(label, 0) + 1
+
+    def generate_case(self, on_task_done=None, cancelled=None, checkpoint=None) -> Dict:
+        from cluedogenai import case_generation as cg
+        from cluedogenai.scheduler import Priority, get_scheduler
+
+        with self._lock:
+            n = self._games
+            self._games += 1
+        parts = fixture_case(n)
+        for task_name, (key, _) in cg.SETUP_TASK_ARTIFACTS.items():
+            if key not in parts:
+                continue
+            get_scheduler().run(Priority.SETUP, self._sleep_for, task_name, parts[key], label=task_name)
+            if cancelled is not None and cancelled.is_set():
+                raise cg.CaseGenerationCancelled("case generation cancelled")
+            if on_task_done is not None:
+                on_task_done(task_name, parts[key])
+        return cg._assemble_case_bundle(parts["scene_blueprint"], parts["characters"], parts["solution"])
+
+    def kickoff(self, crew_name: str, inputs: Dict, priority, task_listener=None):
+        from cluedogenai.scheduler import get_scheduler
+
+        answer = {
+            "spoken_text": "I was exactly where I said I was, detective. Check the logs yourself.",
+            "revealed_facts": [f"Mentioned the logs ({len(inputs.get('player_action', ''))} chars of context)"],
+            "implied_clues": [],
+        }
+        get_scheduler().run(priority, self._sleep_for, crew_name, answer, label=crew_name)
+        raw = json.dumps(answer, ensure_ascii=False)
+        return SimpleNamespace(raw=raw, tasks_output=[SimpleNamespace(raw=raw)])
+
+    def render_portrait(self, suspect: Dict[str, Any], game_id: Optional[str] = None) -> str:
+        from cluedogenai.scheduler import Priority, get_scheduler
+
+        get_scheduler().run(Priority.BACKGROUND, self._sleep_for, "portrait", suspect, label="portrait")
+        # Sin fichero: la UI se queda con el avatar local, como con un retrato bloqueado
+        raise RuntimeError("stub backend does not write portraits")
+
+    def install(self) -> None:
+        from cluedogenai import case_generation, portraits
+
+        # app.py hace `from cluedogenai.case_generation import ...` en cada rerun: ve estos
+        case_generation.generate_case_with_crew = self.generate_case
+        case_generation.kickoff_with_fallback = self.kickoff
+        portraits._default_render = self.render_portrait
+
+
+# ---------- Detective simulado ----------
+
+def _rss_mb() -> Optional[float]:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1e6
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Detective:
+    def __init__(self, n: int, questions: int, poll_s: float, timeout_s: float) -> None:
+        self.n = n
+        self.questions = questions
+        self.poll_s = poll_s
+        self.timeout_s = timeout_s
+        self.reruns: List[tuple] = []       # (tipo, segundos)
+        self.time_to_playable: Optional[float] = None
+        self.error: Optional[str] = None
+        self.at = None
+
+    def _run(self, kind: str) -> None:
+        started = time.perf_counter()
+        self.at.run(timeout=self.timeout_s)
+        self.reruns.append((kind, time.perf_counter() - started))
+        if self.at.exception:
+            raise RuntimeError(f"{kind}: {self.at.exception[0].value}")
+
+    def _state(self, key: str, default: Any = None) -> Any:
+        return self.at.session_state[key] if key in self.at.session_state else default
+
+    def _wait_for(self, stages: tuple, deadline: float) -> None:
+        while self._state("case_stage") not in stages:
+            if self._state("case_stage") == "failed":
+                raise RuntimeError(f"case generation failed: {self._state('crew_error')}")
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"case not {'/'.join(stages)} after {self.timeout_s:.0f}s")
+            time.sleep(self.poll_s)
+            self._run("poll")
+
+    def play(self) -> "Detective":
+        from streamlit.testing.v1 import AppTest
+
+        started = time.perf_counter()
+        deadline = started + self.timeout_s
+        try:
+            self.at = AppTest.from_file(APP_PATH, default_timeout=self.timeout_s)
+            self._run("first")
+            self._wait_for(("playable", "complete"), deadline)
+            self.time_to_playable = time.perf_counter() - started
+
+            names = [s["name"] for s in self._state("case")["suspects"]]
+            for i in range(self.questions):
+                if self._state("remaining_questions", 0) <= 0:
+                    break
+                self.at.selectbox(key="selected_suspect").set_value(names[i % len(names)])
+                self.at.chat_input[0].set_value(QUESTIONS[i % len(QUESTIONS)])
+                self._run("question")
+
+            self._wait_for(("complete",), deadline)
+            self.at.selectbox(key="accuse_choice").set_value(names[self.n % len(names)])
+            accuse = next(b for b in self.at.button if b.label.startswith("⚖️"))
+            accuse.click()
+            self._run("accuse")
+            if not self._state("outcome"):
+                raise RuntimeError("accusation did not produce an outcome")
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            if os.getenv("LOAD_TEST_TRACEBACKS"):
+                traceback.print_exc(file=sys.__stderr__)
+        return self
+
+
+# ---------- Informe ----------
+
+def _pct(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def summarize(detectives: List[Detective], wall_s: float, rss_before: Optional[float],
+              rss_peak: Optional[float], concurrency: int, backend: StubBackend) -> Dict[str, Any]:
+    from cluedogenai.scheduler import get_scheduler
+
+    ok = [d for d in detectives if d.error is None]
+    by_kind: Dict[str, List[float]] = {}
+    for d in detectives:
+        for kind, secs in d.reruns:
+            by_kind.setdefault(kind, []).append(secs * 1000)
+    all_ms = [ms for values in by_kind.values() for ms in values]
+    errors: Dict[str, int] = {}
+    for d in detectives:
+        if d.error:
+            key = d.error.split(":")[0]
+            errors[key] = errors.get(key, 0) + 1
+
+    def _lat(values: List[float]) -> Dict[str, float]:
+        return {
+            "n": len(values),
+            "p50": round(_pct(values, 50), 1),
+            "p95": round(_pct(values, 95), 1),
+            "p99": round(_pct(values, 99), 1),
+            "max": round(max(values), 1) if values else 0.0,
+        }
+
+    ttp = [d.time_to_playable for d in ok if d.time_to_playable is not None]
+    per_session = None
+    if rss_before is not None and rss_peak is not None:
+        per_session = round((rss_peak - rss_before) / max(1, min(concurrency, len(detectives))), 2)
+    return {
+        "sessions": len(detectives),
+        "completed": len(ok),
+        "concurrency": concurrency,
+        "wall_s": round(wall_s, 2),
+        "sessions_per_s": round(len(ok) / wall_s, 3) if wall_s else 0.0,
+        "error_rate": round(1 - len(ok) / len(detectives), 3) if detectives else 0.0,
+        "errors": errors,
+        "rerun_ms": {"all": _lat(all_ms), **{k: _lat(v) for k, v in sorted(by_kind.items())}},
+        "time_to_playable_s": round(statistics.median(ttp), 2) if ttp else None,
+        "rss_mb": {"before": rss_before, "peak": rss_peak, "per_session": per_session},
+        "model_calls": dict(backend.calls),
+        "scheduler": get_scheduler().stats(),
+    }
+
+
+def print_report(r: Dict[str, Any]) -> None:
+    from cluedogenai.scheduler import get_scheduler
+
+    print("=== load test (AppTest, stub backend) ===")
+    print(f"sessions: {r['completed']}/{r['sessions']} completed, concurrency {r['concurrency']}, "
+          f"wall {r['wall_s']:.1f}s -> {r['sessions_per_s']:.2f} sessions/s")
+    print(f"error rate: {r['error_rate'] * 100:.1f}%  {r['errors'] or ''}")
+    if r["time_to_playable_s"] is not None:
+        print(f"time to playable (mediana): {r['time_to_playable_s']:.2f}s")
+    print(f"\n{'rerun':<10}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for kind, lat in r["rerun_ms"].items():
+        print(f"{kind:<10}{lat['n']:>6}{lat['p50']:>10.1f}{lat['p95']:>10.1f}{lat['p99']:>10.1f}{lat['max']:>10.1f}")
+    rss = r["rss_mb"]
+    if rss["per_session"] is not None:
+        print(f"\nRSS: {rss['before']:.0f} MB -> pico {rss['peak']:.0f} MB (~{rss['per_session']:.2f} MB por sesión)")
+    print(f"llamadas al modelo simulado: {r['model_calls']}")
+    print(f"\nscheduler:\n{get_scheduler().format_stats()}")
+
+
+def main(sessions: int, concurrency: int, questions: int, time_scale: float, poll_s: float,
+         timeout_s: float, verbose: bool, json_path: Optional[str]) -> int:
+    tmp = tempfile.mkdtemp(prefix="cluedo-load-")
+    # Store y checkpoints en una carpeta temporal; sin modelo de embeddings (no es lo que se mide)
+    os.environ.setdefault("CLUEDO_GAME_STORE", os.path.join(tmp, "games.sqlite3"))
+    os.environ.setdefault("CLUEDO_CHECKPOINT_DIR", os.path.join(tmp, "checkpoints"))
+    os.environ.setdefault("CLUEDO_RETRIEVAL", "0")
+
+    backend = StubBackend(time_scale)
+    backend.install()
+
+    # Streamlit ya importado: el RSS de partida no carga su coste a las sesiones
+    import streamlit.testing.v1  # noqa: F401
+
+    rss_before = _rss_mb()
+    rss_peak = rss_before
+    stop = threading.Event()
+
+    def _sample_rss() -> None:
+        nonlocal rss_peak
+        while not stop.wait(0.2):
+            rss = _rss_mb()
+            if rss is not None and (rss_peak is None or rss > rss_peak):
+                rss_peak = rss
+
+    sampler = threading.Thread(target=_sample_rss, daemon=True)
+    sampler.start()
+
+    detectives = [Detective(n, questions, poll_s, timeout_s) for n in range(sessions)]
+    quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    started = time.perf_counter()
+    with quiet, ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="detective") as pool:
+        list(pool.map(Detective.play, detectives))
+    wall = time.perf_counter() - started
+    stop.set()
+    sampler.join()
+
+    for d in detectives:
+        d.at = None
+    gc.collect()
+
+    report = summarize(detectives, wall, rss_before, rss_peak, concurrency, backend)
+    print_report(report)
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"\nInforme guardado en {json_path}")
+    return 1 if report["error_rate"] > 0 else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partidas completas simuladas contra app.py (AppTest + stub).")
+    parser.add_argument("--sessions", type=int, default=20, help="Partidas a jugar en total.")
+    parser.add_argument("--concurrency", type=int, default=10, help="Detectives jugando a la vez.")
+    parser.add_argument("--questions", type=int, default=10, help="Preguntas por partida antes de acusar.")
+    parser.add_argument("--time-scale", type=float, default=0.05,
+                        help="Factor aplicado a los sleeps del stub (1.0 = latencia real del modelo).")
+    parser.add_argument("--poll", type=float, default=0.25, help="Segundos entre reruns mientras se genera el caso.")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Límite por partida (y por rerun).")
+    parser.add_argument("--verbose", action="store_true", help="No silenciar los prints de la app.")
+    parser.add_argument("--json", dest="json_path", help="Guardar también el informe en JSON.")
+    args = parser.parse_args()
+    sys.exit(main(args.sessions, args.concurrency, args.questions, args.time_scale,
+                  args.poll, args.timeout, args.verbose, args.json_path))
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+thinking_budget.py
+
+Mide, sobre el backend simulado, cuánto cuesta el "thinking" de Gemini 2.5 por
+task con y sin los budgets de config/models.yaml.
+
+La grabación de referencia es artifacts/scene_blueprint.json: varios KB de
+razonamiento ("Let's break this down…") seguidos del JSON pedido. De ahí sale
+la proporción thinking/salida; para las tasks sin grabación propia se
+extrapola esa proporción al tamaño del schema de su expected_output.
+
+Uso:
+  python benchmarks/thinking_budget.py
+  python benchmarks/thinking_budget.py --runs 5 --time-scale 0.01
+  python benchmarks/thinking_budget.py --recording generate_suspect_dialogue=out.txt
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+from typing import Dict, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_PATH = os.path.join(ROOT, "src")
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+import yaml  # noqa: E402
+
+from cluedogenai.routing import ModelRouter, routing_task  # noqa: E402
+from cluedogenai.stub_backend import StubLatencyModel, thinking_tokens_used  # noqa: E402
+from cluedogenai.tokens import estimate_tokens  # noqa: E402
+
+TASKS_YAML = os.path.join(SRC_PATH, "cluedogenai", "config", "tasks.yaml")
+DEFAULT_RECORDINGS = {
+    "create_scene_blueprint": os.path.join(ROOT, "artifacts", "scene_blueprint.json"),
+}
+
+
+def split_thinking(raw: str) -> Tuple[str, str]:
+    """Separa el razonamiento previo del primer objeto JSON de la respuesta."""
+    cleaned = raw.replace("```json", "").replace("```", "")
+    dec = json.JSONDecoder()
+    for m in re.finditer(r"\{", cleaned):
+        try:
+            obj, end = dec.raw_decode(cleaned[m.start():])
+        except Exception:
+            continue
+        if isinstance(obj, dict):
+            return cleaned[:m.start()].strip(), cleaned[m.start():m.start() + end]
+    return cleaned.strip(), ""
+
+
+def load_recordings(overrides: Dict[str, str]) -> Dict[str, Tuple[int, int]]:
+    """task -> (thinking_tokens, output_tokens) a partir de salidas grabadas."""
+    paths = dict(DEFAULT_RECORDINGS)
+    paths.update(overrides)
+    out = {}
+    for task, path in paths.items():
+        if not os.path.isfile(path):
+            print(f"  (sin grabación para {task}: {path})")
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            thinking, answer = split_thinking(f.read())
+        out[task] = (estimate_tokens(thinking), estimate_tokens(answer))
+    return out
+
+
+def bench_task(stub: StubLatencyModel, runs: int, output_tokens: int, thinking_tokens: int) -> float:
+    return statistics.median(stub.generate(output_tokens, thinking_tokens) for _ in range(runs))
+
+
+def main(runs: int, time_scale: float, overrides: Dict[str, str]) -> None:
+    router = ModelRouter(log_path=None)
+    stub = StubLatencyModel(time_scale=time_scale)
+
+    with open(TASKS_YAML, "r", encoding="utf-8") as f:
+        tasks_cfg = yaml.safe_load(f) or {}
+
+    print("=== thinking budget benchmark (stub backend) ===")
+    recordings = load_recordings(overrides)
+    if not recordings:
+        print("No hay ninguna grabación; nada que medir.")
+        return
+
+    # Proporción thinking/salida observada en las grabaciones
+    ratio = sum(t for t, _ in recordings.values()) / max(1, sum(o for _, o in recordings.values()))
+    print(f"Ratio thinking/salida grabado: {ratio:.2f}\n")
+
+    header = f"{'task':<32}{'model':<24}{'budget':>8}{'think':>8}{'out':>6}{'dyn s':>9}{'budget s':>10}{'saved':>8}"
+    print(header)
+    print("-" * len(header))
+    for task in tasks_cfg:
+        # Las variantes (lean, *_from_inputs) usan el modelo y budget de la task cuyo nombre llevan
+        model: Optional[str] = router.select(routing_task(task))
+        budget = router.thinking_budget(routing_task(task), model)
+        if task in recordings:
+            dyn_thinking, out_tokens = recordings[task]
+            note = ""
+        else:
+            out_tokens = estimate_tokens(str((tasks_cfg[task] or {}).get("expected_output", "")))
+            dyn_thinking = int(out_tokens * ratio)
+            note = "  (extrapolado)"
+
+        used = thinking_tokens_used(dyn_thinking, budget)
+        dyn_s = bench_task(stub, runs, out_tokens, dyn_thinking)
+        bud_s = bench_task(stub, runs, out_tokens, used)
+        saved = (1 - bud_s / dyn_s) * 100 if dyn_s else 0.0
+        print(
+            f"{task:<32}{str(model):<24}{str(budget):>8}{used:>8}{out_tokens:>6}"
+            f"{dyn_s:>9.2f}{bud_s:>10.2f}{saved:>7.0f}%{note}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de thinking budgets sobre el backend simulado.")
+    parser.add_argument("--runs", type=int, default=3, help="Repeticiones por medida (se usa la mediana).")
+    parser.add_argument("--time-scale", type=float, default=0.02,
+                        help="Factor aplicado a los sleeps del stub (1.0 = tiempo real).")
+    parser.add_argument("--recording", action="append", default=[], metavar="TASK=PATH",
+                        help="Salida cruda grabada de una task (se puede repetir).")
+    args = parser.parse_args()
+    overrides = dict(item.split("=", 1) for item in args.recording)
+    main(runs=args.runs, time_scale=args.time_scale, overrides=overrides)
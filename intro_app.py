@@ -1,6 +1,7 @@
 import streamlit as st
 import streamlit.components.v1 as components
-from app import render_game
+from app import case_job_heartbeat, case_needs_generation, ensure_case_job, render_game
+from cluedogenai.case_generation import warm_crew_stack
 
 
 # --- Page Configuration & CSS ---
@@ -127,13 +128,19 @@ def configure_page():
             
             hr { display: none !important; }
 
+            /* 7. Hidden helper buttons (clicked from the HTML icons, see render_intro) */
+            .st-key-rules_hidden, .st-key-tips_hidden, .st-key-close_hidden {
+                display: none !important;
+            }
+
         </style>
     """, unsafe_allow_html=True)
 
 # --- State Management ---
 def init_state():
     if "game_started" not in st.session_state:
-        st.session_state["game_started"] = False
+        # ?game=<id>: partida guardada que se retoma (reinicio/reconexión), sin pasar por la intro
+        st.session_state["game_started"] = "game" in st.query_params
     if "modal_open" not in st.session_state:
         st.session_state["modal_open"] = None
 
@@ -190,6 +197,13 @@ def render_modal_content():
 
 # --- Intro Page Rendering ---
 def render_intro():
+    # Mientras el jugador lee la intro, crewAI se importa y el caso se va
+    # generando en segundo plano; START GAME se une a ese mismo job
+    if case_needs_generation():
+        warm_crew_stack()
+        ensure_case_job()
+        case_job_heartbeat()
+
     # Title
     st.markdown("<h1 style='text-align: center; color: black; font-size: 3.5rem;'>AI Murder Mystery</h1>", unsafe_allow_html=True)
     st.markdown("<h3 style='text-align: center; color: #666;'>Solve the case. Find the killer.</h3>", unsafe_allow_html=True)
@@ -204,54 +218,41 @@ def render_intro():
     """, unsafe_allow_html=True)
 
     # --- 2. HIDDEN STREAMLIT BUTTONS ---
-    # We render them normally, but rely on JS to hide them and click them.
-    # The text MUST match exactly what the JS looks for.
+    # Hidden via CSS by their key class (.st-key-<key>); the icons click them.
     st.button("rules_hidden", key="rules_hidden", on_click=toggle_rules_modal)
     st.button("tips_hidden", key="tips_hidden", on_click=toggle_tips_modal)
     st.button("close_hidden", key="close_hidden", on_click=close_callback)
 
     # --- 3. JAVASCRIPT GLUE (Using components.html) ---
-    # This runs in an iframe, accesses the parent document, and orchestrates the clicks.
+    # One delegated click listener on the parent document, installed once:
+    # it survives Streamlit re-renders (no re-binding, no polling) and each
+    # icon click becomes exactly one hidden-button click. Removed when the
+    # iframe goes away (game started), so nothing keeps running afterwards.
     components.html("""
     <script>
-        const doc = window.parent.document;
-        
-        // Helper to find specific Streamlit buttons by text
-        function getStreamlitButton(text) {
-            const buttons = Array.from(doc.querySelectorAll('button'));
-            return buttons.find(btn => btn.innerText === text);
-        }
-
-        // We use an interval to handle Streamlit's dynamic re-rendering
-        setInterval(() => {
-            // 1. Find and Hide the Helper Buttons
-            const btnRules = getStreamlitButton("rules_hidden");
-            const btnTips = getStreamlitButton("tips_hidden");
-            const btnClose = getStreamlitButton("close_hidden");
-
-            if (btnRules) btnRules.style.display = "none";
-            if (btnTips) btnTips.style.display = "none";
-            if (btnClose) btnClose.style.display = "none";
+        const parentWin = window.parent;
+        const doc = parentWin.document;
+        const TARGETS = {
+            rules_icon: "rules_hidden",
+            tips_icon: "tips_hidden",
+            modal_close: "close_hidden",
+        };
 
-            // 2. Link Rules Icon
-            const iconRules = doc.getElementById("rules_icon");
-            if (iconRules && btnRules) {
-                iconRules.onclick = function() { btnRules.click(); };
-            }
-
-            // 3. Link Tips Icon
-            const iconTips = doc.getElementById("tips_icon");
-            if (iconTips && btnTips) {
-                iconTips.onclick = function() { btnTips.click(); };
-            }
-
-            // 4. Link Close Icon (inside Modal)
-            const iconClose = doc.getElementById("modal_close");
-            if (iconClose && btnClose) {
-                iconClose.onclick = function() { btnClose.click(); };
-            }
+        function onClick(event) {
+            const el = event.target.closest && event.target.closest("#rules_icon, #tips_icon, #modal_close");
+            if (!el) return;
+            const btn = doc.querySelector(".st-key-" + TARGETS[el.id] + " button");
+            if (btn) btn.click();
+        }
 
-        }, 300); // Check every 300ms
+        if (!parentWin.__introClicksWired) {
+            parentWin.__introClicksWired = true;
+            doc.addEventListener("click", onClick);
+            window.addEventListener("pagehide", () => {
+                doc.removeEventListener("click", onClick);
+                parentWin.__introClicksWired = false;
+            });
+        }
     </script>
     """, height=0)
 
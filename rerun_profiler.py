@@ -0,0 +1,187 @@
+"""
+Profiling opcional de cada rerun de Streamlit.
+
+Se activa con CLUEDO_PROFILE=1 o con ?profile=1 en la URL. Por cada rerun:
+  - cProfile de todo el script -> profiles/<session>/rerun_<n>.prof
+  - tiempo de pared y bytes de deltas emitidos por sección -> rerun_<n>.json
+
+Las secciones se marcan en app.py con `profile_section("header")`, etc.
+Con el profiling desactivado todo esto es un no-op.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import streamlit as st
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILES_DIR = os.getenv("CLUEDO_PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+
+_local = threading.local()
+_rerun_counters: Dict[str, int] = {}
+_counter_lock = threading.Lock()
+
+
+def profiling_enabled() -> bool:
+    if os.getenv("CLUEDO_PROFILE", "").strip().lower() in ("1", "true", "yes"):
+        return True
+    try:
+        return st.query_params.get("profile") in ("1", "true")
+    except Exception:
+        return False
+
+
+def _script_ctx():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        return get_script_run_ctx()
+    except Exception:
+        return None
+
+
+class _RerunProfile:
+    def __init__(self, session_id: str, rerun_no: int) -> None:
+        self.session_id = session_id
+        self.rerun_no = rerun_no
+        self.sections: Dict[str, Dict[str, Any]] = {}
+        self.current = "(unsectioned)"
+        self.started = time.perf_counter()
+
+    def add_delta(self, size: int) -> None:
+        sec = self.sections.setdefault(self.current, {"wall_s": 0.0, "delta_bytes": 0, "deltas": 0})
+        sec["delta_bytes"] += size
+        sec["deltas"] += 1
+
+    def add_time(self, name: str, seconds: float) -> None:
+        sec = self.sections.setdefault(name, {"wall_s": 0.0, "delta_bytes": 0, "deltas": 0})
+        sec["wall_s"] += seconds
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "session": self.session_id,
+            "rerun": self.rerun_no,
+            "ts": time.time(),
+            "wall_s": round(time.perf_counter() - self.started, 4),
+            "delta_bytes": sum(s["delta_bytes"] for s in self.sections.values()),
+            "sections": {
+                k: {**v, "wall_s": round(v["wall_s"], 4)} for k, v in self.sections.items()
+            },
+            "scheduler": _scheduler_snapshot(),
+        }
+
+
+def _scheduler_snapshot() -> Optional[Dict[str, Any]]:
+    """Cola y percentiles por clase del scheduler del proceso al acabar el rerun."""
+    try:
+        from cluedogenai.scheduler import get_scheduler
+        sched = get_scheduler()
+        return {"queue_depth": sched.queue_depth(), "classes": sched.stats()}
+    except Exception:
+        return None
+
+
+@contextmanager
+def profile_section(name: str) -> Iterator[None]:
+    """Marca una sección del render: tiempo de pared + deltas emitidos dentro."""
+    prof: Optional[_RerunProfile] = getattr(_local, "profile", None)
+    if prof is None:
+        yield
+        return
+    previous = prof.current
+    prof.current = name
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        prof.add_time(name, time.perf_counter() - started)
+        prof.current = previous
+
+
+@contextmanager
+def profiled_rerun() -> Iterator[None]:
+    """Envuelve un rerun completo; escribe .prof + .json si el profiling está activo."""
+    if not profiling_enabled() or getattr(_local, "profile", None) is not None:
+        yield
+        return
+
+    ctx = _script_ctx()
+    session_id = getattr(ctx, "session_id", None) or "local"
+    with _counter_lock:
+        _rerun_counters[session_id] = _rerun_counters.get(session_id, 0) + 1
+        rerun_no = _rerun_counters[session_id]
+
+    prof = _RerunProfile(session_id, rerun_no)
+    _local.profile = prof
+
+    # Contamos los bytes de cada ForwardMsg que el script manda al navegador
+    original_enqueue = getattr(ctx, "_enqueue", None)
+    if ctx is not None and original_enqueue is not None:
+        def _counting_enqueue(msg):
+            try:
+                prof.add_delta(msg.ByteSize())
+            except Exception:
+                pass
+            return original_enqueue(msg)
+        try:
+            ctx._enqueue = _counting_enqueue
+        except Exception:
+            original_enqueue = None
+
+    profiler: Optional[cProfile.Profile] = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Otro hilo ya está perfilando (3.12+ solo admite un profiler): nos quedamos con las secciones
+        profiler = None
+
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        if ctx is not None and original_enqueue is not None:
+            ctx._enqueue = original_enqueue
+        _local.profile = None
+        _write_profile(prof, profiler)
+
+
+def _write_profile(prof: _RerunProfile, profiler: Optional[cProfile.Profile]) -> None:
+    out_dir = os.path.join(PROFILES_DIR, prof.session_id)
+    try:
+        os.makedirs(out_dir, exist_ok=True)
+        stem = os.path.join(out_dir, f"rerun_{prof.rerun_no:04d}")
+        if profiler is not None:
+            profiler.dump_stats(stem + ".prof")
+        with open(stem + ".json", "w", encoding="utf-8") as f:
+            json.dump(prof.summary(), f, indent=2)
+    except Exception as e:
+        print(f"[PROFILE] Could not write rerun profile: {e}")
+
+
+def _summarize(path: str) -> None:
+    """Tabla por rerun (wall + bytes por sección) para comparar perfiles guardados."""
+    files = sorted(f for f in os.listdir(path) if f.endswith(".json"))
+    for fname in files:
+        with open(os.path.join(path, fname), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        parts = ", ".join(
+            f"{name}={sec['wall_s'] * 1000:.0f}ms/{sec['delta_bytes'] / 1024:.1f}KB"
+            for name, sec in data.get("sections", {}).items()
+        )
+        print(f"{fname}: {data['wall_s'] * 1000:.0f}ms, {data['delta_bytes'] / 1024:.1f}KB  [{parts}]")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Uso: python rerun_profiler.py profiles/<session_id>")
+        sys.exit(1)
+    _summarize(sys.argv[1])
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+Generación de casos por lotes, para tener una biblioteca hecha antes de las
+horas punta.
+
+K casos completos y validados en un pool de procesos. Cada caso pasa por el
+mismo pipeline que la app (generate_case_with_crew + PortraitQueue) y se
+guarda en la biblioteca:
+
+  <library>/<case_id>/case.json        bundle: case, scene_blueprint, characters, solution
+  <library>/<case_id>/portraits/...    retratos (+ variantes WebP)
+  <library>/index.json                 un resumen por caso, lo escribe solo el proceso padre
+
+Aislamiento entre procesos: cada worker trabaja en su propia carpeta (cwd y
+CLUEDO_ARTIFACTS_DIR), así que los output_file de las tasks y los retratos de
+dos casos simultáneos no se pisan. Los casos se escriben en una carpeta
+temporal y se renombran al final: en la biblioteca no hay casos a medias.
+
+Cuota compartida: todos los procesos reparten un mismo ritmo de `rpm`
+trabajos por minuto, aplicado en el scheduler antes de cada llamada (una
+kickoff de crew cuenta como una).
+
+Uso:
+  generate_cases --count 200 --workers 4 --rpm 60
+  generate_cases --count 10 --no-portraits --library /tmp/cases
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_LIBRARY = os.path.join(ROOT_DIR, "case_library")
+INDEX_FILE = "index.json"
+PORTRAITS_DIRNAME = "portraits"
+PORTRAIT_POLL_SECONDS = 0.5
+
+_WORK_DIR: Optional[str] = None  # carpeta de este worker (solo en los procesos del pool)
+
+
+class SharedRateLimiter:
+    """`rpm` huecos por minuto repartidos entre procesos: cada llamada reserva el siguiente."""
+
+    def __init__(self, rpm: float, next_slot, lock) -> None:
+        self.interval = 60.0 / rpm
+        self._next_slot = next_slot   # multiprocessing.Value("d"), compartido
+        self._lock = lock             # multiprocessing.Lock, compartido
+
+    def __call__(self) -> None:
+        with self._lock:
+            now = time.time()
+            slot = max(now, self._next_slot.value)
+            self._next_slot.value = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _init_worker(work_root: str, rpm: float, next_slot, lock) -> None:
+    """Carpeta propia por proceso + el limitador compartido en su scheduler."""
+    global _WORK_DIR
+    work = os.path.join(work_root, f"worker-{os.getpid()}")
+    os.makedirs(os.path.join(work, "artifacts"), exist_ok=True)
+    os.chdir(work)  # output_file de las tasks y generated_images son relativos al cwd
+    os.environ["CLUEDO_ARTIFACTS_DIR"] = os.path.join(work, "artifacts")
+    _WORK_DIR = work
+
+    from .scheduler import get_scheduler
+
+    if rpm > 0:
+        get_scheduler().rate_limiter = SharedRateLimiter(rpm, next_slot, lock)
+
+
+def _render_portraits(characters: Dict[str, Any], dest: str) -> Dict[str, str]:
+    """Retratos con la misma cola que la app; se mueven a `dest`. Devuelve nombre -> ruta relativa al caso."""
+    from .image_assets import make_display_variants
+    from .portraits import PortraitQueue
+    from .tools.image_tools import OUTPUT_DIR_REL
+
+    if _WORK_DIR is None:
+        raise RuntimeError("portraits are only rendered inside a batch worker (own working dir)")
+    # Lo que quedara del caso anterior de este worker (nunca la carpeta de la app)
+    shutil.rmtree(os.path.join(_WORK_DIR, OUTPUT_DIR_REL), ignore_errors=True)
+
+    queue = PortraitQueue(characters.get("suspects") or []).start()
+    while queue.pending():
+        time.sleep(PORTRAIT_POLL_SECONDS)
+
+    out: Dict[str, str] = {}
+    os.makedirs(dest, exist_ok=True)
+    for name, rel_path in queue.paths().items():
+        target = os.path.join(dest, os.path.basename(rel_path))
+        shutil.move(os.path.join(_WORK_DIR, rel_path), target)
+        make_display_variants(target)
+        out[name] = os.path.join(PORTRAITS_DIRNAME, os.path.basename(rel_path))
+    return out
+
+
+def generate_one(library: str, portraits: bool = True) -> Dict[str, Any]:
+    """Un caso completo en la biblioteca. Nunca lanza: el resultado dice si falló y por qué."""
+    from .case_generation import generate_case_with_crew
+    from .checkpoints import new_game_id
+
+    case_id = new_game_id()
+    started = time.perf_counter()
+    partial = os.path.join(library, f".{case_id}.partial")
+    try:
+        bundle = generate_case_with_crew()
+        if not bundle.get("solution"):
+            # La app puede jugar sin solución verificada; la biblioteca no la acepta
+            raise RuntimeError("no verified solution")
+
+        images = _render_portraits(bundle["characters"], os.path.join(partial, PORTRAITS_DIRNAME)) if portraits else {}
+        case = bundle["case"]
+        for s in case.get("suspects", []):
+            s["image_path"] = images.get(s["name"])
+
+        os.makedirs(partial, exist_ok=True)
+        with open(os.path.join(partial, "case.json"), "w", encoding="utf-8") as f:
+            json.dump(bundle, f, ensure_ascii=False, indent=2)
+        os.replace(partial, os.path.join(library, case_id))
+
+        return {
+            "ok": True,
+            "case_id": case_id,
+            "seconds": round(time.perf_counter() - started, 1),
+            "victim": case.get("victim"),
+            "place": case.get("place"),
+            "guilty_name": case.get("guilty_name"),
+            "suspects": [s["name"] for s in case.get("suspects", [])],
+            "portraits": len(images),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }
+    except Exception as e:
+        shutil.rmtree(partial, ignore_errors=True)
+        # Los errores del pipeline llevan el traceback: primera y última línea bastan para el informe
+        lines = str(e).strip().splitlines() or [""]
+        error = lines[0] if len(lines) == 1 else f"{lines[0]} {lines[-1].strip()}"
+        return {
+            "ok": False,
+            "case_id": case_id,
+            "seconds": round(time.perf_counter() - started, 1),
+            "error_type": type(e).__name__,
+            "error": error[:300],
+        }
+
+
+def load_index(library: str) -> List[Dict[str, Any]]:
+    try:
+        with open(os.path.join(library, INDEX_FILE), "r", encoding="utf-8") as f:
+            return json.load(f).get("cases", [])
+    except (OSError, ValueError):
+        return []
+
+
+def write_index(library: str, cases: List[Dict[str, Any]]) -> None:
+    path = os.path.join(library, INDEX_FILE)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"updated_at": datetime.now().isoformat(timespec="seconds"), "cases": cases},
+                  f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def summarize(results: List[Dict[str, Any]], wall_s: float, workers: int, rpm: float) -> Dict[str, Any]:
+    ok = [r for r in results if r["ok"]]
+    failed = [r for r in results if not r["ok"]]
+    errors: Dict[str, int] = {}
+    for r in failed:
+        errors[r["error_type"]] = errors.get(r["error_type"], 0) + 1
+    secs = sorted(r["seconds"] for r in ok)
+    return {
+        "requested": len(results),
+        "generated": len(ok),
+        "failed": len(failed),
+        "failure_rate": round(len(failed) / len(results), 3) if results else 0.0,
+        "errors": errors,
+        "failed_ids": [r["case_id"] for r in failed],
+        "workers": workers,
+        "rpm": rpm,
+        "wall_s": round(wall_s, 1),
+        "cases_per_hour": round(len(ok) * 3600 / wall_s, 1) if wall_s else 0.0,
+        "case_s_p50": secs[len(secs) // 2] if secs else None,
+        "case_s_p95": secs[min(len(secs) - 1, int(0.95 * len(secs)))] if secs else None,
+        "case_s_mean": round(statistics.mean(secs), 1) if secs else None,
+        "portraits": sum(r.get("portraits", 0) for r in ok),
+    }
+
+
+def run_batch(count: int, workers: int, rpm: float, library: str, portraits: bool = True) -> Dict[str, Any]:
+    library = os.path.abspath(library)  # los workers cambian de cwd
+    os.makedirs(library, exist_ok=True)
+    index = load_index(library)
+    work_root = tempfile.mkdtemp(prefix="cluedo-batch-")
+
+    ctx = multiprocessing.get_context()
+    next_slot = ctx.Value("d", 0.0, lock=False)
+    lock = ctx.Lock()
+
+    results: List[Dict[str, Any]] = []
+    started = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(work_root, rpm, next_slot, lock),
+        ) as pool:
+            futures = [pool.submit(generate_one, library, portraits) for _ in range(count)]
+            for fut in as_completed(futures):
+                r = fut.result()
+                results.append(r)
+                if r["ok"]:
+                    index.append({k: v for k, v in r.items() if k != "ok"})
+                    write_index(library, index)  # tras cada caso: un corte a media noche no pierde el índice
+                status = "ok" if r["ok"] else f"FAILED ({r['error_type']}: {r['error']})"
+                print(f"[BATCH] {len(results)}/{count} {r['case_id']} {r['seconds']:.0f}s {status}")
+    finally:
+        shutil.rmtree(work_root, ignore_errors=True)
+    return summarize(results, time.perf_counter() - started, workers, rpm)
+
+
+def print_report(report: Dict[str, Any], library: str) -> None:
+    print("\n=== batch case generation ===")
+    print(f"generated {report['generated']}/{report['requested']} in {report['wall_s']:.0f}s "
+          f"({report['workers']} workers, {report['rpm']:g} rpm) -> {report['cases_per_hour']:.1f} cases/hour")
+    if report["case_s_p50"] is not None:
+        print(f"per case: p50 {report['case_s_p50']:.0f}s, p95 {report['case_s_p95']:.0f}s; "
+              f"{report['portraits']} portraits")
+    print(f"failure rate: {report['failure_rate'] * 100:.1f}%  {report['errors'] or ''}")
+    print(f"library: {library} ({len(load_index(library))} cases in {INDEX_FILE})")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Genera casos completos en paralelo para la biblioteca.")
+    parser.add_argument("--count", type=int, default=10, help="Casos a generar.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("CLUEDO_BATCH_WORKERS", "4")),
+                        help="Procesos en paralelo.")
+    parser.add_argument("--rpm", type=float, default=float(os.getenv("CLUEDO_BATCH_RPM", "60")),
+                        help="Llamadas por minuto entre todos los procesos (0 = sin límite).")
+    parser.add_argument("--library", default=os.getenv("CLUEDO_CASE_LIBRARY", DEFAULT_LIBRARY),
+                        help="Carpeta de la biblioteca de casos.")
+    parser.add_argument("--no-portraits", action="store_true", help="Solo el caso, sin retratos.")
+    parser.add_argument("--json", dest="json_path", help="Guardar también el informe en JSON.")
+    args = parser.parse_args(argv)
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()  # la API key del .env, antes de arrancar los workers (la heredan)
+    except ImportError:
+        pass
+
+    library = os.path.abspath(args.library)
+    report = run_batch(args.count, max(1, args.workers), args.rpm, library, portraits=not args.no_portraits)
+    print_report(report, library)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    return 1 if report["generated"] < report["requested"] else 0
@@ -0,0 +1,623 @@
+# -*- coding: utf-8 -*-
+"""
+Generación del caso (escena, sospechosos, solución) con las crews.
+
+Vive fuera de app.py para poder usarse sin Streamlit: la app la lanza en un
+hilo (CaseGenerationJob), y `main.py` la usa para reanudar partidas desde
+sus checkpoints. Nada de aquí toca st.session_state.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import traceback
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .checkpoints import CaseCheckpoint
+from .fanout import FanoutError, fanout_enabled, generate_characters
+from .json_fix import format_repair_stats, parse_json_object
+from .projections import compact_json, project_blueprint, project_characters
+from .routing import is_retryable_error
+from .scheduler import CaseGenerationCancelled, Priority, get_scheduler
+from .validation import (
+    CaseValidationError,
+    autofix_characters,
+    repair_artifact,
+    validate_artifact,
+    validate_characters,
+    validate_scene_blueprint,
+    validate_solution,
+)
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))     # .../src/cluedogenai
+ROOT_DIR = os.path.dirname(os.path.dirname(PACKAGE_DIR))     # raíz del repo (donde está app.py)
+
+ARTIFACTS_DIR = os.path.join(ROOT_DIR, "artifacts")
+ARTIFACT_FILES = [
+    "scene_blueprint.json",
+    "characters.json",
+    "suspect_images.json",
+    "solution.json",
+]
+
+CREW_TOPIC = "AI Murder Mystery"
+
+
+def artifacts_dir() -> str:
+    """
+    Donde las tasks dejan su output_file. Los workers del batch cambian de cwd
+    y apuntan CLUEDO_ARTIFACTS_DIR a su carpeta: dos casos a la vez no se pisan.
+    """
+    return os.getenv("CLUEDO_ARTIFACTS_DIR") or ARTIFACTS_DIR
+
+
+# crewAI, LiteLLM y google-genai tardan segundos en importarse: no van en el
+# import de app.py (la intro pinta antes) sino en la primera llamada, o antes
+# si la intro lanza warm_crew_stack() mientras el jugador lee.
+_crew_stack_lock = threading.Lock()
+_crew_stack_thread: Optional[threading.Thread] = None
+
+
+def _crew_class():
+    from .crew import Cluedogenai
+
+    return Cluedogenai
+
+
+def _import_crew_stack() -> None:
+    t0 = time.perf_counter()
+    try:
+        _crew_class()
+        from .tools import image_tools  # noqa: F401  (google-genai)
+    except Exception as e:
+        print(f"[STARTUP] crew stack warm-up failed: {e}")
+        return
+    print(f"[STARTUP] crew stack imported in {time.perf_counter() - t0:.2f}s")
+
+
+def warm_crew_stack() -> None:
+    """Importa el stack de crewAI en un hilo (una vez por proceso)."""
+    global _crew_stack_thread
+    with _crew_stack_lock:
+        if _crew_stack_thread is not None:
+            return
+        _crew_stack_thread = threading.Thread(target=_import_crew_stack, name="crew-warmup", daemon=True)
+    _crew_stack_thread.start()
+
+
+def kickoff_with_fallback(
+    crew_name: str,
+    inputs: Dict,
+    priority: Priority,
+    task_listener: Optional[Callable[[str, Any], None]] = None,
+):
+    """
+    Lanza la crew `crew_name` a través del scheduler. Si falla con un error
+    reintentable (429/503...), el fallo se registra en el router — que pone
+    ese modelo en cooldown — y se reintenta una vez con la cadena degradada.
+    """
+    for attempt in range(2):
+        crew_base = _crew_class()()
+        crew_base.task_listener = task_listener
+        crew = getattr(crew_base, crew_name)()
+        try:
+            return get_scheduler().run(priority, crew.kickoff, inputs=inputs, label=crew_name)
+        except CaseGenerationCancelled:
+            raise
+        except Exception as e:
+            crew_base.record_failure([t.name for t in crew.tasks], e)
+            if attempt or not is_retryable_error(e):
+                raise
+            print(f"[ROUTING] {crew_name} failed ({str(e)[:120]}); retrying with fallback models")
+
+
+def _clean_artifacts() -> None:
+    folder = artifacts_dir()
+    if not os.path.isdir(folder):
+        return
+    for fname in ARTIFACT_FILES:
+        fpath = os.path.join(folder, fname)
+        if os.path.exists(fpath):
+            try:
+                os.remove(fpath)
+            except Exception as e:
+                print(f"Could not delete artifact {fname}: {e}")
+
+
+def extract_json_object_with_key(text: str, required_key: str) -> Optional[dict]:
+    """
+    Busca y parsea el PRIMER objeto JSON que contenga required_key. Si el
+    parseo estricto falla, lo repara localmente (comas finales, comillas,
+    llaves cortadas...) y fuerza los tipos esperados: ver cluedogenai.json_fix.
+    """
+    return parse_json_object(text, required_key)
+
+
+def safe_get_task_raw(task_obj) -> Optional[str]:
+    """
+    Intenta extraer un string "crudo" de un TaskOutput de CrewAI,
+    probando atributos comunes (raw, output, value, etc.).
+    """
+    if task_obj is None:
+        return None
+    for attr in ("raw", "output", "value", "result", "content"):
+        if hasattr(task_obj, attr):
+            val = getattr(task_obj, attr)
+            if isinstance(val, str) and val.strip():
+                return val
+    s = str(task_obj)
+    return s if s.strip() else None
+
+
+DEFAULT_BASE_CASE = {
+    "victim": "Unknown Victim",
+    "victim_role": "Unknown role",
+    "time": "Sometime past midnight",
+    "place": "An almost empty tech office",
+    "cause": "Suspicious accident with smart equipment",
+    "context": "A storm hits the city. Backup power keeps the systems barely alive."
+}
+
+# task de setup_crew -> (clave en el bundle, clave obligatoria en su JSON)
+
+
+SETUP_TASK_ARTIFACTS = {
+    "create_scene_blueprint": ("scene_blueprint", "scene_id"),
+    "define_characters": ("characters", "suspects"),
+    "create_solution": ("solution", "truth_summary"),
+}
+
+
+def parse_task_output(task_name: str, output) -> Optional[dict]:
+    """Parsea el JSON de un TaskOutput de setup_crew (None si la task no es de setup o no hay JSON)."""
+    spec = SETUP_TASK_ARTIFACTS.get(task_name)
+    if spec is None:
+        return None
+    return extract_json_object_with_key(safe_get_task_raw(output) or "", spec[1])
+
+
+def build_base_case(scene_blueprint_json: Optional[dict]) -> Dict:
+    """Datos del caso (víctima, hora, lugar, causa...) enriquecidos con el scene_blueprint."""
+    base_case = dict(DEFAULT_BASE_CASE)
+    if not scene_blueprint_json:
+        return base_case
+
+    # Location -> place
+    loc = scene_blueprint_json.get("location")
+    if loc:
+        base_case["place"] = loc
+
+    # Summary -> context
+    summary = scene_blueprint_json.get("summary") or ""
+    hidden_tension = scene_blueprint_json.get("hidden_tension") or ""
+    full_ctx = summary.strip()
+    if hidden_tension.strip():
+        base_case["hidden_tension"] = hidden_tension.strip()    
+    if full_ctx:
+        base_case["context"] = full_ctx
+
+
+    # Victim name from present_characters
+    vname = scene_blueprint_json.get("victim_name")
+    if isinstance(vname, str) and vname.strip():
+        base_case["victim"] = vname.strip()
+
+    # Victim role
+    vrole = scene_blueprint_json.get("victim_role")
+    if isinstance(vrole, str) and vrole.strip():
+        base_case["victim_role"] = vrole.strip()
+
+
+    t = scene_blueprint_json.get("time")
+    ht = scene_blueprint_json.get("hidden_tension")
+    if isinstance(ht, str) and ht.strip():
+        base_case["hidden_tension"] = ht.strip()
+    if isinstance(t, str) and t.strip():
+        base_case["time"] = t.strip()
+    elif summary:
+        low = summary.lower()
+        if "storm" in low or "violent storm" in low:
+            base_case["time"] = "Late night during a violent storm"
+        elif "midnight" in low:
+            base_case["time"] = "Just after midnight"
+
+
+    # Cause from visible clues (if available)
+    clues = scene_blueprint_json.get("visible_clues") or []
+    cause = None
+    joined = " ".join([str(c) for c in clues]).lower()
+    if "electrocution" in joined:
+        cause = "Severe electrocution near damaged server equipment"
+    elif "impact" in joined or "trauma" in joined:
+        cause = "Blunt impact trauma during a staged 'accident'"
+    if cause:
+        base_case["cause"] = cause
+    return base_case
+
+
+def find_guilty_name(characters_json: Dict) -> Optional[str]:
+    guilty_name = characters_json.get("guilty_name")
+    if not guilty_name:
+        for s in characters_json.get("suspects") or []:
+            if s.get("guilty") is True:
+                guilty_name = s.get("name")
+                break
+    return guilty_name
+
+
+def find_suspect_image(name: str, vision_images: Optional[Dict] = None, exclude: Optional[set] = None) -> Optional[str]:
+    """
+    Ruta relativa del retrato de `name` según el mapping de esta partida
+    (PortraitQueue.paths()). None si todavía no existe. No se busca por nombre
+    en generated_images: ahí hay retratos de otras partidas.
+    """
+    exclude = exclude or set()
+
+    img_candidate = (vision_images or {}).get(name)
+    if img_candidate:
+        # Validar que el archivo existe físicamente (por si hubo error 429 al crearlo)
+        abs_path = os.path.join(ROOT_DIR, img_candidate)
+        if os.path.exists(abs_path) and abs_path not in exclude:
+            return img_candidate
+    return None
+
+
+def build_suspects(characters_json: Dict, guilty_name: Optional[str], vision_images: Optional[Dict] = None) -> List[Dict]:
+    suspects: List[Dict] = []
+
+    # Rastrear imágenes ya asignadas para evitar repetir la misma imagen en dos sospechosos
+    assigned_images = set()
+
+    for s in characters_json.get("suspects") or []:
+        name = s.get("name", "Unknown")
+
+        # 1. Definir base del sospechoso
+        suspect_dict = {
+            "name": name,
+            "role": s.get("role", ""),
+            "age": s.get("age"),
+            "personality": s.get("personality", ""),
+            "alibi": s.get("alibi", ""),
+            "secret": s.get("secret_motivation", ""),
+            "guilty": (name == guilty_name),
+            "image_path": None  # <--- IMPORTANTE: Empezamos siempre como None
+        }
+
+        # 2. Intentar buscar imagen
+        found_path = find_suspect_image(name, vision_images, exclude=assigned_images)
+
+        # 3. Asignar imagen si se encontró
+        if found_path:
+            suspect_dict["image_path"] = found_path
+            print(f"✅ Image Linked: {name} -> {found_path}")
+            # Marcamos esta ruta absoluta como usada para que nadie más la coja
+            assigned_images.add(os.path.join(ROOT_DIR, found_path))
+        else:
+            print(f"🕒 Portrait pending for: {name}")
+
+        suspects.append(suspect_dict)
+    return suspects
+
+
+def _read_json_artifact(fname: str, required_key: str) -> Optional[dict]:
+    abs_path = os.path.join(artifacts_dir(), fname)
+    if not os.path.exists(abs_path):
+        return None
+
+    with open(abs_path, "r", encoding="utf-8") as f:
+        txt = f.read().strip()
+
+    # JSON puro, embebido en texto o con defectos reparables localmente
+    return extract_json_object_with_key(txt, required_key)
+
+
+def _result_json(result, required_key: str) -> Optional[dict]:
+    """JSON con `required_key` de la salida final de una crew."""
+    return extract_json_object_with_key(safe_get_task_raw(result) or str(result), required_key)
+
+
+def _crew_json(result, fname: str, required_key: str) -> Optional[dict]:
+    """
+    JSON con `required_key` de lo que devolvió ESTA kickoff: primero cada
+    task de tasks_output, después la salida final. artifacts/ es compartido
+    por todas las sesiones del proceso, así que el output_file solo se usa
+    si la salida en memoria no trae el JSON.
+    """
+    for task_out in getattr(result, "tasks_output", None) or []:
+        obj = extract_json_object_with_key(safe_get_task_raw(task_out) or "", required_key)
+        if obj:
+            return obj
+    return _result_json(result, required_key) or _read_json_artifact(fname, required_key)
+
+
+def _solution_inputs(crew_inputs: Dict[str, str], scene_blueprint_json: dict, characters_json: dict, feedback: str = "") -> Dict[str, str]:
+    return {
+        **crew_inputs,
+        "scene_blueprint": compact_json(project_blueprint(scene_blueprint_json, "solution")),
+        "characters": compact_json(project_characters(characters_json, "solution")),
+        "validation_feedback": feedback,
+    }
+
+
+def _raise_if_cancelled(cancelled: Optional[threading.Event], before: str) -> None:
+    """Antes de cada kickoff: si la partida se abandonó no se lanza ni una llamada más."""
+    if cancelled is not None and cancelled.is_set():
+        raise CaseGenerationCancelled(f"case generation cancelled before {before}")
+
+
+def _regenerate(
+    crew_name: str, inputs: Dict[str, str], required_key: str, cancelled: Optional[threading.Event] = None
+) -> Optional[dict]:
+    """Relanza una crew de una sola task (reparación dirigida) y devuelve su JSON."""
+    _raise_if_cancelled(cancelled, crew_name)
+    return _result_json(kickoff_with_fallback(crew_name, inputs, Priority.SETUP), required_key)
+
+
+def _repair_blueprint(
+    crew_inputs: Dict[str, str], scene_blueprint_json: Optional[dict], cancelled: Optional[threading.Event] = None
+) -> dict:
+    return repair_artifact(
+        "create_scene_blueprint",
+        scene_blueprint_json,
+        validate_scene_blueprint,
+        lambda fb: _regenerate("blueprint_crew", {**crew_inputs, "validation_feedback": fb}, "scene_id", cancelled),
+    )
+
+
+def _repair_characters(
+    scene_blueprint_json: dict, characters_json: Optional[dict], cancelled: Optional[threading.Event] = None
+) -> dict:
+    def _regen(fb: str) -> Optional[dict]:
+        inputs = {
+            "scene_blueprint": compact_json(project_blueprint(scene_blueprint_json, "suspect")),
+            "validation_feedback": fb,
+        }
+        return autofix_characters(_regenerate("characters_crew", inputs, "suspects", cancelled))
+
+    return repair_artifact(
+        "define_characters",
+        autofix_characters(characters_json),
+        lambda c: validate_characters(c, scene_blueprint_json),
+        _regen,
+    )
+
+
+def _repair_solution(
+    crew_inputs: Dict[str, str],
+    scene_blueprint_json: dict,
+    characters_json: dict,
+    solution_json: Optional[dict],
+    cancelled: Optional[threading.Event] = None,
+) -> Optional[dict]:
+    """La solución solo se usa en el epílogo: si no se puede reparar, la partida sigue sin ella."""
+    try:
+        return repair_artifact(
+            "create_solution",
+            solution_json,
+            lambda s: validate_solution(s, characters_json),
+            lambda fb: _regenerate(
+                "solution_crew",
+                _solution_inputs(crew_inputs, scene_blueprint_json, characters_json, fb),
+                "truth_summary",
+                cancelled,
+            ),
+        )
+    except CaseValidationError as e:
+        print(f"[VALIDATE] {e}; continuing without a verified solution")
+        return None
+
+
+def _generate_case_fanout(
+    crew_inputs: Dict[str, str],
+    forward: Callable[[str, Any], None],
+    publish: Callable[[str, Optional[dict]], None],
+    done: Optional[Dict[str, dict]] = None,
+    cancelled: Optional[threading.Event] = None,
+) -> Tuple[dict, dict, Optional[dict]]:
+    """
+    Escena -> 4 sospechosos en paralelo (uno por llamada) -> solución.
+    Devuelve (scene_blueprint, characters, solution).
+
+    Si el fan-out no sale (FanoutError) los sospechosos se piden en una sola
+    llamada a characters_crew sobre el MISMO blueprint: ya está publicado y
+    en el checkpoint, el jugador lo está viendo.
+
+    Las etapas que ya estén en `done` (checkpoints de una partida que se
+    reanuda) no se vuelven a lanzar.
+    """
+    done = done or {}
+    scene_blueprint_json = done.get("create_scene_blueprint")
+    if scene_blueprint_json is None:
+        _raise_if_cancelled(cancelled, "blueprint_crew")
+        result = kickoff_with_fallback("blueprint_crew", crew_inputs, Priority.SETUP, task_listener=forward)
+        scene_blueprint_json = _crew_json(result, "scene_blueprint.json", "scene_id")
+        # Las semillas tienen que ser válidas antes de repartir el trabajo
+        scene_blueprint_json = _repair_blueprint(crew_inputs, scene_blueprint_json, cancelled)
+        publish("create_scene_blueprint", scene_blueprint_json)
+
+    def _run_suspect(inputs: Dict[str, str]) -> Optional[dict]:
+        _raise_if_cancelled(cancelled, "suspect_crew")
+        res = kickoff_with_fallback("suspect_crew", inputs, Priority.SETUP)
+        return _result_json(res, "secret_motivation")
+
+    characters_json = done.get("define_characters")
+    if characters_json is None:
+        try:
+            characters_json = generate_characters(scene_blueprint_json, _run_suspect)
+        except FanoutError as e:
+            print(f"[FANOUT] {e}; falling back to characters_crew on the accepted blueprint")
+            inputs = {
+                "scene_blueprint": compact_json(project_blueprint(scene_blueprint_json, "suspect")),
+                "validation_feedback": "",
+            }
+            # Si tampoco sale, _finish lo repara con _repair_characters (mismo blueprint)
+            characters_json = _regenerate("characters_crew", inputs, "suspects", cancelled)
+        os.makedirs(artifacts_dir(), exist_ok=True)
+        with open(os.path.join(artifacts_dir(), "characters.json"), "w", encoding="utf-8") as f:
+            json.dump(characters_json, f, ensure_ascii=False, indent=2)
+        publish("define_characters", characters_json)
+
+    if "create_solution" in done:
+        return scene_blueprint_json, characters_json, done["create_solution"]
+
+    _raise_if_cancelled(cancelled, "solution_crew")
+    result = kickoff_with_fallback(
+        "solution_crew",
+        _solution_inputs(crew_inputs, scene_blueprint_json, characters_json),
+        Priority.SETUP,
+        task_listener=forward,
+    )
+    solution_json = _crew_json(result, "solution.json", "truth_summary")
+    return scene_blueprint_json, characters_json, solution_json
+
+
+def generate_case_with_crew(
+    on_task_done: Optional[Callable[[str, Optional[dict]], None]] = None,
+    cancelled: Optional[threading.Event] = None,
+    checkpoint: Optional[CaseCheckpoint] = None,
+) -> Dict:
+    """
+    Usa la Crew para generar escena, sospechosos y solución.
+    Los retratos no forman parte de la crew: ver CaseGenerationJob.portraits.
+
+    `on_task_done(task_name, parsed_json)` se llama según va terminando cada
+    task de setup, para que la UI pueda ir mostrando el caso por partes. Solo
+    recibe artifacts que han pasado el validador local; los que fallan se
+    reparan relanzando únicamente su task (ver cluedogenai.validation).
+
+    Con `cancelled` activado se corta en la siguiente task que termine y
+    antes de cada kickoff o reparación (CaseGenerationCancelled): no se
+    lanzan más llamadas para nadie.
+
+    Con `checkpoint` cada artifact aceptado se guarda en disco en cuanto pasa
+    el validador. Si el checkpoint ya tiene tasks de un intento anterior, se
+    reanuda desde la primera que falte (mismos inputs).
+
+    Aquí no se borran retratos: generated_images es de todas las sesiones
+    del proceso y cada partida borra solo los suyos (PortraitQueue.discard).
+
+    Devuelve un bundle: {"case", "scene_blueprint", "characters", "solution"}.
+    """
+    resumed: Dict[str, dict] = checkpoint.completed() if checkpoint is not None else {}
+    crew_inputs = (checkpoint.inputs() if resumed else None) or {
+        "topic": CREW_TOPIC,
+        "current_year": str(datetime.now().year),
+        "game_state": json.dumps(DEFAULT_BASE_CASE, ensure_ascii=False),
+        "player_action": "We are starting the game. Design the opening scene and the full cast of suspects.",
+        "validation_feedback": "",
+    }
+
+    # Lo ya hecho sale del checkpoint, no de artifacts/: se limpia siempre
+    _clean_artifacts()
+    if resumed:
+        print(f"[CHECKPOINT] resuming {checkpoint.game_id} from {checkpoint.first_incomplete() or 'assembly'}")
+    elif checkpoint is not None:
+        checkpoint.save_inputs(crew_inputs)
+
+    accepted: Dict[str, dict] = {}
+
+    def _publish(task_name: str, parsed: Optional[dict]) -> None:
+        if cancelled is not None and cancelled.is_set():
+            raise CaseGenerationCancelled(f"case generation cancelled after {task_name}")
+        if task_name == "define_characters":
+            # Se valida la versión con autofix: es esa la que se guarda y se publica
+            parsed = autofix_characters(parsed)
+        if parsed is None or accepted.get(task_name) == parsed:
+            return
+        errors = validate_artifact(task_name, parsed, accepted)
+        if errors:
+            print(f"[VALIDATE] {task_name} held back until repaired: {'; '.join(errors)}")
+            return
+        accepted[task_name] = parsed
+        if checkpoint is not None:
+            checkpoint.save(task_name, parsed)
+        if on_task_done is not None:
+            on_task_done(task_name, parsed)
+
+    def _forward(task_name: str, output) -> None:
+        _publish(task_name, parse_task_output(task_name, output))
+
+    def _finish(scene_blueprint_json, characters_json, solution_json) -> Dict:
+        scene_blueprint_json = _repair_blueprint(crew_inputs, scene_blueprint_json, cancelled)
+        _publish("create_scene_blueprint", scene_blueprint_json)
+        characters_json = _repair_characters(scene_blueprint_json, characters_json, cancelled)
+        _publish("define_characters", characters_json)
+        solution_json = _repair_solution(crew_inputs, scene_blueprint_json, characters_json, solution_json, cancelled)
+        _publish("create_solution", solution_json)
+        print(f"[JSON] {format_repair_stats()}")
+        bundle = _assemble_case_bundle(scene_blueprint_json, characters_json, solution_json)
+        if checkpoint is not None:
+            checkpoint.mark_complete()
+        return bundle
+
+    # Lo que ya estaba en checkpoint se publica tal cual: la UI lo pinta sin esperar
+    for task_name, artifact in resumed.items():
+        accepted[task_name] = artifact
+        if on_task_done is not None:
+            on_task_done(task_name, artifact)
+
+    if resumed:
+        # Reanudar siempre por etapas: setup_crew no sabe saltarse las tasks hechas
+        try:
+            return _finish(*_generate_case_fanout(crew_inputs, _forward, _publish, done=resumed, cancelled=cancelled))
+        except (CaseValidationError, CaseGenerationCancelled):
+            raise
+        except Exception as e:
+            raise RuntimeError(f"resuming {checkpoint.game_id} crashed:\n" + traceback.format_exc()) from e
+
+    if fanout_enabled():
+        try:
+            return _finish(*_generate_case_fanout(crew_inputs, _forward, _publish, cancelled=cancelled))
+        except (CaseValidationError, CaseGenerationCancelled):
+            raise
+        except Exception as e:
+            raise RuntimeError("fan-out case generation crashed:\n" + traceback.format_exc()) from e
+
+    # setup_crew solo sin fan-out: a partir del blueprint publicado nunca se rehace la escena
+    _raise_if_cancelled(cancelled, "setup_crew")
+    try:
+        result = kickoff_with_fallback("setup_crew", crew_inputs, Priority.SETUP, task_listener=_forward)
+    except CaseGenerationCancelled:
+        raise
+    except Exception as e:
+        raise RuntimeError("setup_crew kickoff crashed:\n" + traceback.format_exc()) from e
+
+
+    # después del kickoff: de tasks_output de esta kickoff, no de artifacts/ (compartido)
+    scene_blueprint_json = _crew_json(result, "scene_blueprint.json", "scene_id")
+    characters_json      = _crew_json(result, "characters.json", "suspects")
+    solution_json = _crew_json(result, "solution.json", "truth_summary")
+
+    # --- VALIDATE & REPAIR (solo las tasks que fallen) ---
+    return _finish(scene_blueprint_json, characters_json, solution_json)
+
+
+def _assemble_case_bundle(
+    scene_blueprint_json: Optional[dict],
+    characters_json: Optional[dict],
+    solution_json: Optional[dict],
+) -> Dict:
+    # --- ENRICH CASE DETAILS (from scene_blueprint.json) ---
+    base_case = build_base_case(scene_blueprint_json)
+
+    if not characters_json or "suspects" not in characters_json:
+        raise RuntimeError("Invalid characters JSON")
+
+    # 1) Guilty
+    guilty_name = find_guilty_name(characters_json)
+
+    # 2) Los retratos llegan después, desde la PortraitQueue (image_path None hasta entonces)
+    case = dict(base_case)
+    case["suspects"] = build_suspects(characters_json, guilty_name)
+    case["guilty_name"] = guilty_name
+
+    return {
+        "case": case,
+        "scene_blueprint": scene_blueprint_json,
+        "characters": characters_json,
+        "solution": solution_json,
+    }
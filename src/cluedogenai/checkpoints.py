@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Checkpoints de la generación del caso, por partida.
+
+Cada artifact que pasa el validador (blueprint, sospechosos, solución) se
+guarda en `artifacts/checkpoints/<game_id>/<task>.json` en cuanto se acepta.
+Si la generación falla a medias (un 429 en la solución, el proceso que se
+reinicia...), al reanudar con el mismo game_id se parte de la primera task
+que falta: un fallo transitorio cuesta una task, no el pipeline entero.
+
+CLUEDO_CHECKPOINTS=1 (defecto) | 0
+CLUEDO_CHECKPOINT_DIR          carpeta raíz (artifacts/checkpoints)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import secrets
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Orden de las tasks de setup: se reanuda desde la primera que no tenga checkpoint
+SETUP_ORDER = ("create_scene_blueprint", "define_characters", "create_solution")
+
+INPUTS_FILE = "inputs.json"
+COMPLETE_FILE = "complete"
+
+
+def checkpoints_enabled() -> bool:
+    return os.getenv("CLUEDO_CHECKPOINTS", "1").strip().lower() in ("1", "true", "yes")
+
+
+def checkpoint_root() -> str:
+    return os.getenv("CLUEDO_CHECKPOINT_DIR") or os.path.join(ROOT_DIR, "artifacts", "checkpoints")
+
+
+def new_game_id() -> str:
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{secrets.token_hex(3)}"
+
+
+def _write_json(path: str, obj: Any) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)  # atómico: un checkpoint nunca queda a medias
+
+
+def _read_json(path: str) -> Optional[Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class CaseCheckpoint:
+    """Los artifacts validados de una partida, uno por task."""
+
+    def __init__(self, game_id: str, root: Optional[str] = None) -> None:
+        self.game_id = game_id
+        self.path = os.path.join(root or checkpoint_root(), game_id)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def save(self, task_name: str, artifact: Dict[str, Any]) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        _write_json(self._file(f"{task_name}.json"), artifact)
+        print(f"[CHECKPOINT] {self.game_id}: {task_name} saved")
+
+    def load(self, task_name: str) -> Optional[Dict[str, Any]]:
+        obj = _read_json(self._file(f"{task_name}.json"))
+        return obj if isinstance(obj, dict) else None
+
+    def completed(self) -> Dict[str, Dict[str, Any]]:
+        """Las tasks con checkpoint, en orden y sin huecos (un hueco invalida lo que va detrás)."""
+        done: Dict[str, Dict[str, Any]] = {}
+        for task_name in SETUP_ORDER:
+            artifact = self.load(task_name)
+            if artifact is None:
+                break
+            done[task_name] = artifact
+        return done
+
+    def first_incomplete(self) -> Optional[str]:
+        done = self.completed()
+        return next((t for t in SETUP_ORDER if t not in done), None)
+
+    def save_inputs(self, inputs: Dict[str, str]) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        _write_json(self._file(INPUTS_FILE), inputs)
+
+    def inputs(self) -> Optional[Dict[str, str]]:
+        obj = _read_json(self._file(INPUTS_FILE))
+        return obj if isinstance(obj, dict) else None
+
+    def mark_complete(self) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._file(COMPLETE_FILE), "w", encoding="utf-8") as f:
+            f.write(datetime.now().isoformat(timespec="seconds"))
+
+    def is_complete(self) -> bool:
+        return os.path.exists(self._file(COMPLETE_FILE))
+
+
+def list_games(root: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Partidas con checkpoints, la más reciente primero."""
+    root = root or checkpoint_root()
+    if not os.path.isdir(root):
+        return []
+    games = []
+    for game_id in os.listdir(root):
+        if not os.path.isdir(os.path.join(root, game_id)):
+            continue
+        cp = CaseCheckpoint(game_id, root)
+        games.append({
+            "game_id": game_id,
+            "completed": list(cp.completed()),
+            "next": cp.first_incomplete(),
+            "complete": cp.is_complete(),
+            "mtime": os.path.getmtime(cp.path),
+        })
+    return sorted(games, key=lambda g: g["mtime"], reverse=True)
+
+
+def latest_incomplete(root: Optional[str] = None) -> Optional[str]:
+    return next((g["game_id"] for g in list_games(root) if not g["complete"]), None)
@@ -1,8 +1,42 @@
-from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
+import os
+import time
+
+from crewai import Agent, Crew, LLM, Process, Task
+from crewai.project import CrewBase, agent, before_kickoff, crew, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
+from crewai.llms.base_llm import BaseLLM
+from crewai.llms.providers.gemini.completion import GeminiCompletion
+from google.genai import types as genai_types
+from .routing import get_router, routing_task
+from .scheduler import CaseGenerationCancelled
 from .tools.image_tools import CharacterImageGeneratorTool
-from typing import List
+from typing import Any, Callable, Dict, List, Optional
+
+
+def lean_dialogue_enabled() -> bool:
+    """CLUEDO_LEAN_DIALOGUE=0 vuelve al schema completo (con inner_thoughts)."""
+    return os.getenv("CLUEDO_LEAN_DIALOGUE", "1").strip().lower() not in ("0", "false", "no")
+
+
+class ThinkingGemini(GeminiCompletion):
+    """
+    GeminiCompletion con thinking budget. El de crewAI construye el
+    GenerateContentConfig sin thinking_config y deja los kwargs que no conoce
+    en additional_params, donde nadie los lee.
+    """
+
+    def __init__(self, *args: Any, thinking_budget: Optional[int] = None, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.thinking_budget = thinking_budget
+
+    def _prepare_generation_config(self, *args: Any, **kwargs: Any):
+        config = super()._prepare_generation_config(*args, **kwargs)
+        if self.thinking_budget is None:
+            return config
+        thinking = genai_types.ThinkingConfig(thinking_budget=self.thinking_budget)
+        return config.model_copy(update={"thinking_config": thinking})
+
+
 # If you want to run a snippet of code before or after the crew starts,
 # you can use the @before_kickoff and @after_kickoff decorators
 # https://docs.crewai.com/concepts/crews#example-crew-class-with-decorators
@@ -12,17 +46,88 @@ class Cluedogenai():
     """Cluedogenai crew"""
 
     agents: List[BaseAgent]
+    # callable(task_name, TaskOutput) llamado al terminar cada task (ver _record_task_done)
+    task_listener: Optional[Callable[[str, Any], None]] = None
 
     # Learn more about YAML configuration files here:
     # Agents: https://docs.crewai.com/concepts/agents#yaml-configuration-recommended
     # Tasks: https://docs.crewai.com/concepts/tasks#yaml-configuration-recommended
     
+    # ---------- Routing de modelos (config/models.yaml) ----------
+
+    def _llm_for(self, task_name: str, agent_name: str, word_cap: bool = True) -> BaseLLM:
+        """Elige el modelo de `task_name` según el router; por defecto el llm del agente."""
+        default = self.agents_config[agent_name].get("llm")  # type: ignore[index]
+        if not isinstance(default, str):
+            default = getattr(default, "model", None)
+        model = get_router().select(task_name, default=default)
+        self.routed_models[task_name] = model
+        params = get_router().llm_params(task_name, model, word_cap=word_cap)
+        if "thinking_budget" in params:
+            # Solo modelos gemini-2.5 (ver ModelRouter.thinking_budget): proveedor nativo + thinking_config
+            return ThinkingGemini(model=model.split("/", 1)[-1], provider="gemini", **params)
+        return LLM(model=model, **params)
+
+    @property
+    def routed_models(self) -> Dict[str, str]:
+        """task -> modelo elegido al construir esta instancia."""
+        if not hasattr(self, "_routed_models"):
+            self._routed_models = {}
+        return self._routed_models
+
+    @before_kickoff
+    def _start_task_clock(self, inputs: Optional[dict]) -> Optional[dict]:
+        self._task_clock = time.perf_counter()
+        self._completed_tasks = []
+        return inputs
+
+    def _record_task_done(self, output) -> None:
+        """task_callback: latencia de cada task = tiempo desde que acabó la anterior."""
+        now = time.perf_counter()
+        task_name = getattr(output, "name", None) or ""
+        started = getattr(self, "_task_clock", now)
+        self._task_clock = now
+        self._completed_tasks = getattr(self, "_completed_tasks", []) + [task_name]
+        get_router().record(task_name, self.routed_models.get(task_name), now - started, ok=True)
+
+        # Listener opcional (app.py): permite mostrar el caso según van acabando las tasks
+        listener = getattr(self, "task_listener", None)
+        if listener is not None:
+            try:
+                listener(task_name, output)
+            except CaseGenerationCancelled:
+                raise  # la partida se abandonó: que la crew no siga con sus tasks
+            except Exception as e:
+                print(f"[CREW] task_listener failed for {task_name}: {e}")
+
+    def record_failure(self, task_names: List[str], error: BaseException) -> None:
+        """Atribuye un fallo de kickoff a la primera task de `task_names` que no terminó."""
+        done = getattr(self, "_completed_tasks", [])
+        pending = [t for t in task_names if t not in done]
+        if not pending:
+            return
+        started = getattr(self, "_task_clock", time.perf_counter())
+        get_router().record(
+            pending[0], self.routed_models.get(pending[0]),
+            time.perf_counter() - started, ok=False, error=error,
+        )
+
     # If you would like to add tools to your agents, you can learn more about it here:
     # https://docs.crewai.com/concepts/agents#agent-tools
     @agent
     def narrative_agent(self) -> Agent:
         return Agent(
             config=self.agents_config['narrative_agent'], # type: ignore[index]
+            llm=self._llm_for("create_scene_blueprint", "narrative_agent"),
+            verbose=True
+        )
+
+    @agent
+    def solution_agent(self) -> Agent:
+        """Mismo perfil que narrative_agent, pero con el modelo enrutado para create_solution."""
+        return Agent(
+            config=self.agents_config['narrative_agent'], # type: ignore[index]
+            llm=self._llm_for("create_solution", "narrative_agent"),
             verbose=True
         )
 
@@ -30,13 +135,25 @@ class Cluedogenai():
     def character_agent(self) -> Agent:
         return Agent(
             config=self.agents_config['character_agent'], # type: ignore[index]
+            llm=self._llm_for("define_characters", "character_agent"),
             verbose=True
         )
     
+    @agent
+    def suspect_agent(self) -> Agent:
+        """Perfil de character_agent, enrutado para define_suspect (un sospechoso por llamada)."""
+        return Agent(
+            config=self.agents_config['character_agent'], # type: ignore[index]
+            llm=self._llm_for("define_suspect", "character_agent"),
+            verbose=False
+        )
+
     @agent
     def dialogue_agent(self) -> Agent:
         return Agent(
             config=self.agents_config['dialogue_agent'], # type: ignore[index]
+            # El tope de word_target es del schema lean: el completo lleva además inner_thoughts
+            llm=self._llm_for("generate_suspect_dialogue", "dialogue_agent", word_cap=lean_dialogue_enabled()),
             verbose=True
         )
     
@@ -44,6 +161,7 @@ class Cluedogenai():
     def vision_agent(self) -> Agent:
         return Agent(
             config=self.agents_config['vision_agent'],  # type: ignore[index]
+            llm=self._llm_for("design_scene_visuals", "vision_agent"),
             tools=[CharacterImageGeneratorTool()],
             verbose=True,
             allow_delegation=False,  # probar a cambiar a True si quieres que delegue
@@ -69,8 +187,11 @@ class Cluedogenai():
     
     @task
     def generate_suspect_dialogue(self) -> Task:
+        # Modo lean: schema sin inner_thoughts y salida acotada (camino más caliente del juego)
+        config_key = "generate_suspect_dialogue_lean" if lean_dialogue_enabled() else "generate_suspect_dialogue"
         return Task(
-            config=self.tasks_config['generate_suspect_dialogue'], # type: ignore[index]
+            name=routing_task(config_key),
+            config=self.tasks_config[config_key], # type: ignore[index]
             agent=self.dialogue_agent(),
             context=[self.create_scene_blueprint(), self.define_characters()],
         )
@@ -87,26 +208,54 @@ class Cluedogenai():
     def create_solution(self) -> Task:
         return Task(
             config=self.tasks_config["create_solution"],
-            agent=self.narrative_agent(),
+            agent=self.solution_agent(),
             context=[self.create_scene_blueprint(), self.define_characters()],
         )
 
+    # ---------- Modo fan-out: tasks sueltas que reciben sus datos como inputs ----------
+
+    @task
+    def define_suspect(self) -> Task:
+        return Task(
+            config=self.tasks_config['define_suspect'], # type: ignore[index]
+            agent=self.suspect_agent(),
+        )
+
+    @task
+    def define_characters_from_inputs(self) -> Task:
+        # Reparación dirigida: mismo nombre que define_characters (routing, métricas, artifact)
+        return Task(
+            name=routing_task("define_characters_from_inputs"),
+            config=self.tasks_config['define_characters_from_inputs'], # type: ignore[index]
+            agent=self.character_agent(),
+        )
+
+    @task
+    def create_solution_from_inputs(self) -> Task:
+        # Mismo nombre que create_solution: comparten routing, métricas y artifact
+        return Task(
+            name=routing_task("create_solution_from_inputs"),
+            config=self.tasks_config['create_solution_from_inputs'], # type: ignore[index]
+            agent=self.solution_agent(),
+        )
+
     @crew
     def setup_crew(self) -> Crew:
         """Crew solo para generar la escena inicial y los sospechosos."""
         return Crew(
+            # Los retratos van fuera del camino crítico (ver portraits.PortraitQueue)
             agents=[
                 self.narrative_agent(),
                 self.character_agent(),
-                self.vision_agent(),
+                self.solution_agent(),
             ],
             tasks=[
                 self.create_scene_blueprint(),
                 self.define_characters(),
-                self.design_scene_visuals(),
                 self.create_solution(),   # ✅ ADD THIS
             ],
             process=Process.sequential,
+            task_callback=self._record_task_done,
             verbose=True,
         )
 
@@ -122,10 +271,55 @@ class Cluedogenai():
                 self.generate_suspect_dialogue(),
             ],
             process=Process.sequential,
+            task_callback=self._record_task_done,
             verbose=False,  # menos ruido en consola
         )
 
 
+    @crew
+    def blueprint_crew(self) -> Crew:
+        """Solo la escena (primer paso del modo fan-out)."""
+        return Crew(
+            agents=[self.narrative_agent()],
+            tasks=[self.create_scene_blueprint()],
+            process=Process.sequential,
+            task_callback=self._record_task_done,
+            verbose=True,
+        )
+
+    @crew
+    def suspect_crew(self) -> Crew:
+        """Un único sospechoso; app.py lanza una por sospechoso en paralelo."""
+        return Crew(
+            agents=[self.suspect_agent()],
+            tasks=[self.define_suspect()],
+            process=Process.sequential,
+            task_callback=self._record_task_done,
+            verbose=False,
+        )
+
+    @crew
+    def characters_crew(self) -> Crew:
+        """Solo los sospechosos, a partir de un scene_blueprint ya generado (input scene_blueprint)."""
+        return Crew(
+            agents=[self.character_agent()],
+            tasks=[self.define_characters_from_inputs()],
+            process=Process.sequential,
+            task_callback=self._record_task_done,
+            verbose=True,
+        )
+
+    @crew
+    def solution_crew(self) -> Crew:
+        """Solución a partir de escena + sospechosos ya generados (inputs scene_blueprint/characters)."""
+        return Crew(
+            agents=[self.solution_agent()],
+            tasks=[self.create_solution_from_inputs()],
+            process=Process.sequential,
+            task_callback=self._record_task_done,
+            verbose=True,
+        )
+
     # Si quieres, puedes dejar la crew “grande” tal cual para tests manuales:
     @crew
     def full_crew(self) -> Crew:
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Caché de respuestas del diálogo.
+
+Clave: (caso, sospechoso, pregunta normalizada, hash de la memoria del
+sospechoso). Si el jugador repite una pregunta y el sospechoso no ha
+revelado nada nuevo desde entonces, el estado del interrogatorio es el mismo
+y la respuesta también: se sirve sin llamar a dialogue_crew.
+
+Capa semántica opcional (CLUEDO_DIALOGUE_CACHE_SEMANTIC=1): si no hay
+coincidencia exacta, se compara la pregunta por embeddings locales con las
+ya cacheadas para ese mismo estado y se acepta por encima del umbral.
+
+CLUEDO_DIALOGUE_CACHE_SIZE   entradas máximas (LRU), 0 = desactivada (256)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from .embeddings import embed, normalize_text, similarity_threshold, top_k
+
+DEFAULT_SIZE = 256
+
+Key = Tuple[str, str, str, str]
+State = Tuple[str, str, str]
+
+
+def _digest(obj: Any) -> str:
+    raw = json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def case_id(scene_blueprint: Optional[dict], characters: Optional[dict]) -> str:
+    """Identificador estable del caso (el scene_id solo no basta: los modelos lo repiten)."""
+    return _digest([scene_blueprint or {}, characters or {}])
+
+
+def memory_hash(memory: Optional[Dict]) -> str:
+    memory = memory or {}
+    return _digest([sorted(memory.get("revealed_facts") or []), sorted(memory.get("implied_clues") or [])])
+
+
+class DialogueCache:
+    """LRU de respuestas, con índice semántico opcional por estado (caso, sospechoso, memoria)."""
+
+    def __init__(self, max_entries: int = DEFAULT_SIZE, semantic: bool = False) -> None:
+        self.max_entries = max_entries
+        self.semantic = semantic
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Key, Dict[str, Any]]" = OrderedDict()
+        self._vectors: Dict[Key, Any] = {}  # solo con la capa semántica
+        self.hits = {"exact": 0, "semantic": 0}
+        self.misses = 0
+
+    @staticmethod
+    def key(case: str, suspect_name: str, question: str, memory: Optional[Dict]) -> Key:
+        return (case, suspect_name, normalize_text(question), memory_hash(memory))
+
+    def get(self, key: Key, question: str) -> Optional[Dict[str, Any]]:
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            out = self._entries.get(key)
+            if out is not None:
+                self._entries.move_to_end(key)
+                self.hits["exact"] += 1
+                return dict(out)
+        if self.semantic:
+            out = self._semantic_get(key, question)
+            if out is not None:
+                return out
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _semantic_get(self, key: Key, question: str) -> Optional[Dict[str, Any]]:
+        state: State = (key[0], key[1], key[3])
+        with self._lock:
+            candidates = [(k, v) for k, v in self._vectors.items() if (k[0], k[1], k[3]) == state]
+        if not candidates:
+            return None
+        query = embed([question])[0]
+        (idx, score), = top_k(query, np.stack([v for _, v in candidates]), 1)
+        if score < similarity_threshold():
+            return None
+        hit = candidates[idx][0]
+        with self._lock:
+            out = self._entries.get(hit)
+            if out is None:
+                return None
+            self._entries.move_to_end(hit)
+            self.hits["semantic"] += 1
+        print(f"[CACHE] semantic hit {key[1]}: {key[2]!r} ~ {hit[2]!r} ({score:.2f})")
+        return dict(out)
+
+    def put(self, key: Key, question: str, answer: Dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        vector = None
+        if self.semantic:
+            vector = embed([question])[0]
+        with self._lock:
+            self._entries[key] = dict(answer)
+            self._entries.move_to_end(key)
+            if vector is not None:
+                self._vectors[key] = vector
+            while len(self._entries) > self.max_entries:
+                old, _ = self._entries.popitem(last=False)
+                self._vectors.pop(old, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": dict(self.hits), "misses": self.misses}
+
+
+_CACHE: Optional[DialogueCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_dialogue_cache() -> DialogueCache:
+    """Caché compartida por todo el proceso (las claves ya llevan el caso)."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = DialogueCache(
+                max_entries=int(os.getenv("CLUEDO_DIALOGUE_CACHE_SIZE", str(DEFAULT_SIZE))),
+                semantic=os.getenv("CLUEDO_DIALOGUE_CACHE_SEMANTIC", "0").strip().lower() in ("1", "true", "yes"),
+            )
+        return _CACHE
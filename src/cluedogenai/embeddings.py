@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Embeddings locales (CPU) para comparar preguntas y trozos de caso.
+
+Backend por defecto: all-MiniLM-L6-v2 en ONNX, el que trae chromadb (ya es
+dependencia de crewAI), sin llamadas a ninguna API. Si no se puede cargar
+(sin red para bajar el modelo la primera vez, chromadb sin onnxruntime...)
+se usa un vectorizador de hashing de palabras + trigramas de caracteres:
+peor semánticamente, pero determinista y sin dependencias.
+
+CLUEDO_EMBEDDINGS=minilm (defecto) | hashing
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import unicodedata
+import zlib
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+HASHING_DIM = 512
+
+# Umbral de coseno para considerar "la misma pregunta" según el backend
+DEFAULT_THRESHOLDS = {"minilm": 0.82, "hashing": 0.62}
+
+_lock = threading.Lock()
+_model = None
+_backend: Optional[str] = None
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sin acentos ni puntuación, espacios colapsados."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return " ".join(_WORD_RE.findall(text))
+
+
+def _load() -> str:
+    global _model, _backend
+    with _lock:
+        if _backend is not None:
+            return _backend
+        wanted = os.getenv("CLUEDO_EMBEDDINGS", "minilm").strip().lower()
+        if wanted == "minilm":
+            try:
+                from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+                model = ONNXMiniLM_L6_V2(preferred_providers=["CPUExecutionProvider"])
+                model(["warm up"])  # descarga/carga el modelo ahora, no en la primera pregunta
+                _model, _backend = model, "minilm"
+                return _backend
+            except Exception as e:
+                print(f"[EMBED] MiniLM unavailable ({e}); using hashing vectors")
+        _backend = "hashing"
+        return _backend
+
+
+def backend() -> str:
+    return _load()
+
+
+def similarity_threshold() -> float:
+    raw = os.getenv("CLUEDO_SEMANTIC_THRESHOLD", "").strip()
+    if raw:
+        return float(raw)
+    return DEFAULT_THRESHOLDS[backend()]
+
+
+def _hashing_vectors(texts: Sequence[str]) -> np.ndarray:
+    out = np.zeros((len(texts), HASHING_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        norm = normalize_text(text)
+        feats: List[str] = norm.split()
+        padded = f" {norm} "
+        feats += [padded[i:i + 3] for i in range(max(0, len(padded) - 2))]
+        for feat in feats:
+            h = zlib.crc32(feat.encode("utf-8"))
+            out[row, h % HASHING_DIM] += 1.0 if (h >> 16) & 1 else -1.0
+    return out
+
+
+def embed(texts: Sequence[str]) -> np.ndarray:
+    """Matriz (n, d) float32 con filas normalizadas L2 (coseno = producto escalar)."""
+    if not texts:
+        return np.zeros((0, HASHING_DIM), dtype=np.float32)
+    if _load() == "minilm":
+        vecs = np.asarray(_model(list(texts)), dtype=np.float32)  # type: ignore[misc]
+    else:
+        vecs = _hashing_vectors(texts)
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vecs / norms
+
+
+def top_k(query: np.ndarray, matrix: np.ndarray, k: int) -> List[tuple]:
+    """[(índice, coseno)] de las k filas de `matrix` más parecidas a `query` (ambas normalizadas)."""
+    if matrix.size == 0 or k <= 0:
+        return []
+    scores = matrix @ query.reshape(-1)
+    k = min(k, scores.shape[0])
+    idx = np.argpartition(-scores, k - 1)[:k]
+    idx = idx[np.argsort(-scores[idx])]
+    return [(int(i), float(scores[i])) for i in idx]
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Generación de sospechosos en fan-out: una llamada pequeña por sospechoso.
+
+define_characters pide al modelo los 4 perfiles y el culpable en una sola
+generación larga. En modo fan-out:
+
+  1. los nombres/roles salen de `suspect_seeds` del scene_blueprint,
+  2. el culpable y el color de ropa se deciden aquí con un RNG con semilla
+     (reproducible con CLUEDO_CASE_SEED, en vez de pedir "hazlo aleatorio"),
+  3. cada perfil se genera en paralelo con su propio prompt (suspect_crew),
+  4. se fusionan y validan con la forma de characters.json de siempre.
+
+Este módulo no sabe nada de Streamlit ni de crewAI: app.py le pasa la
+función que lanza la crew de un sospechoso.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from .projections import compact_json, project_blueprint
+from .scheduler import CaseGenerationCancelled
+
+SUSPECT_COUNT = 4
+
+REQUIRED_PROFILE_FIELDS = ("age", "personality", "physical_description", "clue_object", "secret_motivation", "alibi")
+
+CLOTHING_COLORS = (
+    "deep burgundy", "mustard yellow", "navy blue", "forest green", "charcoal grey",
+    "burnt orange", "ivory white", "plum purple", "teal", "oxblood red",
+)
+
+CASE_ROLE_GUILTY = (
+    "GUILTY. This suspect is the murderer. Their secret motivation is the real motive, "
+    "their alibi is false but plausible, and their clue object quietly points at the method."
+)
+CASE_ROLE_INNOCENT = (
+    "INNOCENT of the murder, but hiding something unrelated that makes them look suspicious. "
+    "Their alibi is true but hard to verify."
+)
+
+
+class FanoutError(RuntimeError):
+    """El modo fan-out no puede continuar (semillas inválidas o un perfil que no se pudo generar)."""
+
+
+def fanout_enabled() -> bool:
+    """CLUEDO_FANOUT_CHARACTERS=0 vuelve a define_characters en una sola llamada."""
+    return os.getenv("CLUEDO_FANOUT_CHARACTERS", "1").strip().lower() not in ("0", "false", "no")
+
+
+def case_seed() -> int:
+    """Semilla del reparto: CLUEDO_CASE_SEED si está definida, si no una aleatoria del sistema."""
+    raw = os.getenv("CLUEDO_CASE_SEED", "").strip()
+    if raw:
+        return int(raw)
+    return random.SystemRandom().randrange(2 ** 31)
+
+
+def read_suspect_seeds(scene_blueprint: Optional[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Las 4 semillas {id, name, role} del blueprint, o FanoutError si no son utilizables."""
+    seeds = (scene_blueprint or {}).get("suspect_seeds")
+    if not isinstance(seeds, list):
+        raise FanoutError("scene_blueprint has no suspect_seeds list")
+
+    out: List[Dict[str, str]] = []
+    names = set()
+    for i, seed in enumerate(seeds, start=1):
+        if not isinstance(seed, dict):
+            continue
+        name = str(seed.get("name") or "").strip()
+        role = str(seed.get("role") or "").strip()
+        if not name or not role or name.lower() in names:
+            continue
+        names.add(name.lower())
+        out.append({"id": str(seed.get("id") or f"suspect_{i}"), "name": name, "role": role})
+
+    if len(out) != SUSPECT_COUNT:
+        raise FanoutError(f"expected {SUSPECT_COUNT} usable suspect_seeds, got {len(out)}")
+    victim = str((scene_blueprint or {}).get("victim_name") or "").strip().lower()
+    if victim and victim in names:
+        raise FanoutError("a suspect seed has the victim's name")
+    return out
+
+
+def plan_cast(seeds: List[Dict[str, str]], seed: int) -> Dict[str, Any]:
+    """Decide culpable y colores de ropa con un RNG local (misma semilla -> mismo reparto)."""
+    rng = random.Random(seed)
+    guilty = rng.choice(seeds)["name"]
+    colors = rng.sample(CLOTHING_COLORS, len(seeds))
+    return {
+        "seed": seed,
+        "guilty_name": guilty,
+        "colors": {s["name"]: c for s, c in zip(seeds, colors)},
+    }
+
+
+def suspect_inputs(
+    scene_blueprint: Dict[str, Any],
+    suspect_seed: Dict[str, str],
+    plan: Dict[str, Any],
+) -> Dict[str, str]:
+    """Inputs de suspect_crew para un sospechoso (character_agent no usa los de setup)."""
+    name = suspect_seed["name"]
+    return {
+        "scene_blueprint": compact_json(project_blueprint(scene_blueprint, "suspect")),
+        "suspect_seed": compact_json(suspect_seed),
+        "case_role": CASE_ROLE_GUILTY if name == plan["guilty_name"] else CASE_ROLE_INNOCENT,
+        "clothing_color": plan["colors"][name],
+    }
+
+
+def _coerce_age(value: Any) -> Optional[int]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    digits = "".join(ch for ch in str(value or "") if ch.isdigit())
+    return int(digits) if digits else None
+
+
+def merge_profiles(
+    seeds: List[Dict[str, str]],
+    profiles: Dict[str, Optional[Dict[str, Any]]],
+    plan: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Fusiona los perfiles en la forma de characters.json. id/name/role salen de
+    la semilla y `guilty` del plan: el modelo no puede cambiarlos.
+    """
+    suspects = []
+    problems = []
+    for seed in seeds:
+        name = seed["name"]
+        profile = profiles.get(name)
+        if not isinstance(profile, dict):
+            problems.append(f"{name}: no profile")
+            continue
+        missing = [f for f in REQUIRED_PROFILE_FIELDS if profile.get(f) in (None, "", {}, [])]
+        if missing:
+            problems.append(f"{name}: missing {', '.join(missing)}")
+            continue
+
+        suspect = {k: v for k, v in profile.items() if k not in ("id", "name", "role", "guilty")}
+        suspect = {"id": seed["id"], "name": name, "role": seed["role"], **suspect}
+        suspect["age"] = _coerce_age(profile.get("age"))
+        suspect["guilty"] = name == plan["guilty_name"]
+        suspects.append(suspect)
+
+    if problems:
+        raise FanoutError("; ".join(problems))
+    return {"suspects": suspects, "guilty_name": plan["guilty_name"], "case_seed": plan["seed"]}
+
+
+def generate_characters(
+    scene_blueprint: Dict[str, Any],
+    run_suspect: Callable[[Dict[str, str]], Optional[Dict[str, Any]]],
+    seed: Optional[int] = None,
+    max_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Genera los 4 perfiles en paralelo. `run_suspect(inputs)` lanza suspect_crew
+    y devuelve el JSON parseado del perfil (o None). Devuelve characters.json.
+    """
+    seeds = read_suspect_seeds(scene_blueprint)
+    plan = plan_cast(seeds, case_seed() if seed is None else seed)
+    print(f"[FANOUT] case seed {plan['seed']}: generating {len(seeds)} suspects in parallel")
+
+    def _one(suspect_seed: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        # Un perfil ilegible se repite una vez: sale mucho más barato que rehacer el reparto
+        inputs = suspect_inputs(scene_blueprint, suspect_seed, plan)
+        for attempt in range(2):
+            try:
+                profile = run_suspect(inputs)
+            except CaseGenerationCancelled:
+                raise
+            except Exception as e:
+                print(f"[FANOUT] {suspect_seed['name']} failed (attempt {attempt + 1}): {e}")
+                continue
+            if isinstance(profile, dict):
+                return profile
+            print(f"[FANOUT] {suspect_seed['name']}: no JSON profile (attempt {attempt + 1})")
+        return None
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(seeds), thread_name_prefix="fanout") as pool:
+        results = list(pool.map(_one, seeds))
+
+    return merge_profiles(seeds, {s["name"]: r for s, r in zip(seeds, results)}, plan)
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Partidas en disco (SQLite), para que un reinicio del servidor, un redeploy o
+una reconexión del websocket no tiren la partida ni obliguen a regenerarla.
+
+- `games`: una fila por partida con el caso, blueprint, personajes, solución,
+  preguntas restantes y desenlace. Se reescribe solo cuando cambia el caso
+  (llega una pieza, un retrato) o se cierra la partida.
+- `turns`: una fila por pregunta/respuesta. Cada turno es un INSERT, no se
+  vuelve a escribir la partida entera. La memoria de cada sospechoso no se
+  guarda: es la unión de los revealed_facts/implied_clues de sus turnos.
+
+Serialización compacta: JSON sin espacios y, por encima de COMPRESS_MIN_BYTES,
+comprimido con zlib (el blueprint y los personajes bajan a ~1/4).
+
+CLUEDO_GAME_STORE=<ruta.sqlite3> | 0   (defecto artifacts/games.sqlite3)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_PATH = os.path.join(ROOT_DIR, "artifacts", "games.sqlite3")
+
+COMPRESS_MIN_BYTES = 512
+_RAW, _ZLIB = b"j", b"z"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id         TEXT PRIMARY KEY,
+    created_at      REAL NOT NULL,
+    updated_at      REAL NOT NULL,
+    stage           TEXT NOT NULL,
+    remaining       INTEGER NOT NULL,
+    game_over       INTEGER NOT NULL DEFAULT 0,
+    case_data       BLOB,
+    scene_blueprint BLOB,
+    characters      BLOB,
+    solution        BLOB,
+    outcome         BLOB
+);
+CREATE TABLE IF NOT EXISTS turns (
+    game_id TEXT NOT NULL,
+    suspect TEXT NOT NULL,
+    seq     INTEGER NOT NULL,
+    turn    BLOB NOT NULL,
+    PRIMARY KEY (game_id, suspect, seq)
+);
+"""
+
+
+def pack(obj: Any) -> Optional[bytes]:
+    if obj is None:
+        return None
+    raw = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        return _ZLIB + zlib.compress(raw, 6)
+    return _RAW + raw
+
+
+def unpack(blob: Optional[bytes]) -> Any:
+    if not blob:
+        return None
+    tag, body = bytes(blob[:1]), bytes(blob[1:])
+    if tag == _ZLIB:
+        body = zlib.decompress(body)
+    return json.loads(body.decode("utf-8"))
+
+
+def memory_from_turns(turns: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """La memoria del sospechoso tal y como la va construyendo handle_question_submit."""
+    mem: Dict[str, List[str]] = {"revealed_facts": [], "implied_clues": []}
+    for turn in turns:
+        for key in mem:
+            for item in turn.get(key) or []:
+                if item and item not in mem[key]:
+                    mem[key].append(item)
+    return mem
+
+
+class GameStore:
+    """Una conexión por proceso (WAL), serializada con un lock: las escrituras son de pocos KB."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def save_case(
+        self,
+        game_id: str,
+        *,
+        stage: str,
+        case: Dict[str, Any],
+        scene_blueprint: Optional[dict],
+        characters: Optional[dict],
+        solution: Optional[dict],
+        remaining: int,
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO games (game_id, created_at, updated_at, stage, remaining,
+                                   case_data, scene_blueprint, characters, solution)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(game_id) DO UPDATE SET
+                    updated_at = excluded.updated_at, stage = excluded.stage,
+                    case_data = excluded.case_data, scene_blueprint = excluded.scene_blueprint,
+                    characters = excluded.characters, solution = excluded.solution
+                """,
+                (game_id, now, now, stage, remaining,
+                 pack(case), pack(scene_blueprint), pack(characters), pack(solution)),
+            )
+
+    def append_turn(self, game_id: str, suspect: str, seq: int, turn: Dict[str, Any], remaining: int) -> None:
+        with self._lock:
+            with self._conn:  # una transacción: turno y contador van juntos
+                self._conn.execute("BEGIN")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO turns (game_id, suspect, seq, turn) VALUES (?, ?, ?, ?)",
+                    (game_id, suspect, seq, pack(turn)),
+                )
+                self._conn.execute(
+                    "UPDATE games SET remaining = ?, updated_at = ? WHERE game_id = ?",
+                    (remaining, time.time(), game_id),
+                )
+
+    def save_outcome(self, game_id: str, outcome: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE games SET game_over = 1, outcome = ?, updated_at = ? WHERE game_id = ?",
+                (pack(outcome), time.time(), game_id),
+            )
+
+    def load(self, game_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT stage, remaining, game_over, case_data, scene_blueprint, characters, solution, outcome
+                FROM games WHERE game_id = ?
+                """,
+                (game_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            turn_rows = self._conn.execute(
+                "SELECT suspect, turn FROM turns WHERE game_id = ? ORDER BY suspect, seq", (game_id,)
+            ).fetchall()
+
+        stage, remaining, game_over, case_blob, bp_blob, ch_blob, sol_blob, out_blob = row
+        case = unpack(case_blob) or {}
+        histories: Dict[str, List[Dict[str, Any]]] = {s["name"]: [] for s in case.get("suspects", [])}
+        for suspect, blob in turn_rows:
+            histories.setdefault(suspect, []).append(unpack(blob))
+        return {
+            "game_id": game_id,
+            "stage": stage,
+            "case": case,
+            "scene_blueprint": unpack(bp_blob),
+            "characters": unpack(ch_blob),
+            "solution": unpack(sol_blob),
+            "histories": histories,
+            "suspect_memory": {name: memory_from_turns(turns) for name, turns in histories.items()},
+            "remaining_questions": remaining,
+            "game_over": bool(game_over),
+            "outcome": unpack(out_blob),
+        }
+
+    def delete(self, game_id: str) -> None:
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.execute("DELETE FROM turns WHERE game_id = ?", (game_id,))
+                self._conn.execute("DELETE FROM games WHERE game_id = ?", (game_id,))
+
+
+_STORE: Optional[GameStore] = None
+_STORE_FAILED = False
+_STORE_LOCK = threading.Lock()
+
+
+def get_game_store() -> Optional[GameStore]:
+    """El store del proceso, o None con CLUEDO_GAME_STORE=0 (o si no se puede abrir)."""
+    global _STORE, _STORE_FAILED
+    path = os.getenv("CLUEDO_GAME_STORE", "").strip() or DEFAULT_PATH
+    if path.lower() in ("0", "off", "false", "no"):
+        return None
+    with _STORE_LOCK:
+        if _STORE is None and not _STORE_FAILED:
+            try:
+                _STORE = GameStore(path)
+            except (OSError, sqlite3.Error) as e:
+                _STORE_FAILED = True
+                print(f"[STORE] could not open {path}: {e}; games will not survive a restart")
+        return _STORE
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Retratos listos para mostrar.
+
+El tool de Imagen guarda los bytes originales tal cual (sin decodificar y
+volver a codificar). Aquí se sacan variantes WebP al tamaño al que la UI
+los pinta, en `generated_images/variants/`, y se sirven desde un LRU en
+memoria con clave (ruta, mtime, ancho): un rerun no vuelve a leer disco ni
+manda el PNG original al navegador.
+
+Las variantes se hacen en el hilo de la PortraitQueue nada más llegar el
+retrato; si faltan (retratos antiguos, fallo de PIL) se hacen al pedirlas.
+
+Mientras no hay retrato se pinta un avatar local con las iniciales
+(`placeholder_bytes()`), renderizado una vez por sospechoso y guardado en
+`generated_images/avatars/`: sin depender de ningún servicio externo.
+"""
+
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+from io import BytesIO
+from typing import Iterable, Optional
+
+PORTRAIT_DISPLAY_WIDTH = 240   # st.image(..., width=240) en la columna del sospechoso
+PIXEL_RATIO = 2                # pantallas HiDPI: el doble de píxeles que de CSS px
+WEBP_QUALITY = 80
+VARIANTS_DIRNAME = "variants"
+# Relativa al cwd: el batch trabaja en su propia carpeta
+PORTRAITS_DIR_REL = os.path.join("src", "cluedogenai", "generated_images")
+AVATARS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generated_images", "avatars")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+# Firma de los primeros bytes -> extensión, para guardar los bytes originales con su formato real
+_MAGIC = (
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"RIFF", ".webp"),
+)
+
+
+def portrait_dir_rel(game_id: Optional[str] = None) -> str:
+    """Carpeta de los retratos de una partida: generated_images/<game_id>/, nunca compartida."""
+    return os.path.join(PORTRAITS_DIR_REL, game_id) if game_id else PORTRAITS_DIR_REL
+
+
+def image_extension(data: bytes, mime_type: Optional[str] = None) -> str:
+    """Extensión según el mime_type que devuelve la API o, si no viene, según la cabecera."""
+    if mime_type:
+        ext = {"image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp"}.get(mime_type.lower())
+        if ext:
+            return ext
+    for magic, ext in _MAGIC:
+        if data.startswith(magic):
+            return ext
+    return ".png"
+
+
+def variant_path(src_path: str, width: int) -> str:
+    folder, fname = os.path.split(src_path)
+    stem = os.path.splitext(fname)[0]
+    return os.path.join(folder, VARIANTS_DIRNAME, f"{stem}_{width}w.webp")
+
+
+def make_variant(src_path: str, width: int) -> Optional[str]:
+    """WebP de `width` px de ancho (sin ampliar); reutiliza el del disco si es más nuevo que el original."""
+    out = variant_path(src_path, width)
+    try:
+        if os.path.exists(out) and os.path.getmtime(out) >= os.path.getmtime(src_path):
+            return out
+        from PIL import Image
+
+        with Image.open(src_path) as img:
+            img = img.convert("RGB")
+            if img.width > width:
+                img.thumbnail((width, width * img.height // img.width), Image.LANCZOS)
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            tmp = out + ".tmp"
+            img.save(tmp, "WEBP", quality=WEBP_QUALITY, method=4)
+        os.replace(tmp, out)
+        return out
+    except Exception as e:
+        print(f"[IMAGES] could not build {width}px variant of {src_path}: {e}")
+        return None
+
+
+def display_widths() -> Iterable[int]:
+    return (PORTRAIT_DISPLAY_WIDTH * PIXEL_RATIO,)
+
+
+def make_display_variants(src_path: str) -> None:
+    for width in display_widths():
+        make_variant(src_path, width)
+
+
+def remove_with_variants(src_path: str) -> None:
+    """Borra un retrato y sus variantes WebP (solo ese: la carpeta es de todas las partidas)."""
+    for path in (src_path, *(variant_path(src_path, w) for w in display_widths())):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"[IMAGES] could not delete {path}: {e}")
+
+
+@lru_cache(maxsize=32)
+def _cached_bytes(src_path: str, mtime: float, width: int) -> bytes:
+    path = make_variant(src_path, width) or src_path
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def portrait_bytes(src_path: str, display_width: int = PORTRAIT_DISPLAY_WIDTH) -> Optional[bytes]:
+    """Bytes de la variante para pintar `src_path` a `display_width` CSS px; None si no existe."""
+    try:
+        mtime = os.path.getmtime(src_path)
+    except OSError:
+        return None
+    return _cached_bytes(src_path, mtime, display_width * PIXEL_RATIO)
+
+
+# ---------- Avatares locales ----------
+
+# Paleta noir: gris carbón con viñeta casi negra, marco e iniciales en marfil apagado
+AVATAR_BG = (51, 51, 51)
+AVATAR_VIGNETTE = (12, 12, 12)
+AVATAR_INK = (221, 221, 221)
+AVATAR_FONTS = ("DejaVuSerif-Bold.ttf", "LiberationSerif-Bold.ttf", "georgiab.ttf", "timesbd.ttf")
+
+
+def initials(name: str) -> str:
+    return "".join(part[0] for part in str(name or "?").split()[:2]).upper() or "?"
+
+
+def _avatar_font(size: int):
+    from PIL import ImageFont
+
+    for candidate in AVATAR_FONTS:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1
+        return ImageFont.load_default()
+
+
+def render_avatar(text: str, size: int) -> bytes:
+    """Cuadrado `size` px con viñeta, marco fino y `text` centrado, en WebP."""
+    from PIL import Image, ImageDraw
+
+    base = Image.new("RGB", (size, size), AVATAR_BG)
+    dark = Image.new("RGB", (size, size), AVATAR_VIGNETTE)
+    mask = Image.radial_gradient("L").resize((size, size))
+    img = Image.composite(dark, base, mask)
+
+    draw = ImageDraw.Draw(img)
+    inset = size // 16
+    draw.rectangle((inset, inset, size - inset, size - inset), outline=AVATAR_INK, width=max(1, size // 160))
+
+    font = _avatar_font(size // 3)
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    xy = ((size - (right - left)) / 2 - left, (size - (bottom - top)) / 2 - top)
+    draw.text(xy, text, font=font, fill=AVATAR_INK)
+
+    buf = BytesIO()
+    img.save(buf, "WEBP", quality=WEBP_QUALITY)
+    return buf.getvalue()
+
+
+@lru_cache(maxsize=64)
+def _cached_avatar(text: str, size: int) -> Optional[bytes]:
+    # Iniciales en hex: "É" y "Ö" no pueden acabar en el mismo fichero
+    path = os.path.join(AVATARS_DIR, f"{text.encode('utf-8').hex()}_{size}.webp")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    try:
+        data = render_avatar(text, size)
+    except Exception as e:
+        print(f"[IMAGES] could not render avatar {text!r}: {e}")
+        return None
+    try:
+        os.makedirs(AVATARS_DIR, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+    except OSError as e:
+        print(f"[IMAGES] could not cache avatar {text!r}: {e}")
+    return data
+
+
+def placeholder_bytes(name: str, display_width: int = PORTRAIT_DISPLAY_WIDTH) -> Optional[bytes]:
+    """Avatar con las iniciales de `name` (las iniciales son la clave: dos "J.D." comparten imagen)."""
+    return _cached_avatar(initials(name), display_width * PIXEL_RATIO)
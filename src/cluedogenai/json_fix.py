@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""
+Reparación determinista del JSON que devuelven los modelos.
+
+Buena parte de los fallos de parseo son triviales: fences de markdown, comas
+finales, comillas simples, True/False/None de Python, claves sin comillas,
+saltos de línea dentro de strings o una respuesta cortada sin sus llaves de
+cierre. Aquí se arreglan localmente, y después se fuerzan los tipos que
+espera cada schema ("guilty": "True" -> true, "age": "34" -> 34, una lista
+que llega como string...), antes de gastar un reintento contra el modelo.
+
+Los contadores (`repair_stats()`) dicen cuántas veces el parseo estricto
+falló pero la reparación salvó la respuesta: reintentos de LLM ahorrados.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# Schema mínimo por clave identificativa del objeto (la misma que se usa para encontrarlo).
+# bool/int/str/list = tipo del campo; [dict] = lista de objetos con ese sub-schema.
+SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "scene_id": {"visible_clues": list, "present_characters": list, "visual_hooks": list, "suspect_seeds": list},
+    "suspects": {"suspects": [{"age": int, "guilty": bool}], "guilty_name": str},
+    "secret_motivation": {"age": int, "name": str, "role": str},
+    "truth_summary": {"murderer": str, "key_evidence": list, "timeline": list},
+    "spoken_text": {"spoken_text": str, "revealed_facts": list, "implied_clues": list},
+}
+
+MAX_START_CANDIDATES = 20
+
+_BARE_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_JSON_LITERALS = {"true", "false", "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+
+_lock = threading.Lock()
+_sites: Dict[str, Counter] = {}
+_fixes: Counter = Counter()
+
+
+# ---------- Contadores ----------
+
+def _count(site: str, outcome: str, fixes: Optional[Counter] = None) -> None:
+    with _lock:
+        _sites.setdefault(site or "?", Counter())[outcome] += 1
+        if fixes:
+            _fixes.update(fixes)
+
+
+def repair_stats() -> Dict[str, Any]:
+    """{"llm_retries_saved", "by_site": {site: {clean, repaired, coerced, failed}}, "fixes": {...}}."""
+    with _lock:
+        by_site = {k: dict(v) for k, v in _sites.items()}
+        saved = sum(v.get("repaired", 0) + v.get("coerced", 0) for v in _sites.values())
+        return {"llm_retries_saved": saved, "by_site": by_site, "fixes": dict(_fixes)}
+
+
+def format_repair_stats() -> str:
+    stats = repair_stats()
+    sites = ", ".join(
+        f"{site}: " + "/".join(f"{k}={v}" for k, v in sorted(c.items())) for site, c in sorted(stats["by_site"].items())
+    )
+    fixes = ", ".join(f"{k}={v}" for k, v in sorted(stats["fixes"].items())) or "none"
+    return f"LLM retries saved: {stats['llm_retries_saved']} [{sites}] fixes: {fixes}"
+
+
+def reset_repair_stats() -> None:
+    with _lock:
+        _sites.clear()
+        _fixes.clear()
+
+
+# ---------- Reparación de texto ----------
+
+def strip_fences(text: str) -> str:
+    return text.replace("```json", "").replace("```JSON", "").replace("```", "")
+
+
+def _normalize(text: str, fixes: Counter) -> str:
+    """
+    Una pasada carácter a carácter desde un '{': comillas simples -> dobles,
+    literales de Python, claves sin comillas, comas finales y saltos de línea
+    crudos dentro de strings. Se para al cerrar el primer objeto.
+    """
+    out: List[str] = []
+    depth: List[str] = []
+    quote: Optional[str] = None
+    i, n = 0, len(text)
+
+    while i < n:
+        ch = text[i]
+
+        if quote:
+            if ch == "\\" and i + 1 < n:
+                nxt = text[i + 1]
+                out.append("'" if (quote == "'" and nxt == "'") else ch + nxt)
+                i += 2
+                continue
+            if ch == quote:
+                out.append('"')
+                quote = None
+            elif quote == "'" and ch == '"':
+                out.append('\\"')
+            elif ch == "\n":
+                out.append("\\n")
+                fixes["newline_in_string"] += 1
+            else:
+                out.append(ch)
+            i += 1
+            continue
+
+        if ch in "\"'":
+            if ch == "'":
+                fixes["single_quotes"] += 1
+            quote = ch
+            out.append('"')
+        elif ch in "{[":
+            depth.append(_CLOSERS[ch])
+            out.append(ch)
+        elif ch in "}]":
+            j = len(out) - 1
+            while j >= 0 and out[j].isspace():
+                j -= 1
+            if j >= 0 and out[j] == ",":
+                del out[j]
+                fixes["trailing_commas"] += 1
+            if depth:
+                depth.pop()
+            out.append(ch)
+            if not depth:
+                break
+        elif ch.isalpha() or ch == "_":
+            m = _BARE_WORD.match(text, i)
+            word = m.group(0)  # type: ignore[union-attr]
+            if word in _PY_LITERALS:
+                out.append(_PY_LITERALS[word])
+                fixes["python_literals"] += 1
+            elif word in _JSON_LITERALS:
+                out.append(word)
+            elif text[m.end():].lstrip().startswith(":"):  # type: ignore[union-attr]
+                out.append(f'"{word}"')
+                fixes["unquoted_keys"] += 1
+            else:
+                out.append(word)
+            i = m.end()  # type: ignore[union-attr]
+            continue
+        else:
+            out.append(ch)
+        i += 1
+
+    if quote:
+        out.append('"')
+        fixes["unterminated_string"] += 1
+    return "".join(out)
+
+
+def _close_truncated(text: str, fixes: Counter) -> str:
+    """Si la respuesta se cortó, la cierra; si el último miembro quedó a medias, lo descarta."""
+    stack: List[str] = []
+    cuts: List[Tuple[int, List[str]]] = []
+    in_str = escaped = False
+    for idx, ch in enumerate(text):
+        if in_str:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch in "{[":
+            stack.append(_CLOSERS[ch])
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+        elif ch == ",":
+            cuts.append((idx, list(stack)))
+
+    if not stack:
+        return text
+
+    fixes["truncated"] += 1
+    body = text.rstrip()
+    if body.endswith(","):
+        body = body[:-1]
+    if body.endswith(":"):
+        body += "null"
+    candidates = [body + "".join(reversed(stack))]
+    candidates += [text[:idx] + "".join(reversed(st)) for idx, st in reversed(cuts)]
+    for candidate in candidates:
+        try:
+            json.loads(candidate)
+            return candidate
+        except ValueError:
+            continue
+    return candidates[0]
+
+
+def repair_json_text(text: str, fixes: Optional[Counter] = None) -> str:
+    """Texto (desde un '{') -> texto JSON reparado. No garantiza que parsee."""
+    fixes = fixes if fixes is not None else Counter()
+    return _close_truncated(_normalize(text, fixes), fixes)
+
+
+# ---------- Tipos ----------
+
+def _to_bool(value: Any) -> Any:
+    if isinstance(value, str) and value.strip().lower() in ("true", "yes", "1"):
+        return True
+    if isinstance(value, str) and value.strip().lower() in ("false", "no", "0", ""):
+        return False
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return bool(value)
+    return value
+
+
+def _to_int(value: Any) -> Any:
+    if isinstance(value, float):
+        return int(value)
+    if isinstance(value, str):
+        m = re.search(r"-?\d+", value)
+        return int(m.group(0)) if m else value
+    return value
+
+
+def _to_list(value: Any) -> Any:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    return value
+
+
+def coerce_to_schema(obj: Any, schema: Dict[str, Any], fixes: Optional[Counter] = None) -> Any:
+    """Fuerza en sitio los tipos de `schema`; los valores que no se pueden convertir se dejan igual."""
+    if not isinstance(obj, dict):
+        return obj
+    fixes = fixes if fixes is not None else Counter()
+    for key, kind in schema.items():
+        if key not in obj:
+            continue
+        value = obj[key]
+        if isinstance(kind, list):
+            if isinstance(value, list):
+                for item in value:
+                    coerce_to_schema(item, kind[0], fixes)
+            continue
+        if kind is bool and not isinstance(value, bool):
+            new = _to_bool(value)
+        elif kind is int and (isinstance(value, (str, float))):
+            new = _to_int(value)
+        elif kind is list and not isinstance(value, list):
+            new = _to_list(value)
+        elif kind is str and value is not None and not isinstance(value, str):
+            new = ", ".join(map(str, value)) if isinstance(value, list) else str(value)
+        else:
+            continue
+        if type(new) is not type(value) or new != value:
+            obj[key] = new
+            fixes[f"coerced_{kind.__name__}"] += 1
+    return obj
+
+
+# ---------- Entrada principal ----------
+
+def _strict(cleaned: str, required_key: str) -> Optional[dict]:
+    dec = json.JSONDecoder()
+    for m in re.finditer(r"\{", cleaned):
+        try:
+            obj, _ = dec.raw_decode(cleaned[m.start():])
+        except ValueError:
+            continue
+        if isinstance(obj, dict) and required_key in obj:
+            return obj
+    return None
+
+
+def parse_json_object(text: Optional[str], required_key: str, site: str = "") -> Optional[dict]:
+    """
+    Primer objeto JSON con `required_key` dentro de `text`: parseo estricto,
+    luego reparación local, y en ambos casos tipos forzados según SCHEMAS.
+    """
+    if not text:
+        return None
+    site = site or required_key
+    cleaned = strip_fences(text)
+    fixes: Counter = Counter()
+
+    obj = _strict(cleaned, required_key)
+    outcome = "clean"
+    if obj is None:
+        for n, m in enumerate(re.finditer(r"\{", cleaned)):
+            if n >= MAX_START_CANDIDATES:
+                break
+            attempt: Counter = Counter()
+            try:
+                candidate = json.loads(repair_json_text(cleaned[m.start():], attempt))
+            except ValueError:
+                continue
+            if isinstance(candidate, dict) and required_key in candidate:
+                obj, fixes, outcome = candidate, attempt, "repaired"
+                break
+
+    if obj is None:
+        _count(site, "failed")
+        return None
+
+    schema = SCHEMAS.get(required_key)
+    if schema:
+        before = sum(fixes.values())
+        coerce_to_schema(obj, schema, fixes)
+        if outcome == "clean" and sum(fixes.values()) > before:
+            outcome = "coerced"
+
+    _count(site, outcome, fixes)
+    if outcome != "clean":
+        print(f"[JSON] {outcome} {site} locally ({', '.join(f'{k}={v}' for k, v in fixes.items())}); LLM retry avoided")
+    return obj
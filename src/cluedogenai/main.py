@@ -6,8 +6,6 @@ import json
 
 from datetime import datetime
 
-from cluedogenai.crew import Cluedogenai
-
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
 # This main file is intended to be a way for you to run your
@@ -15,6 +13,16 @@ warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 # Replace with inputs you want to test with, it will automatically
 # interpolate any tasks and agents information
 
+def _crew():
+    """
+    Import tardío de crewAI: `lint_prompts` y el resto de comandos que no
+    lanzan la crew arrancan sin cargarlo.
+    """
+    from cluedogenai.crew import Cluedogenai
+
+    return Cluedogenai()
+
+
 def run():
     """
     Run the crew.
@@ -29,11 +37,12 @@ def run():
         'player_action': 'El jugador pregunta: ¿Quién eres?',
         # AÑADIR LAS CLAVES QUE FALTABAN PARA QUE NO DE ERROR DE KEYERROR
         'scene_blueprint': json.dumps(mock_blueprint),
-        'characters': json.dumps(mock_characters)
+        'characters': json.dumps(mock_characters),
+        'validation_feedback': '',
     }
 
     try:
-        Cluedogenai().setup_crew().kickoff(inputs=inputs)
+        _crew().setup_crew().kickoff(inputs=inputs)
     except Exception as e:
         raise Exception(f"An error occurred while running the crew: {e}")
 
@@ -47,7 +56,7 @@ def train():
         'current_year': str(datetime.now().year)
     }
     try:
-        Cluedogenai().crew().train(n_iterations=int(sys.argv[1]), filename=sys.argv[2], inputs=inputs)
+        _crew().crew().train(n_iterations=int(sys.argv[1]), filename=sys.argv[2], inputs=inputs)
 
     except Exception as e:
         raise Exception(f"An error occurred while training the crew: {e}")
@@ -55,9 +64,27 @@ def train():
 def replay():
     """
     Replay the crew execution from a specific task.
+    Si el argumento es un game_id con checkpoints (o no hay argumento y queda
+    alguna partida a medias), reanuda esa generación desde la task que falte.
     """
+    from cluedogenai.checkpoints import CaseCheckpoint, latest_incomplete
+
+    arg = sys.argv[1] if len(sys.argv) > 1 else latest_incomplete()
+    if not arg:
+        raise Exception("No task id or checkpointed game id to replay.")
+    checkpoint = CaseCheckpoint(arg)
+    if checkpoint.inputs() is not None:
+        from cluedogenai.case_generation import generate_case_with_crew
+
+        try:
+            bundle = generate_case_with_crew(checkpoint=checkpoint)
+        except Exception as e:
+            raise Exception(f"An error occurred while resuming case {arg}: {e}")
+        print(f"[CHECKPOINT] {arg} complete: guilty = {bundle['case'].get('guilty_name')}")
+        return
+
     try:
-        Cluedogenai().crew().replay(task_id=sys.argv[1])
+        _crew().crew().replay(task_id=arg)
 
     except Exception as e:
         raise Exception(f"An error occurred while replaying the crew: {e}")
@@ -72,7 +99,7 @@ def test():
     }
 
     try:
-        Cluedogenai().crew().test(n_iterations=int(sys.argv[1]), eval_llm=sys.argv[2], inputs=inputs)
+        _crew().crew().test(n_iterations=int(sys.argv[1]), eval_llm=sys.argv[2], inputs=inputs)
 
     except Exception as e:
         raise Exception(f"An error occurred while testing the crew: {e}")
@@ -98,7 +125,32 @@ def run_with_trigger():
     }
 
     try:
-        result = Cluedogenai().crew().kickoff(inputs=inputs)
+        result = _crew().crew().kickoff(inputs=inputs)
         return result
     except Exception as e:
         raise Exception(f"An error occurred while running the crew with trigger: {e}")
+
+
+def lint_prompts():
+    """
+    Lint prompt sizes in agents.yaml / tasks.yaml and fail on regressions.
+    Extra args are forwarded (e.g. `lint_prompts --update-baseline`).
+    """
+    from cluedogenai.prompt_lint import main as lint_main
+
+    args = sys.argv[1:] or ["--check"]
+    code = lint_main(args)
+    if code:
+        raise SystemExit(code)
+
+
+def generate_cases():
+    """
+    Generate complete, validated cases in parallel into the case library.
+    Extra args are forwarded (e.g. `generate_cases --count 200 --workers 4 --rpm 60`).
+    """
+    from cluedogenai.batch import main as batch_main
+
+    code = batch_main(sys.argv[1:])
+    if code:
+        raise SystemExit(code)
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Cola de retratos en segundo plano, ordenada por el foco del jugador.
+
+Los retratos ya no forman parte de setup_crew: en cuanto existen los
+sospechosos se encolan aquí y se generan de uno en uno (BACKGROUND en el
+scheduler). Antes de empezar cada retrato se elige el siguiente: primero el
+sospechoso que el jugador tiene seleccionado, después el resto en orden.
+La UI consulta `path()` / `status()` en cada rerun y cambia el placeholder
+por el retrato cuando está listo. Una partida restaurada pasa en `done` los
+retratos que ya tiene en disco y solo se generan los que falten.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from .image_assets import make_display_variants, portrait_dir_rel, remove_with_variants
+from .projections import project_suspect
+from .scheduler import PreemptedError
+
+PENDING = "pending"
+RENDERING = "rendering"
+DONE = "done"
+FAILED = "failed"
+
+
+def _default_render(suspect: Dict[str, Any], game_id: Optional[str] = None) -> str:
+    # Import tardío: image_tools arrastra crewAI y el cliente de Google
+    from .tools.image_tools import generate_character_image
+    rel_path = generate_character_image(suspect, game_id=game_id)
+    # Variantes WebP al tamaño de la UI aquí, en el hilo de la cola, no en un rerun
+    make_display_variants(os.path.abspath(rel_path))
+    return rel_path
+
+
+class PortraitQueue:
+    """Genera un retrato por sospechoso; `focus(name)` adelanta al seleccionado."""
+
+    def __init__(
+        self,
+        suspects: List[Dict[str, Any]],
+        render: Optional[Callable[[Dict[str, Any]], str]] = None,
+        workers: Optional[int] = None,
+        game_id: Optional[str] = None,
+        done: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self._lock = threading.Lock()
+        # Con game_id los ficheros van a generated_images/<game_id>/: solo de esta partida
+        self._game_id = game_id
+        self._render = render or (lambda suspect: _default_render(suspect, game_id=game_id))
+        self._workers = max(1, workers or int(os.getenv("CLUEDO_PORTRAIT_WORKERS", "1")))
+        self._threads: List[threading.Thread] = []
+        self._cancelled = False
+        self._discarded = False
+
+        self._order: List[str] = []
+        self._suspects: Dict[str, Dict[str, Any]] = {}
+        for s in suspects:
+            name = s.get("name") if isinstance(s, dict) else None
+            if name and name not in self._suspects:
+                self._order.append(name)
+                self._suspects[name] = project_suspect(s, "image")
+
+        self._status: Dict[str, str] = {n: PENDING for n in self._order}
+        self._paths: Dict[str, str] = {}
+        for name, rel_path in (done or {}).items():
+            # Solo cuenta si el fichero sigue ahí; si no, se vuelve a generar
+            if name in self._status and rel_path and os.path.exists(os.path.abspath(rel_path)):
+                self._status[name] = DONE
+                self._paths[name] = rel_path
+        self._errors: Dict[str, str] = {}
+        self._focus: Optional[str] = None
+        self.version = 0  # sube cada vez que un retrato termina (bien o mal)
+
+    # ---------- API para la UI ----------
+
+    def start(self) -> "PortraitQueue":
+        with self._lock:
+            if self._threads:
+                return self
+            for i in range(self._workers):
+                t = threading.Thread(target=self._worker, name=f"portraits-{i}", daemon=True)
+                self._threads.append(t)
+        for t in self._threads:
+            t.start()
+        return self
+
+    def focus(self, name: Optional[str]) -> None:
+        """El sospechoso que el jugador está mirando pasa el primero de la cola."""
+        with self._lock:
+            self._focus = name
+
+    def cancel(self) -> None:
+        """Deja de coger retratos nuevos (el que esté en curso termina igual)."""
+        with self._lock:
+            self._cancelled = True
+
+    def discard(self) -> None:
+        """Cancela y borra del disco los retratos de esta cola; los de otras partidas no se tocan."""
+        with self._lock:
+            self._cancelled = True
+            self._discarded = True
+            paths = list(self._paths.values())
+        self._remove_files(paths)
+
+    def _remove_files(self, rel_paths: List[str]) -> None:
+        for rel_path in rel_paths:
+            remove_with_variants(os.path.abspath(rel_path))
+        if self._game_id:
+            # La carpeta de la partida (con sus variants/) es solo suya
+            shutil.rmtree(os.path.abspath(portrait_dir_rel(self._game_id)), ignore_errors=True)
+
+    def path(self, name: str) -> Optional[str]:
+        with self._lock:
+            return self._paths.get(name)
+
+    def paths(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._paths)
+
+    def status(self, name: str) -> Optional[str]:
+        with self._lock:
+            return self._status.get(name)
+
+    def pending(self) -> bool:
+        with self._lock:
+            return not self._cancelled and any(st in (PENDING, RENDERING) for st in self._status.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "version": self.version,
+                "status": dict(self._status),
+                "paths": dict(self._paths),
+                "errors": dict(self._errors),
+                "focus": self._focus,
+            }
+
+    # ---------- Workers ----------
+
+    def _next(self) -> Optional[str]:
+        with self._lock:
+            if self._cancelled:
+                return None
+            order = list(self._order)
+            if self._focus in self._status:
+                order.remove(self._focus)
+                order.insert(0, self._focus)
+            for name in order:
+                if self._status[name] == PENDING:
+                    self._status[name] = RENDERING
+                    return name
+            return None
+
+    def _worker(self) -> None:
+        while True:
+            name = self._next()
+            if name is None:
+                return
+            try:
+                rel_path = self._render(self._suspects[name])
+            except PreemptedError:
+                # Cancelado en el scheduler antes de empezar: vuelve a la cola
+                with self._lock:
+                    self._status[name] = PENDING
+                    if self._cancelled:
+                        return
+                continue
+            except Exception as e:
+                print(f"[PORTRAIT] {name} failed: {e}")
+                with self._lock:
+                    self._status[name] = FAILED
+                    self._errors[name] = str(e)
+                    self.version += 1
+                continue
+
+            with self._lock:
+                discarded = self._discarded
+                if not discarded:
+                    self._status[name] = DONE
+                    self._paths[name] = rel_path
+                    self.version += 1
+            if discarded:
+                # El que estaba en curso al descartar la partida tampoco se queda en disco
+                self._remove_files([rel_path])
+                return
+            print(f"[PORTRAIT] {name} -> {rel_path}")
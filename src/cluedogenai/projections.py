@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Proyecciones declarativas del caso por consumidor.
+
+Cada task solo usa una parte de characters.json / scene_blueprint.json; aquí
+se declara qué campos ve cada una y se serializa en JSON compacto, para no
+pagar en cada llamada los bytes (y tokens) de campos que el modelo ignora.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional
+
+from .tokens import estimate_tokens
+
+# Campos por sospechoso. "active" = el sospechoso del que trata la llamada;
+# "others" = el resto del reparto (solo lo que el activo sabría de sus colegas).
+CHARACTER_VIEWS: Dict[str, Dict[str, List[str]]] = {
+    "dialogue": {
+        "active": ["name", "role", "age", "personality", "secret_motivation", "alibi", "clue_object"],
+        "others": ["name", "role"],
+        "top": [],
+    },
+    # Con recuperación (retrieval.py): lo fijo; el resto llega como notas recuperadas
+    "dialogue_core": {
+        "active": ["name", "role", "age", "personality", "alibi"],
+        "others": ["name", "role"],
+        "top": [],
+    },
+    "image": {
+        "active": ["name", "role", "age", "personality", "physical_description", "clue_object"],
+        "others": [],
+        "top": [],
+    },
+    "solution": {
+        "active": ["name", "role", "personality", "secret_motivation", "alibi", "clue_object", "guilty"],
+        "others": ["name", "role", "personality", "secret_motivation", "alibi", "clue_object", "guilty"],
+        "top": ["guilty_name"],
+    },
+}
+
+BLUEPRINT_VIEWS: Dict[str, List[str]] = {
+    "dialogue": [
+        "location", "time", "summary", "present_characters", "visible_clues",
+        "hidden_tension", "victim_name", "victim_role",
+    ],
+    "dialogue_core": ["location", "time", "victim_name", "victim_role"],
+    "solution": [
+        "location", "time", "summary", "visible_clues", "hidden_tension",
+        "victim_name", "victim_role", "suspect_seeds",
+    ],
+    # Fan-out: cada sospechoso ve la escena y el reparto (para saber con quién trabaja)
+    "suspect": [
+        "location", "time", "summary", "visible_clues", "hidden_tension",
+        "victim_name", "victim_role", "suspect_seeds",
+    ],
+}
+
+
+def compact_json(obj: Any) -> str:
+    """JSON sin espacios ni indentación (el modelo no los necesita)."""
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _pick(d: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    return {k: d[k] for k in fields if k in d and d[k] not in (None, "", [], {})}
+
+
+def project_suspect(suspect: Dict[str, Any], view: str, *, active: bool = True) -> Dict[str, Any]:
+    spec = CHARACTER_VIEWS[view]
+    return _pick(suspect, spec["active"] if active else spec["others"])
+
+
+def project_characters(
+    characters: Optional[Dict[str, Any]],
+    view: str,
+    active_suspect: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Proyecta characters.json. Con `active_suspect`, ese sospechoso recibe los
+    campos "active" y el resto los "others"; sin él, todos son "active".
+    """
+    if not isinstance(characters, dict):
+        return {}
+    spec = CHARACTER_VIEWS[view]
+    out = _pick(characters, spec["top"])
+
+    suspects = []
+    for s in characters.get("suspects") or []:
+        if not isinstance(s, dict):
+            continue
+        is_active = active_suspect is None or s.get("name") == active_suspect
+        projected = project_suspect(s, view, active=is_active)
+        if projected:
+            suspects.append(projected)
+    out["suspects"] = suspects
+    return out
+
+
+def project_blueprint(scene_blueprint: Optional[Dict[str, Any]], view: str) -> Dict[str, Any]:
+    if not isinstance(scene_blueprint, dict):
+        return {}
+    return _pick(scene_blueprint, BLUEPRINT_VIEWS[view])
+
+
+def projection_report(label: str, full: Any, projected_text: str) -> Dict[str, Any]:
+    """Bytes/tokens que se ahorra un prompt al mandar la proyección en vez del objeto completo."""
+    full_text = json.dumps(full, ensure_ascii=False) if full else ""
+    full_bytes = len(full_text.encode("utf-8"))
+    proj_bytes = len(projected_text.encode("utf-8"))
+    full_tokens = estimate_tokens(full_text)
+    proj_tokens = estimate_tokens(projected_text)
+    return {
+        "label": label,
+        "bytes_full": full_bytes,
+        "bytes_projected": proj_bytes,
+        "bytes_saved": full_bytes - proj_bytes,
+        "tokens_full": full_tokens,
+        "tokens_projected": proj_tokens,
+        "tokens_saved": full_tokens - proj_tokens,
+    }
+
+
+def format_report(reports: List[Dict[str, Any]]) -> str:
+    parts = []
+    for r in reports:
+        pct = (100.0 * r["bytes_saved"] / r["bytes_full"]) if r["bytes_full"] else 0.0
+        parts.append(
+            f"{r['label']} {r['bytes_full']}B→{r['bytes_projected']}B (-{pct:.0f}%), "
+            f"~{r['tokens_full']}→{r['tokens_projected']} tok"
+        )
+    return "; ".join(parts)
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+Linter de tamaño de prompts para config/agents.yaml y config/tasks.yaml.
+
+Renderiza el prompt de cada task (role/goal/backstory del agente + description
++ expected_output) con inputs representativos, cuenta tokens y avisa de:
+
+  - bloques de líneas duplicados dentro de un prompt
+  - placeholders {x} sin valor en los inputs de su crew
+  - inputs que la crew recibe pero ningún prompt usa
+  - claves del YAML que CrewAI no manda al modelo (no son campos de Task/Agent)
+
+Con --check falla (exit 1) si algún prompt crece por encima del baseline
+guardado en config/prompt_baseline.json más la tolerancia.
+
+Uso:
+  python -m cluedogenai.prompt_lint
+  python -m cluedogenai.prompt_lint --check
+  python -m cluedogenai.prompt_lint --update-baseline
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from .tokens import estimate_tokens
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config")
+AGENTS_YAML = os.path.join(CONFIG_DIR, "agents.yaml")
+TASKS_YAML = os.path.join(CONFIG_DIR, "tasks.yaml")
+BASELINE_PATH = os.path.join(CONFIG_DIR, "prompt_baseline.json")
+
+# Solo estas claves del YAML llegan al modelo
+AGENT_PROMPT_FIELDS = ("role", "goal", "backstory")
+TASK_PROMPT_FIELDS = ("description", "expected_output")
+# Claves válidas que no forman parte del prompt
+KNOWN_NON_PROMPT_KEYS = {"agent", "llm", "output_file", "context", "tools", "name"}
+
+PLACEHOLDER_RE = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+DUPLICATE_MIN_LINES = 3
+
+_SAMPLE_BLUEPRINT = {
+    "scene_id": "opening_scene",
+    "location": "Open-plan floor of a late-night AI startup",
+    "time": "12:40 AM, during a violent storm",
+    "summary": "The lead architect is found slumped over a prototype rig. Backup power flickers.",
+    "present_characters": ["Eleanor Finch", "Marcus Chen", "Lena Petrova", "Samir Khan"],
+    "visible_clues": ["A charred power cable", "A smudged USB drive", "A shattered coffee mug"],
+    "hidden_tension": "The accident feels deliberate.",
+    "victim_name": "Arthur Vance",
+    "victim_role": "Lead AI Architect",
+}
+_SAMPLE_CHARACTERS = {
+    "suspects": [
+        {"name": n, "role": r, "age": 34, "personality": "Guarded and precise.",
+         "secret_motivation": "Fears losing credit for the model.", "alibi": "Claims to be in the server room.",
+         "clue_object": "a crumpled badge printout"}
+        for n, r in [("Eleanor Finch", "Senior Software Engineer"), ("Marcus Chen", "Head of Product"),
+                     ("Lena Petrova", "Night Shift Security Guard"), ("Samir Khan", "Junior Data Scientist")]
+    ]
+}
+
+# Inputs que app.py manda a cada crew (mismas claves, valores de tamaño realista)
+REPRESENTATIVE_INPUTS: Dict[str, Dict[str, str]] = {
+    "setup_crew": {
+        "topic": "AI Murder Mystery",
+        "current_year": "2025",
+        "game_state": json.dumps({
+            "victim": "Unknown Victim", "victim_role": "Unknown role", "time": "Sometime past midnight",
+            "place": "An almost empty tech office", "cause": "Suspicious accident with smart equipment",
+            "context": "A storm hits the city. Backup power keeps the systems barely alive.",
+        }),
+        "player_action": "We are starting the game. Design the opening scene and the full cast of suspects.",
+        "validation_feedback": "",
+    },
+    "dialogue_crew": {
+        "topic": "AI Murder Mystery",
+        "current_year": "2025",
+        "game_state": json.dumps({"victim": "Arthur Vance", "time": "12:40 AM", "place": "Open-plan floor",
+                                  "cause": "Electrocution", "active_suspect": "Marcus Chen"}),
+        "player_action": (
+            "INTERROGATION TARGET: Marcus Chen\n\nINVESTIGATION MEMORY:\nREVEALED FACTS:\n- (none yet)\n"
+            "IMPLIED CLUES:\n- (none yet)\n\nRECENT DIALOGUE:\nNo prior questions yet.\n\n"
+            "LATEST QUESTION FROM THE DETECTIVE (ANSWER THIS ONE):\nWhere were you at midnight?"
+        ),
+        "scene_blueprint": json.dumps(_SAMPLE_BLUEPRINT, ensure_ascii=False, separators=(",", ":")),
+        "characters": json.dumps(_SAMPLE_CHARACTERS, ensure_ascii=False, separators=(",", ":")),
+    },
+}
+_SETUP_INPUTS = REPRESENTATIVE_INPUTS["setup_crew"]
+REPRESENTATIVE_INPUTS["suspect_crew"] = {
+    "scene_blueprint": json.dumps(_SAMPLE_BLUEPRINT, ensure_ascii=False, separators=(",", ":")),
+    "suspect_seed": '{"id":"suspect_2","name":"Marcus Chen","role":"Head of Product"}',
+    "case_role": (
+        "INNOCENT of the murder, but hiding something unrelated that makes them look suspicious. "
+        "Their alibi is true but hard to verify."
+    ),
+    "clothing_color": "navy blue",
+}
+REPRESENTATIVE_INPUTS["characters_crew"] = {
+    "scene_blueprint": json.dumps(_SAMPLE_BLUEPRINT, ensure_ascii=False, separators=(",", ":")),
+    "validation_feedback": "",
+}
+REPRESENTATIVE_INPUTS["solution_crew"] = {
+    **_SETUP_INPUTS,
+    "scene_blueprint": json.dumps(_SAMPLE_BLUEPRINT, ensure_ascii=False, separators=(",", ":")),
+    "characters": json.dumps(_SAMPLE_CHARACTERS, ensure_ascii=False, separators=(",", ":")),
+}
+
+# Qué tasks corre cada crew (ver crew.py)
+CREW_TASKS: Dict[str, List[str]] = {
+    "setup_crew": ["create_scene_blueprint", "define_characters", "create_solution"],
+    "dialogue_crew": ["generate_suspect_dialogue", "generate_suspect_dialogue_lean"],
+    "suspect_crew": ["define_suspect"],
+    "characters_crew": ["define_characters_from_inputs"],
+    "solution_crew": ["create_solution_from_inputs"],
+}
+# Agente efectivo cuando crew.py no usa el de tasks.yaml
+TASK_AGENT_OVERRIDES = {"create_solution": "narrative_agent", "create_solution_from_inputs": "narrative_agent"}
+
+
+def _load_yaml(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def _interpolate(text: str, inputs: Dict[str, str]) -> str:
+    return PLACEHOLDER_RE.sub(lambda m: inputs.get(m.group(1), m.group(0)), text)
+
+
+def _crew_for(task_name: str) -> Optional[str]:
+    for crew_name, tasks in CREW_TASKS.items():
+        if task_name in tasks:
+            return crew_name
+    return None
+
+
+def find_duplicate_blocks(text: str, min_lines: int = DUPLICATE_MIN_LINES) -> List[Tuple[str, int]]:
+    """Bloques de >= min_lines líneas (normalizadas) que aparecen más de una vez."""
+    lines = [" ".join(l.split()) for l in text.splitlines()]
+    lines = [l for l in lines if len(l) > 2]
+    seen: Dict[Tuple[str, ...], int] = defaultdict(int)
+    for i in range(len(lines) - min_lines + 1):
+        seen[tuple(lines[i:i + min_lines])] += 1
+
+    dups = []
+    covered = set()
+    for block, count in seen.items():
+        if count < 2 or block[0] in covered:
+            continue
+        covered.update(block)
+        dups.append((block[0][:70], count))
+    return dups
+
+
+def lint(agents_cfg: Dict[str, Any], tasks_cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """Devuelve {task: {...métricas y avisos...}} para todas las tasks del YAML."""
+    results: Dict[str, Any] = {}
+    used_by_crew: Dict[str, set] = defaultdict(set)
+
+    for task_name, task_cfg in tasks_cfg.items():
+        task_cfg = task_cfg or {}
+        agent_name = TASK_AGENT_OVERRIDES.get(task_name) or task_cfg.get("agent")
+        agent_cfg = agents_cfg.get(agent_name) or {}
+        crew_name = _crew_for(task_name)
+        inputs = REPRESENTATIVE_INPUTS.get(crew_name or "", {})
+
+        templates = [str(agent_cfg.get(k, "")) for k in AGENT_PROMPT_FIELDS]
+        templates += [str(task_cfg.get(k, "")) for k in TASK_PROMPT_FIELDS]
+        raw = "\n".join(templates)
+        rendered = _interpolate(raw, inputs)
+
+        placeholders = set(PLACEHOLDER_RE.findall(raw))
+        used_by_crew[crew_name or ""].update(placeholders)
+
+        dead_keys = sorted(
+            k for k in task_cfg
+            if k not in TASK_PROMPT_FIELDS and k not in KNOWN_NON_PROMPT_KEYS
+        )
+
+        results[task_name] = {
+            "agent": agent_name,
+            "crew": crew_name,
+            "chars": len(rendered),
+            "tokens": estimate_tokens(rendered),
+            "template_tokens": estimate_tokens(raw),
+            "duplicate_blocks": find_duplicate_blocks("\n".join(templates[len(AGENT_PROMPT_FIELDS):])),
+            "unresolved_placeholders": sorted(p for p in placeholders if p not in inputs),
+            "dead_keys": dead_keys,
+        }
+
+    for crew_name, inputs in REPRESENTATIVE_INPUTS.items():
+        unused = sorted(k for k in inputs if k not in used_by_crew.get(crew_name, set()))
+        for task_name in CREW_TASKS.get(crew_name, []):
+            if task_name in results:
+                results[task_name]["unused_inputs"] = unused
+    return results
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Dict[str, int]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("tokens", {})
+
+
+def write_baseline(results: Dict[str, Any], path: str = BASELINE_PATH) -> None:
+    data = {
+        "note": "Tokens estimados por prompt renderizado (cluedogenai.prompt_lint). Regenerar con --update-baseline.",
+        "tokens": {name: r["tokens"] for name, r in sorted(results.items())},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+def check_regressions(results: Dict[str, Any], baseline: Dict[str, int], tolerance: float) -> List[str]:
+    failures = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base is None:
+            failures.append(f"{name}: no baseline ({r['tokens']} tokens) — run --update-baseline")
+        elif r["tokens"] > base * (1 + tolerance):
+            failures.append(f"{name}: {r['tokens']} tokens > baseline {base} (+{tolerance:.0%} allowed)")
+    return failures
+
+
+def print_report(results: Dict[str, Any], baseline: Dict[str, int]) -> None:
+    header = f"{'task':<32}{'agent':<18}{'tokens':>8}{'base':>8}{'delta':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        base = baseline.get(name)
+        delta = f"{r['tokens'] - base:+d}" if base is not None else "new"
+        print(f"{name:<32}{str(r['agent']):<18}{r['tokens']:>8}{str(base or '-'):>8}{delta:>8}")
+        for text, count in r["duplicate_blocks"]:
+            print(f"    ⚠ duplicated block x{count}: {text!r}")
+        if r["unresolved_placeholders"]:
+            print(f"    ⚠ placeholders without input: {', '.join(r['unresolved_placeholders'])}")
+        if r.get("unused_inputs"):
+            print(f"    ⚠ crew inputs never used: {', '.join(r['unused_inputs'])}")
+        if r["dead_keys"]:
+            print(f"    ⚠ YAML keys never sent to the model: {', '.join(r['dead_keys'])}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Prompt size linter for agents.yaml / tasks.yaml.")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if a prompt grew beyond the baseline.")
+    parser.add_argument("--update-baseline", action="store_true", help="Store current token counts as baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Allowed growth over baseline (0.05 = 5%%).")
+    parser.add_argument("--json", action="store_true", help="Print the raw results as JSON.")
+    args = parser.parse_args(argv)
+
+    results = lint(_load_yaml(AGENTS_YAML), _load_yaml(TASKS_YAML))
+    baseline = load_baseline()
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    else:
+        print_report(results, baseline)
+
+    if args.update_baseline:
+        write_baseline(results)
+        print(f"\nBaseline written to {BASELINE_PATH}")
+        return 0
+
+    if args.check:
+        failures = check_regressions(results, baseline, args.tolerance)
+        if failures:
+            print("\nPrompt size regression:")
+            for f in failures:
+                print(f"  ✖ {f}")
+            return 1
+        print("\nPrompt sizes within baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
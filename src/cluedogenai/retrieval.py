@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Recuperación de hechos del caso para el prompt del diálogo.
+
+En vez de pegar en cada turno el blueprint y el reparto completos más los
+últimos turnos, el caso se trocea (hechos de la escena, pistas visibles,
+secretos del sospechoso) y se indexa UNA vez por sospechoso con
+embeddings locales; los turnos de pregunta/respuesta se embeben una vez
+cada uno según llegan. En cada pregunta se inyectan solo los k trozos más
+parecidos: el prompt no crece con la partida y el sospechoso puede
+acordarse en el turno 10 de lo que dijo en el 1.
+
+Lo imprescindible (quién es, carácter, coartada, víctima, hora y lugar) no se
+recupera: va siempre fijo en la vista "dialogue_core" de projections.py.
+
+CLUEDO_RETRIEVAL=1 (defecto) | 0 -> prompt clásico con vistas completas
+CLUEDO_RETRIEVAL_K            trozos inyectados por pregunta (6)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from .embeddings import backend, embed, top_k
+
+MAX_INDEXES = 64  # índices (caso, sospechoso) vivos en el proceso
+
+Chunk = Tuple[str, str]  # (tipo, texto)
+
+
+def retrieval_enabled() -> bool:
+    return os.getenv("CLUEDO_RETRIEVAL", "1").strip().lower() in ("1", "true", "yes")
+
+
+def retrieval_k() -> int:
+    return int(os.getenv("CLUEDO_RETRIEVAL_K", "6"))
+
+
+def warm_up() -> None:
+    """Carga el modelo de embeddings en un hilo, para que la primera pregunta no lo pague."""
+    threading.Thread(target=backend, name="embeddings-warmup", daemon=True).start()
+
+
+# ---------- Troceado ----------
+
+def case_chunks(
+    blueprint_view: Dict[str, Any],
+    characters_view: Dict[str, Any],
+    active_suspect: str,
+) -> List[Chunk]:
+    """Trozos recuperables de las vistas "dialogue" (ya saneadas para este sospechoso)."""
+    chunks: List[Chunk] = []
+    for field in ("summary", "hidden_tension"):
+        if blueprint_view.get(field):
+            chunks.append(("scene", str(blueprint_view[field])))
+    present = blueprint_view.get("present_characters")
+    if present:
+        chunks.append(("scene", "Present at the scene: " + ", ".join(map(str, present))))
+    for clue in blueprint_view.get("visible_clues") or []:
+        chunks.append(("clue", f"Visible clue: {clue}"))
+
+    # Coartada, carácter y compañeros van fijos en dialogue_core; aquí solo lo que se recuerda si viene a cuento
+    for s in characters_view.get("suspects") or []:
+        if s.get("name") != active_suspect:
+            continue
+        for field in ("secret_motivation", "clue_object"):
+            if s.get(field):
+                chunks.append(("self", f"Your {field.replace('_', ' ')}: {s[field]}"))
+    return chunks
+
+
+def turn_text(turn: Dict[str, Any]) -> str:
+    q = (turn.get("q") or "").strip()
+    a = (turn.get("a") or "").strip()
+    return f"Detective asked: {q} | You answered: {a}"
+
+
+# ---------- Índice ----------
+
+class SuspectIndex:
+    """Trozos fijos del caso embebidos una vez + caché de vectores de turnos por texto."""
+
+    def __init__(self, chunks: List[Chunk]) -> None:
+        self._lock = threading.Lock()
+        self.chunks = chunks
+        self.matrix = embed([text for _, text in chunks])
+        self._turns: Dict[str, np.ndarray] = {}
+
+    def _turn_vectors(self, texts: List[str]) -> np.ndarray:
+        with self._lock:
+            missing = [t for t in texts if t not in self._turns]
+        if missing:
+            vecs = embed(missing)
+            with self._lock:
+                self._turns.update(zip(missing, vecs))
+        with self._lock:
+            return np.stack([self._turns[t] for t in texts])
+
+    def search(self, question: str, history: List[Dict[str, Any]], k: int) -> List[Chunk]:
+        """Los k trozos (del caso o de turnos de `history`) más parecidos a `question`."""
+        candidates = list(self.chunks)
+        matrix = self.matrix
+        turns = [turn_text(t) for t in history]
+        if turns:
+            candidates += [("turn", t) for t in turns]
+            matrix = np.vstack([matrix, self._turn_vectors(turns)]) if matrix.size else self._turn_vectors(turns)
+        query = embed([question])[0]
+        return [candidates[i] for i, _ in top_k(query, matrix, k)]
+
+
+_INDEXES: "OrderedDict[Tuple[str, str], SuspectIndex]" = OrderedDict()
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_index(
+    case_key: str,
+    suspect_name: str,
+    blueprint_view: Dict[str, Any],
+    characters_view: Dict[str, Any],
+) -> SuspectIndex:
+    """Índice de (caso, sospechoso); se construye (y embebe) solo la primera vez."""
+    key = (case_key, suspect_name)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is not None:
+            _INDEXES.move_to_end(key)
+            return index
+    index = SuspectIndex(case_chunks(blueprint_view, characters_view, suspect_name))
+    with _INDEXES_LOCK:
+        index = _INDEXES.setdefault(key, index)
+        while len(_INDEXES) > MAX_INDEXES:
+            _INDEXES.popitem(last=False)
+    return index
+
+
+def format_notes(chunks: List[Chunk]) -> str:
+    return "\n".join(f"- {text}" for _, text in chunks)
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Routing de modelos por task con fallback automático según latencia/errores.
+
+La configuración vive en config/models.yaml. Cada decisión de routing se
+añade a artifacts/routing_decisions.jsonl para poder analizarla después.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import yaml
+
+from .scheduler import percentile
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config", "models.yaml")
+DEFAULT_LOG_PATH = os.path.join(os.getcwd(), "artifacts", "routing_decisions.jsonl")
+
+PRO_MIN_THINKING_BUDGET = 128
+
+# Inglés ≈ 1.3 tokens/palabra; el resto es el esqueleto JSON + facts/clues cortos
+TOKENS_PER_WORD = 1.35
+JSON_OVERHEAD_TOKENS = 90
+
+# Entradas de tasks.yaml que en crew.py se lanzan con el nombre de otra task
+# (Task(name=...)): comparten con ella routing, budget y métricas
+TASK_ALIASES = {
+    "generate_suspect_dialogue_lean": "generate_suspect_dialogue",
+    "define_characters_from_inputs": "define_characters",
+    "create_solution_from_inputs": "create_solution",
+}
+
+_QUOTA_MARKERS = ("429", "RESOURCE_EXHAUSTED", "Quota exceeded")
+_RETRYABLE_MARKERS = _QUOTA_MARKERS + ("503", "UNAVAILABLE", "overloaded", "DEADLINE_EXCEEDED")
+
+
+def is_quota_error(exc: BaseException | str) -> bool:
+    msg = str(exc)
+    return any(m in msg for m in _QUOTA_MARKERS)
+
+
+def is_retryable_error(exc: BaseException | str) -> bool:
+    """Errores en los que tiene sentido probar con el siguiente modelo de la cadena."""
+    msg = str(exc)
+    return any(m in msg for m in _RETRYABLE_MARKERS)
+
+
+def max_tokens_for_words(word_target: int, headroom: float = 1.2) -> int:
+    """Tope de tokens de salida para una respuesta JSON de ~`word_target` palabras."""
+    return int((word_target * TOKENS_PER_WORD + JSON_OVERHEAD_TOKENS) * headroom)
+
+
+def native_gemini(model: Optional[str]) -> bool:
+    """¿Lo atiende el proveedor nativo de Gemini de crewAI? Sin modelo, el de agents.yaml (gemini)."""
+    return model is None or "gemini" in model.lower()
+
+
+def routing_task(config_key: str) -> str:
+    """Nombre de routing de una entrada de tasks.yaml (ver TASK_ALIASES)."""
+    return TASK_ALIASES.get(config_key, config_key)
+
+
+def load_models_config(path: str = CONFIG_PATH) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {"defaults": {}, "tasks": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f) or {}
+    cfg.setdefault("defaults", {})
+    cfg.setdefault("tasks", {})
+    return cfg
+
+
+class ModelRouter:
+    """Elige modelo por task y lleva la salud (latencia/errores) de cada (task, modelo)."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, log_path: Optional[str] = DEFAULT_LOG_PATH):
+        self.config = config if config is not None else load_models_config()
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._obs: Dict[Tuple[str, str], Deque[Tuple[float, float, bool]]] = {}
+        self._cooldown_until: Dict[str, float] = {}
+        self._last_decision: Dict[str, Tuple[str, str]] = {}
+
+    # ---------- config ----------
+
+    def task_config(self, task: str) -> Dict[str, Any]:
+        merged = dict(self.config.get("defaults") or {})
+        merged.update((self.config.get("tasks") or {}).get(task) or {})
+        return merged
+
+    def candidates(self, task: str, default: Optional[str] = None) -> List[str]:
+        models = list(self.task_config(task).get("models") or [])
+        if default and default not in models:
+            models.append(default)
+        return models
+
+    def thinking_budget(self, task: str, model: Optional[str] = None) -> Optional[int]:
+        """Budget de thinking para (task, modelo); None si no aplica o no está configurado."""
+        env_val = os.getenv(f"CLUEDO_THINKING_BUDGET_{task.upper()}")
+        raw = env_val if env_val not in (None, "") else self.task_config(task).get("thinking_budget")
+        if raw is None or (model and "gemini-2.5" not in model):
+            return None
+        budget = int(raw)
+        if model and "pro" in model and 0 <= budget < PRO_MIN_THINKING_BUDGET:
+            # 2.5 Pro no permite desactivar el thinking
+            budget = PRO_MIN_THINKING_BUDGET
+        return budget
+
+    def llm_params(self, task: str, model: Optional[str], word_cap: bool = True) -> Dict[str, Any]:
+        """
+        Parámetros extra del LLM de esta task, con los nombres del proveedor
+        que lo va a atender. crewAI 1.6 manda los modelos gemini-* directo a
+        google-genai (GeminiCompletion), que ignora en silencio `max_tokens`;
+        el resto va por LiteLLM, que solo entiende `max_tokens`.
+
+          max_output_tokens -> GenerateContentConfig.max_output_tokens (gemini)
+          max_tokens        -> tope de salida de LiteLLM (resto de proveedores)
+          thinking_budget   -> GenerateContentConfig.thinking_config (ver crew.ThinkingGemini)
+
+        `word_cap=False` ignora `word_target`: el tope solo vale para el schema
+        corto para el que se calculó (p.ej. el diálogo lean, sin inner_thoughts).
+        """
+        params: Dict[str, Any] = {}
+        budget = self.thinking_budget(task, model)
+        if budget is not None:
+            params["thinking_budget"] = budget
+
+        cfg = self.task_config(task)
+        cap_key = "max_output_tokens" if native_gemini(model) else "max_tokens"
+        if cfg.get("max_tokens"):
+            params[cap_key] = int(cfg["max_tokens"])
+        elif cfg.get("word_target") and word_cap:
+            # En 2.5 el thinking cuenta contra el tope de salida
+            params[cap_key] = max_tokens_for_words(int(cfg["word_target"])) + max(0, budget or 0)
+        return params
+
+    # ---------- health ----------
+
+    def health(self, task: str, model: str) -> Dict[str, Any]:
+        cfg = self.task_config(task)
+        with self._lock:
+            obs = list(self._obs.get((task, model), ()))
+            cooldown = self._cooldown_until.get(model, 0.0) - time.time()
+
+        # Las observaciones viejas caducan: así un modelo degradado vuelve a probarse
+        horizon = time.time() - float(cfg.get("max_age_s", 600))
+        obs = [(lat, ok) for ts, lat, ok in obs if ts >= horizon]
+        latencies = [lat for lat, ok in obs if ok]
+        errors = sum(1 for _, ok in obs if not ok)
+        p95 = percentile(latencies, 95)
+        error_rate = (errors / len(obs)) if obs else 0.0
+
+        reason = "ok"
+        if cooldown > 0:
+            reason = "cooldown"
+        elif len(obs) >= int(cfg.get("min_samples", 3)):
+            if error_rate > float(cfg.get("max_error_rate", 1.0)):
+                reason = "error_rate"
+            elif p95 is not None and p95 > float(cfg.get("p95_latency_s", float("inf"))):
+                reason = "p95_latency"
+
+        return {
+            "model": model,
+            "samples": len(obs),
+            "p95_s": p95,
+            "error_rate": round(error_rate, 3),
+            "cooldown_s": max(0.0, round(cooldown, 1)),
+            "healthy": reason == "ok",
+            "reason": reason,
+        }
+
+    def select(self, task: str, default: Optional[str] = None) -> Optional[str]:
+        """Primer modelo sano de la cadena; si ninguno lo está, el menos malo."""
+        chain = self.candidates(task, default)
+        if not chain:
+            return default
+
+        report = [self.health(task, m) for m in chain]
+        chosen = next((h for h in report if h["healthy"]), None)
+        if chosen is None:
+            # Todos degradados: evitamos los que están en cooldown y preferimos el p95 más bajo
+            chosen = min(
+                report,
+                key=lambda h: (h["cooldown_s"] > 0, h["error_rate"], h["p95_s"] or 0.0),
+            )
+            reason = "all_degraded"
+        elif chosen is report[0]:
+            reason = "primary"
+        else:
+            reason = "fallback:" + ",".join(f"{h['model']}={h['reason']}" for h in report if not h["healthy"])
+
+        # Cada @crew instancia todas las tasks: solo registramos cuando cambia la decisión
+        decision = (chosen["model"], reason.split(":")[0])
+        with self._lock:
+            changed = self._last_decision.get(task) != decision
+            self._last_decision[task] = decision
+        if changed:
+            self._log({"ts": time.time(), "event": "select", "task": task, "model": chosen["model"],
+                       "reason": reason, "candidates": report})
+        return chosen["model"]
+
+    def record(self, task: str, model: Optional[str], latency_s: float, ok: bool = True,
+               error: Optional[BaseException | str] = None) -> None:
+        if not model:
+            return
+        cfg = self.task_config(task)
+        window = int(cfg.get("window", 20))
+        with self._lock:
+            obs = self._obs.get((task, model))
+            if obs is None or obs.maxlen != window:
+                obs = deque(obs or (), maxlen=window)
+                self._obs[(task, model)] = obs
+            obs.append((time.time(), float(latency_s), bool(ok)))
+            if error is not None and is_retryable_error(error):
+                # 429/503: el siguiente select() saltará directamente al fallback
+                self._cooldown_until[model] = time.time() + float(cfg.get("cooldown_s", 60))
+
+        entry = {"ts": time.time(), "event": "observe", "task": task, "model": model,
+                 "latency_s": round(float(latency_s), 3), "ok": bool(ok)}
+        if error is not None:
+            entry["error"] = str(error)[:200]
+        self._log(entry)
+
+    # ---------- log ----------
+
+    def _log(self, entry: Dict[str, Any]) -> None:
+        if not self.log_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            line = json.dumps(entry, ensure_ascii=False)
+            with self._lock:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+        except Exception as e:
+            print(f"[ROUTING] Could not write decision log: {e}")
+
+
+_ROUTER: Optional[ModelRouter] = None
+_ROUTER_LOCK = threading.Lock()
+
+
+def get_router() -> ModelRouter:
+    """Router compartido por el proceso (la salud de los modelos es global, no por sesión)."""
+    global _ROUTER
+    with _ROUTER_LOCK:
+        if _ROUTER is None:
+            _ROUTER = ModelRouter(log_path=os.getenv("CLUEDO_ROUTING_LOG", DEFAULT_LOG_PATH))
+        return _ROUTER
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Scheduler en frente de todas las llamadas a modelos (Gemini / Imagen).
+
+Todas las llamadas comparten la misma cuota, así que las ordenamos por clase:
+
+  INTERACTIVE  -> turno de diálogo con el jugador esperando delante del spinner
+  SETUP        -> generación del caso para un jugador que está esperando
+  BACKGROUND   -> trabajo especulativo (retratos, pre-respuestas, batch...)
+
+Los trabajos en cola nunca adelantan a los de mayor prioridad, y solo los
+INTERACTIVE pueden ocupar los slots reservados para trabajo interactivo.
+Si llega un INTERACTIVE con todos los slots ocupados, los BACKGROUND que
+aún esperan en cola se expulsan (PreemptedError): quien los encoló decide
+si los vuelve a pedir (la cola de retratos sí, las pre-respuestas no).
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from enum import IntEnum
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    SETUP = 1
+    BACKGROUND = 2
+
+
+class PreemptedError(RuntimeError):
+    """Se lanza en el Future de un trabajo BACKGROUND cancelado antes de empezar."""
+
+
+class CaseGenerationCancelled(RuntimeError):
+    """El jugador se fue (o reinició) antes de que el caso terminara de generarse."""
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+class _Job:
+    __slots__ = ("priority", "fn", "args", "kwargs", "future", "enqueued_at", "label")
+
+    def __init__(self, priority: Priority, fn: Callable, args: tuple, kwargs: dict, label: str):
+        self.priority = priority
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+        self.label = label
+
+
+class ModelCallScheduler:
+    """
+    Cola con prioridad + pool fijo de workers (= llamadas concurrentes permitidas).
+
+    - `run()` bloquea hasta tener resultado (lo normal desde app.py).
+    - `submit()` devuelve un Future (trabajo en segundo plano).
+    - Llamadas anidadas (p.ej. la tool de imágenes dentro de un kickoff) se
+      ejecutan inline en el slot que ya tiene el hilo, para no auto-bloquearse.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        reserved_interactive_slots: int = 1,
+        metrics_window: int = 200,
+    ) -> None:
+        self.max_concurrent = max(1, int(max_concurrent))
+        # Con un solo slot no se puede reservar nada sin bloquear el background para siempre
+        self.reserved_interactive_slots = min(max(0, int(reserved_interactive_slots)), self.max_concurrent - 1)
+
+        self._heap: List[Tuple[int, int, _Job]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running: Dict[Priority, int] = {p: 0 for p in Priority}
+        self._workers: List[threading.Thread] = []
+        self._local = threading.local()
+        # Opcional: se llama (y puede dormir) antes de cada trabajo; el batch lo comparte entre procesos
+        self.rate_limiter: Optional[Callable[[], None]] = None
+
+        self._wait: Dict[Priority, Deque[float]] = {p: deque(maxlen=metrics_window) for p in Priority}
+        self._latency: Dict[Priority, Deque[float]] = {p: deque(maxlen=metrics_window) for p in Priority}
+        self._counts: Dict[Priority, Dict[str, int]] = {
+            p: {"completed": 0, "errors": 0, "preempted": 0, "cancelled": 0} for p in Priority
+        }
+
+    # ---------- API pública ----------
+
+    def submit(self, priority: Priority, fn: Callable, *args: Any, label: str = "", **kwargs: Any) -> Future:
+        """Encola `fn(*args, **kwargs)` con la prioridad dada y devuelve su Future."""
+        job = _Job(Priority(priority), fn, args, kwargs, label or getattr(fn, "__name__", "call"))
+        with self._cond:
+            self._ensure_workers()
+            heapq.heappush(self._heap, (int(job.priority), next(self._seq), job))
+            saturated = job.priority == Priority.INTERACTIVE and sum(self._running.values()) >= self.max_concurrent
+            self._cond.notify_all()
+        if saturated:
+            dropped = self.cancel_background()
+            if dropped:
+                print(f"[SCHED] {job.label} waiting for a slot: preempted {dropped} queued background jobs")
+        return job.future
+
+    def run(self, priority: Priority, fn: Callable, *args: Any, label: str = "", **kwargs: Any) -> Any:
+        """Como submit() pero bloqueante. Si ya estamos dentro de un slot, ejecuta inline."""
+        if getattr(self._local, "in_slot", False):
+            return fn(*args, **kwargs)
+        return self.submit(priority, fn, *args, label=label, **kwargs).result()
+
+    def cancel_background(self) -> int:
+        """Expulsa de la cola todos los trabajos BACKGROUND que aún no han empezado."""
+        dropped: List[_Job] = []
+        with self._cond:
+            kept = []
+            for entry in self._heap:
+                if entry[2].priority == Priority.BACKGROUND:
+                    dropped.append(entry[2])
+                else:
+                    kept.append(entry)
+            heapq.heapify(kept)
+            self._heap = kept
+
+        preempted = 0
+        for job in dropped:
+            # Un Future ya cancelado por quien lo encoló no admite set_exception
+            if job.future.set_running_or_notify_cancel():
+                job.future.set_exception(PreemptedError(f"Background job '{job.label}' preempted"))
+                preempted += 1
+        with self._cond:
+            self._counts[Priority.BACKGROUND]["preempted"] += preempted
+        return preempted
+
+    def queue_depth(self) -> Dict[str, int]:
+        with self._cond:
+            depth = {p.name.lower(): 0 for p in Priority}
+            for _, _, job in self._heap:
+                depth[job.priority.name.lower()] += 1
+            return depth
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Métricas por clase: contadores + p50/p95 de espera en cola y latencia total."""
+        out: Dict[str, Dict[str, Any]] = {}
+        with self._cond:
+            for p in Priority:
+                waits = list(self._wait[p])
+                lats = list(self._latency[p])
+                out[p.name.lower()] = {
+                    **self._counts[p],
+                    "running": self._running[p],
+                    "wait_p50_s": percentile(waits, 50),
+                    "wait_p95_s": percentile(waits, 95),
+                    "latency_p50_s": percentile(lats, 50),
+                    "latency_p95_s": percentile(lats, 95),
+                }
+        return out
+
+    def format_stats(self) -> str:
+        """Una línea por clase con stats() y queue_depth(), para logs e informes."""
+        depth = self.queue_depth()
+        lines = []
+        for name, s in self.stats().items():
+            wait = f"{s['wait_p95_s'] * 1000:.0f}ms" if s["wait_p95_s"] is not None else "-"
+            lat = f"{s['latency_p95_s'] * 1000:.0f}ms" if s["latency_p95_s"] is not None else "-"
+            lines.append(
+                f"{name:<12} queued {depth[name]:>3}  running {s['running']:>2}  done {s['completed']:>4}  "
+                f"errors {s['errors']:>3}  preempted {s['preempted']:>3}  cancelled {s['cancelled']:>3}  "
+                f"wait p95 {wait:>7}  latency p95 {lat:>7}"
+            )
+        return "\n".join(lines)
+
+    # ---------- internals ----------
+
+    def _ensure_workers(self) -> None:
+        while len(self._workers) < self.max_concurrent:
+            t = threading.Thread(
+                target=self._worker_loop,
+                name=f"model-call-{len(self._workers)}",
+                daemon=True,
+            )
+            self._workers.append(t)
+            t.start()
+
+    def _can_start(self, job: _Job) -> bool:
+        # SETUP tampoco entra en los slots reservados: un turno de diálogo no espera a un caso ajeno
+        if job.priority == Priority.INTERACTIVE:
+            return True
+        busy = sum(self._running.values())
+        return busy < self.max_concurrent - self.reserved_interactive_slots
+
+    def _next_job(self) -> _Job:
+        with self._cond:
+            while True:
+                if self._heap and self._can_start(self._heap[0][2]):
+                    _, _, job = heapq.heappop(self._heap)
+                    self._running[job.priority] += 1
+                    return job
+                self._cond.wait()
+
+    def _worker_loop(self) -> None:
+        self._local.in_slot = True
+        while True:
+            job = self._next_job()
+            started = time.perf_counter()
+            ok = True
+            ran = False
+            try:
+                if job.future.set_running_or_notify_cancel():
+                    ran = True
+                    if self.rate_limiter is not None:
+                        self.rate_limiter()
+                    job.future.set_result(job.fn(*job.args, **job.kwargs))
+            except BaseException as e:  # noqa: BLE001 - se propaga vía Future
+                ok = False
+                job.future.set_exception(e)
+            finally:
+                finished = time.perf_counter()
+                with self._cond:
+                    self._running[job.priority] -= 1
+                    if ran:
+                        self._wait[job.priority].append(started - job.enqueued_at)
+                        self._latency[job.priority].append(finished - job.enqueued_at)
+                        self._counts[job.priority]["completed" if ok else "errors"] += 1
+                    else:
+                        # Cancelado en cola por quien lo encoló: ni cuenta como hecho ni entra en los percentiles
+                        self._counts[job.priority]["cancelled"] += 1
+                    self._cond.notify_all()
+
+
+_SCHEDULER: Optional[ModelCallScheduler] = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def get_scheduler() -> ModelCallScheduler:
+    """Scheduler compartido por todo el proceso (todas las sesiones de Streamlit)."""
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            _SCHEDULER = ModelCallScheduler(
+                max_concurrent=int(os.getenv("CLUEDO_MAX_CONCURRENT_CALLS", "4")),
+                reserved_interactive_slots=int(os.getenv("CLUEDO_RESERVED_INTERACTIVE_SLOTS", "1")),
+            )
+        return _SCHEDULER
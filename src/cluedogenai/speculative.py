@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Pre-respuestas especulativas a las preguntas de apertura.
+
+Las primeras preguntas a cada sospechoso son casi siempre las mismas
+("¿Dónde estabas?", "¿De qué conocías a la víctima?"...). Con
+CLUEDO_SPECULATIVE=1, en cuanto el caso está listo se generan en BACKGROUND
+las respuestas a las preguntas de config/opening_questions.yaml para cada
+sospechoso, y si la pregunta del jugador se parece lo bastante (coseno de
+embeddings locales) se sirve la respuesta ya hecha.
+
+Cada respuesta guarda el estado de la conversación para el que se generó
+(historial y memoria del sospechoso, vacíos) y solo se sirve mientras el
+estado actual sea ese: en cuanto el sospechoso ha dicho algo, una respuesta
+hecha sin saberlo podría contradecirle. Cada una se sirve una sola vez.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+from .dialogue_cache import memory_hash
+from .embeddings import embed, similarity_threshold, top_k
+from .scheduler import Priority, get_scheduler
+
+QUESTIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config", "opening_questions.yaml")
+
+
+def speculative_enabled() -> bool:
+    return os.getenv("CLUEDO_SPECULATIVE", "0").strip().lower() in ("1", "true", "yes")
+
+
+def conversation_state(history: Optional[List[Dict[str, Any]]], memory: Optional[Dict[str, Any]]) -> str:
+    """Historial + memoria de un sospechoso, como clave comparable."""
+    return f"{len(history or [])}:{memory_hash(memory)}"
+
+
+# Las pre-respuestas se piden sin historial y con la memoria vacía
+OPENING_STATE = conversation_state([], None)
+
+
+def load_opening_questions(path: str = QUESTIONS_PATH) -> List[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return []
+    return [str(q).strip() for q in data.get("questions") or [] if str(q).strip()]
+
+
+class PreAnswerBank:
+    """
+    Respuestas pre-generadas por (sospechoso, pregunta canónica).
+    `answer_fn(suspect_name, question)` devuelve el dict de call_crew_for_answer.
+    """
+
+    def __init__(
+        self,
+        suspect_names: List[str],
+        answer_fn: Callable[[str, str], Dict[str, Any]],
+        questions: Optional[List[str]] = None,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._answer_fn = answer_fn
+        self._questions = questions if questions is not None else load_opening_questions()
+        self._suspects = list(suspect_names)
+        # sospechoso -> pregunta canónica -> (respuesta, estado de la conversación al generarla)
+        self._answers: Dict[str, Dict[int, Tuple[Dict[str, Any], str]]] = {n: {} for n in self._suspects}
+        self._served: Dict[str, set] = {n: set() for n in self._suspects}
+        self._futures: List[Future] = []
+        self._cancelled = False
+        self._matrix = None
+        self._matrix_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _question_matrix(self):
+        """Embeddings de las preguntas canónicas; la primera vez carga el modelo, así que va fuera del rerun."""
+        with self._matrix_lock:
+            if self._matrix is None and self._questions:
+                self._matrix = embed(self._questions)
+            return self._matrix
+
+    def start(self) -> "PreAnswerBank":
+        """Encola todas las pre-respuestas en BACKGROUND (nunca adelantan a un turno real)."""
+        threading.Thread(target=self._question_matrix, name="preanswer-embed", daemon=True).start()
+        scheduler = get_scheduler()
+        for qi, question in enumerate(self._questions):
+            for name in self._suspects:
+                fut = scheduler.submit(
+                    Priority.BACKGROUND, self._generate, name, qi, label=f"preanswer:{name}:{qi}"
+                )
+                self._futures.append(fut)
+        print(f"[SPECULATIVE] queued {len(self._futures)} pre-answers")
+        return self
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancelled = True
+        for fut in self._futures:
+            fut.cancel()
+
+    def _generate(self, name: str, qi: int) -> None:
+        with self._lock:
+            if self._cancelled:
+                return
+        out = self._answer_fn(name, self._questions[qi])
+        if not isinstance(out, dict) or not (out.get("spoken_text") or "").strip():
+            return
+        with self._lock:
+            self._answers[name][qi] = (out, OPENING_STATE)
+
+    def take(
+        self,
+        suspect_name: str,
+        question: str,
+        history: Optional[List[Dict[str, Any]]] = None,
+        memory: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        La pre-respuesta de la pregunta canónica más parecida, si la hay, pasa
+        el umbral y se generó para el mismo historial y memoria que hay ahora.
+        """
+        if not self._questions or conversation_state(history, memory) != OPENING_STATE:
+            return None
+        with self._lock:
+            ready = self._answers.get(suspect_name) or {}
+            if not ready:
+                self.misses += 1
+                return None
+        (qi, score), = top_k(embed([question])[0], self._question_matrix(), 1) or [(None, 0.0)]
+        with self._lock:
+            entry = (self._answers.get(suspect_name) or {}).get(qi)
+            if (entry is None or score < similarity_threshold() or qi in self._served[suspect_name]
+                    or entry[1] != conversation_state(history, memory)):
+                self.misses += 1
+                return None
+            out = entry[0]
+            self._served[suspect_name].add(qi)
+            self.hits += 1
+        print(f"[SPECULATIVE] hit {suspect_name}: {question!r} ~ {self._questions[qi]!r} ({score:.2f})")
+        return dict(out)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            ready = sum(len(v) for v in self._answers.values())
+        return {"ready": ready, "queued": len(self._futures), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Backend de modelo simulado para benchmarks offline.
+
+No llama a ninguna API: modela la latencia de una generación como
+time-to-first-token + (tokens de thinking + tokens de salida) / throughput,
+y la "ejecuta" con un sleep (escalable con `time_scale` para ir rápido).
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class StubLatencyModel:
+    ttft_s: float = 0.45           # latencia hasta el primer token
+    tokens_per_s: float = 180.0    # throughput de decodificación (thinking incluido)
+    time_scale: float = 1.0        # 0.01 -> el benchmark corre 100x más rápido
+
+    def expected_s(self, output_tokens: int, thinking_tokens: int = 0) -> float:
+        return self.ttft_s + (max(0, output_tokens) + max(0, thinking_tokens)) / self.tokens_per_s
+
+    def generate(self, output_tokens: int, thinking_tokens: int = 0) -> float:
+        """Duerme lo que tardaría la llamada (escalado) y devuelve los segundos medidos, desescalados."""
+        started = time.perf_counter()
+        time.sleep(self.expected_s(output_tokens, thinking_tokens) * self.time_scale)
+        elapsed = time.perf_counter() - started
+        return elapsed / self.time_scale if self.time_scale else elapsed
+
+
+def thinking_tokens_used(dynamic_tokens: int, budget: Optional[int]) -> int:
+    """Tokens de thinking que consume una llamada dado el budget (None/-1 = dinámico)."""
+    if budget is None or budget < 0:
+        return dynamic_tokens
+    return min(dynamic_tokens, budget)
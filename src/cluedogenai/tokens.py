@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+Estimación barata de tokens, sin depender del tokenizer del proveedor.
+
+Gemini no expone su tokenizer offline; para comparar prompts entre sí (y con
+un baseline) basta con una aproximación estable: palabras + signos de
+puntuación, con las palabras largas partidas en trozos de ~4 caracteres.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    total = 0
+    for piece in _PIECE_RE.findall(text):
+        total += max(1, math.ceil(len(piece) / 4)) if piece[0].isalnum() else 1
+    return total
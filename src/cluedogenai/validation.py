@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Validación local de los artifacts del caso y reparación dirigida.
+
+Cada validador devuelve una lista de errores legibles (vacía = válido) y no
+hace ninguna llamada a modelos. `repair_artifact()` vuelve a lanzar SOLO la
+task que falla, pasándole esos errores como {validation_feedback}, en vez de
+regenerar la crew entera.
+
+Los validadores encadenan: los sospechosos se comprueban contra las
+`suspect_seeds` del blueprint y la solución contra el culpable, así que un
+blueprint reparado arrastra la reparación de lo que depende de él.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional
+
+from .fanout import SUSPECT_COUNT, FanoutError, read_suspect_seeds
+from .scheduler import CaseGenerationCancelled
+
+BLUEPRINT_REQUIRED = ("scene_id", "location", "time", "summary", "victim_name", "victim_role")
+SUSPECT_REQUIRED = ("name", "role", "personality", "secret_motivation", "alibi", "physical_description")
+SOLUTION_REQUIRED = ("truth_summary", "murderer", "method", "motive")
+
+MAX_REPAIRS = 2
+
+
+class CaseValidationError(RuntimeError):
+    """Un artifact sigue sin pasar el validador tras las reparaciones permitidas."""
+
+    def __init__(self, task_name: str, errors: List[str]) -> None:
+        super().__init__(f"{task_name} failed validation: " + "; ".join(errors))
+        self.task_name = task_name
+        self.errors = errors
+
+
+def _blank(value: Any) -> bool:
+    return value is None or (isinstance(value, (str, list, dict)) and not value)
+
+
+def _norm(name: Any) -> str:
+    return " ".join(str(name or "").split()).lower()
+
+
+# ---------- Validadores ----------
+
+def validate_scene_blueprint(scene_blueprint: Optional[Dict[str, Any]]) -> List[str]:
+    if not isinstance(scene_blueprint, dict):
+        return ["no JSON object with a scene_id"]
+    errors = [f'missing "{k}"' for k in BLUEPRINT_REQUIRED if _blank(scene_blueprint.get(k))]
+    if not isinstance(scene_blueprint.get("visible_clues"), list) or not scene_blueprint["visible_clues"]:
+        errors.append('"visible_clues" must be a non-empty list')
+    try:
+        read_suspect_seeds(scene_blueprint)
+    except FanoutError as e:
+        errors.append(f"suspect_seeds: {e}")
+    return errors
+
+
+def validate_characters(
+    characters: Optional[Dict[str, Any]],
+    scene_blueprint: Optional[Dict[str, Any]] = None,
+) -> List[str]:
+    if not isinstance(characters, dict) or not isinstance(characters.get("suspects"), list):
+        return ['no JSON object with a "suspects" list']
+    suspects = [s for s in characters["suspects"] if isinstance(s, dict)]
+    errors: List[str] = []
+
+    if len(suspects) != SUSPECT_COUNT:
+        errors.append(f'"suspects" must have exactly {SUSPECT_COUNT} entries, got {len(suspects)}')
+
+    names = [_norm(s.get("name")) for s in suspects]
+    if len(set(names)) != len(names):
+        errors.append("suspect names must be unique")
+    for s in suspects:
+        missing = [k for k in SUSPECT_REQUIRED if _blank(s.get(k))]
+        if missing:
+            errors.append(f"{s.get('name') or '?'}: missing {', '.join(missing)}")
+        if not isinstance(s.get("guilty"), bool):
+            errors.append(f"{s.get('name') or '?'}: \"guilty\" must be a JSON boolean")
+
+    guilty = [s.get("name") for s in suspects if s.get("guilty") is True]
+    if len(guilty) != 1:
+        errors.append(f'exactly one suspect must have "guilty": true, got {len(guilty)}')
+    elif _norm(characters.get("guilty_name")) != _norm(guilty[0]):
+        errors.append(f'"guilty_name" must be "{guilty[0]}" (the suspect marked guilty)')
+
+    if scene_blueprint is not None:
+        try:
+            seeds = read_suspect_seeds(scene_blueprint)
+        except FanoutError:
+            seeds = []
+        expected = {_norm(s["name"]) for s in seeds}
+        if expected and expected != set(names):
+            wanted = ", ".join(s["name"] for s in seeds)
+            errors.append(f"suspect names must match suspect_seeds exactly: {wanted}")
+    return errors
+
+
+def validate_solution(
+    solution: Optional[Dict[str, Any]],
+    characters: Optional[Dict[str, Any]] = None,
+) -> List[str]:
+    if not isinstance(solution, dict):
+        return ["no JSON object with a truth_summary"]
+    errors = [f'missing "{k}"' for k in SOLUTION_REQUIRED if _blank(solution.get(k))]
+    if not isinstance(solution.get("key_evidence"), list) or not solution["key_evidence"]:
+        errors.append('"key_evidence" must be a non-empty list')
+    guilty_name = (characters or {}).get("guilty_name")
+    if guilty_name and _norm(solution.get("murderer")) != _norm(guilty_name):
+        errors.append(f'"murderer" must be "{guilty_name}"')
+    return errors
+
+
+def validate_artifact(task_name: str, artifact: Optional[Dict[str, Any]], accepted: Dict[str, Dict]) -> List[str]:
+    """Valida la salida de una task de setup contra lo ya aceptado (blueprint/sospechosos)."""
+    if task_name == "create_scene_blueprint":
+        return validate_scene_blueprint(artifact)
+    if task_name == "define_characters":
+        return validate_characters(autofix_characters(artifact), accepted.get("create_scene_blueprint"))
+    if task_name == "create_solution":
+        return validate_solution(artifact, accepted.get("define_characters"))
+    return []
+
+
+# ---------- Arreglos locales (sin modelo) ----------
+
+def autofix_characters(characters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Lo que se puede arreglar sin preguntar al modelo: si hay exactamente un
+    culpable, `guilty_name` se alinea con él.
+    """
+    if not isinstance(characters, dict) or not isinstance(characters.get("suspects"), list):
+        return characters
+    guilty = [s.get("name") for s in characters["suspects"] if isinstance(s, dict) and s.get("guilty") is True]
+    if len(guilty) == 1 and characters.get("guilty_name") != guilty[0]:
+        characters = {**characters, "guilty_name": guilty[0]}
+    return characters
+
+
+# ---------- Bucle de reparación ----------
+
+def feedback_for(errors: List[str]) -> str:
+    """Texto para {validation_feedback}: los errores del intento anterior, uno por línea."""
+    lines = "\n".join(f"- {e}" for e in errors)
+    return (
+        "IMPORTANT: your previous answer for this task was rejected by the validator:\n"
+        f"{lines}\n"
+        "Fix exactly these problems and return the complete JSON again."
+    )
+
+
+def repair_artifact(
+    task_name: str,
+    artifact: Optional[Dict[str, Any]],
+    validate: Callable[[Optional[Dict[str, Any]]], List[str]],
+    regenerate: Callable[[str], Optional[Dict[str, Any]]],
+    max_repairs: int = MAX_REPAIRS,
+) -> Dict[str, Any]:
+    """
+    Devuelve `artifact` si es válido; si no, relanza solo su task con los
+    errores como feedback (hasta `max_repairs` veces). CaseValidationError si
+    no se consigue.
+    """
+    errors = validate(artifact)
+    for attempt in range(1, max_repairs + 1):
+        if not errors:
+            break
+        print(f"[VALIDATE] {task_name} invalid ({'; '.join(errors)}); regenerating only this task ({attempt}/{max_repairs})")
+        try:
+            artifact = regenerate(feedback_for(errors))
+        except CaseGenerationCancelled:
+            raise
+        except Exception as e:
+            print(f"[VALIDATE] {task_name} regeneration failed: {e}")
+            artifact = None
+        errors = validate(artifact)
+    if errors:
+        raise CaseValidationError(task_name, errors)
+    return artifact  # type: ignore[return-value]